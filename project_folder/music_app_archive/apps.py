@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MusicAppArchiveConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'music_app_archive'
+
+    def ready(self):
+        #Connects the playlist fragment cache invalidation
+        from . import signals
+        #Registers the built-in platform adapters (domains, StreamingLink platform choices, canonicalisers)
+        from .src.integrations import main_integrations
@@ -0,0 +1,69 @@
+'''
+Compare parsing a Bandcamp track page the old way (whole page with html.parser, then scrape)
+with the targeted parse in bandcamp.scrape_bandcamp_page() (SoupStrainer on #name-section, lxml
+when installed), on saved pages in benchmarks/fixtures/.
+
+Reports per-call latency and the peak memory allocated while parsing (tracemalloc).
+fixtures/bandcamp_track.html is a ~300 KB page with the same structure as a Bandcamp track page
+(head scripts/styles, JSON-LD, #name-section, track table, recommendations, fans); drop other
+saved pages (view-source -> save) into fixtures/ to benchmark them too.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_bandcamp_parse [iterations]
+'''
+from pathlib import Path
+import sys
+import tracemalloc
+
+from .utils import setup_django, summarise, time_calls
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+def peak_memory_kib(func) -> float:
+    '''
+    Peak memory allocated by one call of func(), in KiB.
+    '''
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def main(iterations: int = 50):
+    setup_django()
+
+    from bs4 import BeautifulSoup
+    from music_app_archive.src.integrations.bandcamp import scrape_bandcamp_page, BANDCAMP_HTML_PARSER
+
+    print(f"Targeted parse uses the '{BANDCAMP_HTML_PARSER}' parser")
+
+    for fixture in sorted(FIXTURES_DIR.glob('bandcamp_*.html')):
+        html = fixture.read_bytes()
+        print(f"\n{fixture.name} ({len(html) / 1024:.0f} KiB)")
+
+        def full_parse():
+            return scrape_bandcamp_page(BeautifulSoup(html, "html.parser"))
+
+        def targeted_parse():
+            return scrape_bandcamp_page(html)
+
+        assert full_parse() == targeted_parse(), "Both paths must scrape the same values"
+
+        before = summarise("html.parser, whole page (before)", time_calls(full_parse, iterations))
+        after = summarise("strained scrape_bandcamp_page (after)", time_calls(targeted_parse, iterations))
+        before_memory = peak_memory_kib(full_parse)
+        after_memory = peak_memory_kib(targeted_parse)
+
+        print(f"Peak memory: before={before_memory:.0f} KiB after={after_memory:.0f} KiB")
+        print(
+            f"Speed-up (median): {before['median_ms'] / after['median_ms']:.1f}x, "
+            f"memory: {before_memory / after_memory:.1f}x less"
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
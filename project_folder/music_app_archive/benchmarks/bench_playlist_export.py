@@ -0,0 +1,92 @@
+'''
+Export playlists of growing size as JSON two ways and report the time to the first byte, the total
+time and the peak memory (tracemalloc) of each:
+
+- buffered: every row and link read into a list, then one json.dumps() (what a JsonResponse would do)
+- streamed: stream_playlist_ndjson(), the body of the export API, consumed chunk by chunk
+
+The streamed peak should stay about the same whatever the playlist size.
+
+Creates a throwaway test database (test_<NAME>), fills it and drops it again.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_playlist_export [largest playlist]
+'''
+import json
+import sys
+import time
+import tracemalloc
+
+from .utils import setup_django
+from .bench_playlist_reader import seed_playlist
+
+
+def buffered_export(playlist) -> list:
+    '''
+    The whole playlist as one JSON string, yielded at once.
+    '''
+    from music_app_archive.models import PlaylistTrack, StreamingLink
+    from music_app_archive.src.services import PLAYLIST_TRACK_COLUMNS, group_streaming_links, playlist_track_record
+
+    playlist_tracks = PlaylistTrack.objects.filter(playlist=playlist, is_deleted=False)
+    rows = list(playlist_tracks.order_by('position').values_list(*PLAYLIST_TRACK_COLUMNS))
+    links_by_track = group_streaming_links(StreamingLink.objects.filter(track_id__in=playlist_tracks.values('track_id')))
+    records = [playlist_track_record(row, links_by_track.get(row[2], ())) for row in rows]
+    yield json.dumps(records)
+
+
+def measure(label: str, export, playlist) -> dict:
+    '''
+    Consume export(playlist) as a response would; time to its first chunk, total time and peak memory.
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in export(playlist):
+        if first_byte is None:
+            first_byte = (time.perf_counter() - start) * 1000
+        size += len(chunk)
+    total = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{label:<32} first byte={first_byte:7.1f}ms total={total:7.1f}ms peak={peak / 1024:9,.0f}KiB body={size / 1024:,.0f}KiB")
+    return {'first_byte_ms': first_byte, 'total_ms': total, 'peak_kb': peak / 1024}
+
+
+def main(largest: int = 20000):
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from music_app_archive.models import Playlist, PlaylistTrack
+    from music_app_archive.src.services import stream_playlist_ndjson
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        full_playlist = seed_playlist(largest)
+        playlist_tracks = list(PlaylistTrack.objects.filter(playlist=full_playlist).order_by('position'))
+
+        for size in (largest // 10, largest // 2, largest):
+            #Smaller playlists share the first `size` tracks of the seeded one
+            if size == largest:
+                playlist = full_playlist
+            else:
+                playlist = Playlist.objects.create(playlist_name=f'Benchmark {size}', owner=full_playlist.owner)
+                PlaylistTrack.objects.bulk_create(
+                    [PlaylistTrack(playlist=playlist, track_id=row.track_id, added_by_id=row.added_by_id, position=row.position) for row in playlist_tracks[:size]],
+                    batch_size=500
+                )
+            print(f"{size} tracks")
+            measure("  buffered json.dumps (before)", buffered_export, playlist)
+            measure("  stream_playlist_ndjson (after)", stream_playlist_ndjson, playlist)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
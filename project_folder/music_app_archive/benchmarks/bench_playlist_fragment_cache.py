@@ -0,0 +1,92 @@
+'''
+Request view_edit_playlist for a 5,000-track playlist with the fragment cache off and on, then
+replay a read-heavy mix (one write to the playlist every `write_every` reads) and report the
+median request time, the queries per request and the fragment cache hit rate.
+
+Uses the test client against a throwaway test database (test_<NAME>), which it fills and drops again.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_playlist_fragment_cache [tracks] [write_every]
+'''
+import statistics
+import sys
+import time
+
+from .utils import setup_django
+from .bench_playlist_reader import seed_playlist
+
+
+def time_requests(client, url: str, rounds: int) -> tuple:
+    '''
+    Median wall time (ms) and mean query count of `rounds` GETs of url.
+    '''
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    queries = []
+    for _ in range(rounds):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+    return statistics.median(timings), statistics.mean(queries)
+
+
+def main(track_count: int = 5000, write_every: int = 20):
+    setup_django()
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from django.urls import reverse
+    from music_app_archive.models import Track
+    from music_app_archive.src.playlist_cache import playlist_fragment_cache
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        playlist = seed_playlist(track_count)
+        client = Client()
+        client.force_login(playlist.owner)
+        cache.clear()
+
+        for page_size in (100, 500):
+            url = reverse('view_edit_playlist', args=[playlist.owner.username, playlist.playlist_name]) + f"?page_size={page_size}"
+
+            timeout = playlist_fragment_cache.timeout
+            playlist_fragment_cache.timeout = 0
+            cold_ms, cold_queries = time_requests(client, url, 20)
+            playlist_fragment_cache.timeout = timeout
+
+            client.get(url)
+            warm_ms, warm_queries = time_requests(client, url, 20)
+            print(
+                f"page_size={page_size:<4} uncached median={cold_ms:6.1f}ms queries={cold_queries:.0f}   "
+                f"cached median={warm_ms:6.1f}ms queries={warm_queries:.0f}   speed-up={cold_ms / warm_ms:.1f}x"
+            )
+
+        #Read-heavy mix: every write_every-th request follows an edit of a track in the playlist
+        url = reverse('view_edit_playlist', args=[playlist.owner.username, playlist.playlist_name])
+        track = Track.objects.filter(playlist_entries__playlist=playlist).first()
+        playlist_fragment_cache.reset_stats()
+        for i in range(1, 401):
+            if i % write_every == 0:
+                track.genre = f"ambient {i}"
+                track.save()
+            client.get(url)
+        stats = playlist_fragment_cache.stats()
+        print(f"1 write every {write_every} reads: hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.0%}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
@@ -0,0 +1,128 @@
+'''
+Build the playlist overview for a user with 300 playlists (20 tracks each, a fifth of them removed)
+two ways and report the queries and median time:
+
+- per row: the old Playlist queryset plus a count, a latest added_at and a platform query per playlist,
+  what the template would need to show the same columns
+- annotated: get_playlist_overview_page(), the count plus one annotated query for the page
+
+Both for one page (PLAYLIST_OVERVIEW_PAGE_SIZE) and for every playlist on one page. Also prints the
+query plan of the annotated query so the partial indexes can be checked.
+
+Creates a throwaway test database (test_<NAME>), fills it and drops it again.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_playlist_overview [playlists] [tracks_per_playlist]
+'''
+import statistics
+import sys
+import time
+
+from .utils import setup_django
+
+
+def per_row_overview(owner, per_page: int) -> list:
+    '''
+    The newest per_page playlists, with 3 extra queries per playlist.
+    '''
+    from django.db.models import Count, Max
+    from music_app_archive.models import Playlist, StreamingLink
+
+    rows = []
+    playlists = Playlist.objects.filter(owner_id=owner.id, is_deleted=False).order_by('-date_created')[:per_page]
+    for playlist in playlists:
+        active_tracks = playlist.tracks_in_playlist.filter(is_deleted=False)
+        rows.append((
+            playlist.owner.username,
+            active_tracks.count(),
+            active_tracks.aggregate(last_added_at=Max('added_at'))['last_added_at'],
+            dict(
+                StreamingLink.objects.filter(track__playlist_entries__in=active_tracks)
+                .values_list('streaming_platform').annotate(count=Count('id'))
+            ),
+        ))
+    return rows
+
+
+def seed(owner, playlist_count: int, tracks_per_playlist: int):
+    from music_app_archive.models import Playlist, Track, PlaylistTrack, StreamingLink
+
+    playlists = Playlist.objects.bulk_create(
+        [Playlist(playlist_name=f"Overview {i}", slug=f"overview-{i}", owner=owner) for i in range(playlist_count)],
+        batch_size=500
+    )
+    tracks = Track.objects.bulk_create(
+        [Track(track_name=f"Track {i}", artist=f"Artist {i % 300}", created_by=owner) for i in range(playlist_count * tracks_per_playlist)],
+        batch_size=500
+    )
+    platforms = ('youtube', 'bandcamp', 'soundcloud')
+    StreamingLink.objects.bulk_create(
+        [
+            StreamingLink(track=track, streaming_platform=platforms[i % 3], streaming_link=f"https://example.com/{platforms[i % 3]}/{i}")
+            for i, track in enumerate(tracks)
+        ],
+        batch_size=500
+    )
+    PlaylistTrack.objects.bulk_create(
+        [
+            PlaylistTrack(
+                playlist=playlists[i // tracks_per_playlist], track=track, added_by=owner,
+                position=i % tracks_per_playlist + 1, is_deleted=i % 5 == 0
+            )
+            for i, track in enumerate(tracks)
+        ],
+        batch_size=500
+    )
+
+
+def measure(label: str, build, rounds: int = 10):
+    '''
+    Median wall time over `rounds` builds and the number of queries one build runs.
+    '''
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        build()
+        timings.append((time.perf_counter() - start) * 1000)
+    #Counted on a separate run with an empty log, the log only keeps the last 9000 queries
+    reset_queries()
+    with CaptureQueriesContext(connection) as captured:
+        build()
+    print(f"{label:<44} queries={len(captured):<5} median={statistics.median(timings):7.1f}ms")
+
+
+def main(playlist_count: int = 300, tracks_per_playlist: int = 20):
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from music_app_archive.src.services import get_playlist_overview_page, playlist_overview_queryset
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        owner = get_user_model().objects.create_user(username='benchmark', email='benchmark@example.com', password='Th1$Pa$$w0rd')
+        seed(owner, playlist_count, tracks_per_playlist)
+
+        for per_page in (settings.PLAYLIST_OVERVIEW_PAGE_SIZE, playlist_count):
+            measure(f"per row, {per_page} playlists (before)", lambda: per_row_overview(owner, per_page))
+            measure(f"annotated page, {per_page} playlists (after)", lambda: list(get_playlist_overview_page(owner, 1, per_page)))
+
+        print("Query plan of the annotated page:")
+        print(playlist_overview_queryset(owner)[:settings.PLAYLIST_OVERVIEW_PAGE_SIZE].explain())
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    )
@@ -0,0 +1,143 @@
+'''
+Read a 5,000-track playlist the old way (model instances for PlaylistTrack, Track, the adding user and every
+StreamingLink, copied into a dict per row) and with services.get_playlist_tracks() (value projections, one
+grouped streaming-link query, PlaylistTrackRow objects). Reports the time and the peak / retained memory
+(tracemalloc) of each.
+
+Creates a throwaway test database (test_<NAME>), fills it and drops it again.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_playlist_reader [tracks]
+'''
+import statistics
+import sys
+import time
+import tracemalloc
+
+from .utils import setup_django
+
+
+def legacy_playlist_tracks(playlist) -> list:
+    '''
+    view_edit_playlist before the shared reader: full instances via select_related/prefetch_related, one dict per row.
+    '''
+    from music_app_archive.models import PlaylistTrack
+
+    playlist_tracks = PlaylistTrack.objects.filter(
+        playlist=playlist,
+        is_deleted=False
+        ).select_related(
+            'track',
+            'added_by'
+        ).prefetch_related(
+            'track__streaming_links'
+        ).order_by('position')
+
+    list_of_playlist_tracks = []
+    for playlist_track in playlist_tracks:
+        track = playlist_track.track
+        streaming_links = list(track.streaming_links.all())
+        list_of_playlist_tracks.append({
+            'id': playlist_track.id,
+            'position': playlist_track.position,
+            'track_id': track.id,
+            'track_name': track.track_name,
+            'artist': track.artist,
+            'album_name': track.album_name or '-',
+            'genre': track.genre or '-',
+            'record_label': track.record_label or '-',
+            'mix_page': track.mix_page or '-',
+            'date_added': playlist_track.added_at,
+            'added_by': playlist_track.added_by.username if playlist_track.added_by else 'Unknown',
+            'streaming_links': [
+                {
+                    'platform': link.get_streaming_platform_display(),
+                    'platform_code': link.streaming_platform,
+                    'url': link.streaming_link,
+                    'id': link.id
+                }
+                for link in streaming_links
+            ],
+            'streaming_platform': streaming_links[0].get_streaming_platform_display() if streaming_links else '-',
+            'link': streaming_links[0].streaming_link if streaming_links else '#',
+        })
+    return list_of_playlist_tracks
+
+
+def seed_playlist(track_count: int):
+    '''
+    One playlist with track_count tracks; every track has a YouTube link and every other one a Bandcamp link too.
+    '''
+    from django.contrib.auth import get_user_model
+    from music_app_archive.models import Playlist, Track, PlaylistTrack, StreamingLink
+
+    user = get_user_model().objects.create_user(username='benchmark', email='benchmark@example.com', password='Th1$Pa$$w0rd')
+    playlist = Playlist.objects.create(playlist_name='Benchmark', owner=user)
+    tracks = Track.objects.bulk_create(
+        [
+            Track(track_name=f"Track {i}", artist=f"Artist {i % 300}", album_name=f"Album {i % 800}", genre='ambient', created_by=user)
+            for i in range(track_count)
+        ],
+        batch_size=500
+    )
+    links = []
+    for i, track in enumerate(tracks):
+        links.append(StreamingLink(track=track, streaming_platform='youtube', streaming_link=f"https://www.youtube.com/watch?v=b{i:010d}"))
+        if i % 2:
+            links.append(StreamingLink(track=track, streaming_platform='bandcamp', streaming_link=f"https://artist.bandcamp.com/track/t{i}"))
+    StreamingLink.objects.bulk_create(links, batch_size=500)
+    PlaylistTrack.objects.bulk_create(
+        [PlaylistTrack(playlist=playlist, track=track, added_by=user, position=i) for i, track in enumerate(tracks, start=1)],
+        batch_size=500
+    )
+    return playlist
+
+
+def measure(label: str, reader, playlist, rounds: int = 5) -> dict:
+    '''
+    Median wall time over `rounds` reads, then one traced read for peak and retained memory.
+    '''
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        reader(playlist)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    rows = reader(playlist)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    summary = {'label': label, 'rows': len(rows), 'median_ms': statistics.median(timings), 'peak_kb': peak / 1024, 'retained_kb': retained / 1024}
+    print(
+        f"{label:<40} rows={summary['rows']:<6} median={summary['median_ms']:.1f}ms "
+        f"peak={summary['peak_kb']:,.0f}KiB retained={summary['retained_kb']:,.0f}KiB"
+    )
+    return summary
+
+
+def main(track_count: int = 5000):
+    setup_django()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+    from music_app_archive.src.services import get_playlist_tracks
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        playlist = seed_playlist(track_count)
+        before = measure("instances + dicts (before)", legacy_playlist_tracks, playlist)
+        after = measure("get_playlist_tracks() (after)", get_playlist_tracks, playlist)
+        print(
+            f"Speed-up (median): {before['median_ms'] / after['median_ms']:.1f}x, "
+            f"peak memory: {before['peak_kb'] / after['peak_kb']:.1f}x less"
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,111 @@
+'''
+Compare get_page_source() in fast mode (wait for the platform's readiness selector, no sleeps)
+with the opt-in human-like mode (random sleeps and a scroll around the page load).
+
+The pages in benchmarks/fixtures/ are served from a local HTTP server so the numbers measure the
+browser and the waits rather than the platform. Both modes share the same warm pooled browser.
+It then compares fast-mode fetches with and without the resource-blocking scraping profile
+(SELENIUM_BLOCK_RESOURCES), including the mean bytes transferred per fetch.
+
+Needs a browser: either SELENIUM_REMOTE_URL (Docker) or a local Chrome. When the browser runs in
+another container, set BENCH_FIXTURE_HOST to the hostname it can reach this container on, e.g.:
+    docker compose exec -e BENCH_FIXTURE_HOST=web web python -m music_app_archive.benchmarks.bench_selenium_fetch
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_selenium_fetch [iterations]
+'''
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import os
+import sys
+import threading
+
+from .utils import setup_django, summarise, time_calls
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures() -> ThreadingHTTPServer:
+    '''
+    Serve FIXTURES_DIR on a free port in a background thread.
+    '''
+    server = ThreadingHTTPServer(('0.0.0.0', 0), partial(QuietHandler, directory=str(FIXTURES_DIR)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def compare_scraping_profile(url: str, iterations: int):
+    '''
+    Fast-mode fetch time and bytes transferred with SELENIUM_BLOCK_RESOURCES off and on.
+    Each run starts a fresh pool, as the profile is applied when Chrome starts.
+    '''
+    from django.conf import settings
+    from music_app_archive.src.integrations.main_integrations import get_page_source, get_fetch_transfer_stats
+    from music_app_archive.src.integrations.browser_pool import reset_browser_pool
+
+    results = {}
+    for block_resources in (False, True):
+        settings.SELENIUM_BLOCK_RESOURCES = block_resources
+        reset_browser_pool()
+        get_page_source(url, 'bandcamp', human_delays=False)
+
+        before = get_fetch_transfer_stats().get('bandcamp', {'fetches': 0, 'bytes': 0})
+        label = "scraping profile" if block_resources else "full page load (before)"
+        results[block_resources] = summarise(label, time_calls(
+            lambda: get_page_source(url, 'bandcamp', human_delays=False), iterations
+        ))
+        after = get_fetch_transfer_stats()['bandcamp']
+        fetches = after['fetches'] - before['fetches']
+        mean_bytes = (after['bytes'] - before['bytes']) / fetches if fetches else 0
+        print(f"{'':<40} mean transferred={mean_bytes / 1024:.0f} KiB over {fetches} fetch(es)")
+
+    print(f"Scraping profile speed-up (median): {results[False]['median_ms'] / results[True]['median_ms']:.1f}x")
+
+
+def main(iterations: int = 10):
+    setup_django()
+
+    from django.conf import settings
+    from music_app_archive.src.integrations.main_integrations import get_page_source, PAGE_READY_SELECTORS
+    from music_app_archive.src.integrations.browser_pool import reset_browser_pool
+
+    server = serve_fixtures()
+    host = os.environ.get('BENCH_FIXTURE_HOST', 'localhost')
+    base_url = f"http://{host}:{server.server_address[1]}"
+    #The scraping profile only resolves SELENIUM_ALLOWED_HOSTS
+    settings.SELENIUM_ALLOWED_HOSTS = settings.SELENIUM_ALLOWED_HOSTS + [host]
+
+    try:
+        for fixture in sorted(FIXTURES_DIR.glob('bandcamp_*.html')):
+            url = f"{base_url}/{fixture.name}"
+            print(f"\n{url} (waits for '{PAGE_READY_SELECTORS['bandcamp']}')")
+
+            #Warm the pooled browser so neither mode pays for starting Chrome
+            get_page_source(url, 'bandcamp', human_delays=False)
+
+            fast = summarise("fast mode (readiness selector)", time_calls(
+                lambda: get_page_source(url, 'bandcamp', human_delays=False), iterations
+            ))
+            human = summarise("human delays (before)", time_calls(
+                lambda: get_page_source(url, 'bandcamp', human_delays=True), iterations
+            ))
+
+            print(
+                f"Speed-up: median {human['median_ms'] / fast['median_ms']:.1f}x, "
+                f"p95 {human['p95_ms'] / fast['p95_ms']:.1f}x"
+            )
+
+            compare_scraping_profile(url, iterations)
+    finally:
+        server.shutdown()
+        reset_browser_pool()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,60 @@
+'''
+Simulate N users pasting the same link at once and count the upstream calls made, with
+single-flight off (single_flight_wait=0, every miss fetches) and on (one fetch shared by all).
+
+The upstream call is a stand-in that sleeps for `latency` seconds, so no platform is contacted.
+Uses the configured CACHES; with Redis this also exercises the cross-worker fetch lock.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_single_flight [concurrent_requests]
+'''
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import threading
+import time
+
+from .utils import setup_django
+
+
+def run_burst(metadata_cache, url: str, concurrent_requests: int, latency: float) -> dict:
+    '''
+    Submit the same link from concurrent_requests threads and return the upstream calls and wall time.
+    '''
+    upstream_calls = []
+    upstream_lock = threading.Lock()
+
+    def fetch():
+        with upstream_lock:
+            upstream_calls.append(time.monotonic())
+        time.sleep(latency)
+        return {'track_name': 'Benchmark', 'streaming_platform': 'youtube', 'streaming_link': url}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrent_requests) as executor:
+        list(executor.map(
+            lambda _: metadata_cache.get_or_fetch(url, 'track', 'youtube', fetch),
+            range(concurrent_requests)
+        ))
+    return {'upstream_calls': len(upstream_calls), 'wall_ms': (time.perf_counter() - start) * 1000}
+
+
+def main(concurrent_requests: int = 50, latency: float = 0.5):
+    setup_django()
+
+    from music_app_archive.src.integrations.metadata_cache import MetadataCache
+
+    for label, single_flight_wait in (("no coalescing (before)", 0), ("single-flight (after)", 10)):
+        metadata_cache = MetadataCache(
+            ttls={'youtube': 60}, negative_ttl=0, max_local_entries=16, single_flight_wait=single_flight_wait
+        )
+        #A fresh URL per run so the second run can't hit the first run's cache entry
+        url = f"https://www.youtube.com/watch?v=bench{int(time.time() * 1000) % 1000000:06d}"
+        result = run_burst(metadata_cache, url, concurrent_requests, latency)
+        print(
+            f"{label:<40} requests={concurrent_requests:<6} "
+            f"upstream calls={result['upstream_calls']:<6} wall={result['wall_ms']:.0f}ms"
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,109 @@
+'''
+Classify a batch of mixed streaming links (supported platforms, other sites and junk, with a
+fifth of the links repeated, as in a pasted collection export) and report links per second for:
+
+- the old per-link path: the nested any()/endswith() domain scan, then canonicalise_streaming_link()
+- the current per-link path: check_streaming_link_platform() + canonicalise_streaming_link()
+- the bulk path: classify_streaming_links() over the whole batch
+
+Pure CPU, nothing is fetched.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_url_classifier [links]
+'''
+import random
+import sys
+import time
+
+from .utils import setup_django
+
+
+#{id} is replaced with a random token so most links are distinct, like a real export
+LINK_TEMPLATES = [
+    'https://www.youtube.com/watch?v={id}&list=PL1234&index=2',
+    'https://youtu.be/{id}?si=abcdef',
+    'https://music.youtube.com/watch?v={id}&feature=share',
+    'https://m.youtube.com/shorts/{id}',
+    'https://www.youtube.com/playlist?list=PL{id}',
+    'https://soundcloud.com/artist-{id}/track-name?utm_source=clipboard',
+    'https://m.soundcloud.com/artist-name/sets/{id}/',
+    'https://horsevision.bandcamp.com/track/{id}?from=search',
+    'https://label-{id}.bandcamp.com/album/some-record',
+    'https://open.spotify.com/track/{id}',
+    'https://www.mixcloud.com/someone/{id}/',
+    'https://www.youtube.com/',
+    'not a link',
+    '',
+]
+ID_CHARACTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-'
+
+
+def legacy_check_streaming_link_platform(streaming_link: str, platform_domains: dict, get_hostname) -> str:
+    '''
+    check_streaming_link_platform() before the domain lookup: every domain of every platform is tested.
+    '''
+    hostname = get_hostname(streaming_link)
+    if not hostname:
+        return None
+    for platform, domains in platform_domains.items():
+        if any(hostname == domain or hostname.endswith(f'.{domain}') for domain in domains):
+            return platform
+    return None
+
+
+def links_per_second(func, links: list, rounds: int = 5) -> float:
+    '''
+    Best of `rounds` runs of func(links), in links per second.
+    '''
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(links)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(links) / best
+
+
+def main(link_count: int = 5000):
+    setup_django()
+
+    from music_app_archive.src.utils import (
+        PLATFORM_DOMAINS,
+        get_hostname,
+        check_streaming_link_platform,
+        canonicalise_streaming_link,
+        classify_streaming_links
+    )
+
+    random.seed(0)
+    links = [
+        random.choice(LINK_TEMPLATES).format(id=''.join(random.choices(ID_CHARACTERS, k=11)))
+        for _ in range(link_count)
+    ]
+    #Pasted collections repeat themselves, a fifth of the batch are repeats
+    links += random.sample(links, link_count // 5)
+    random.shuffle(links)
+    link_count = len(links)
+
+    def legacy_per_link(links):
+        for link in links:
+            if legacy_check_streaming_link_platform(link, PLATFORM_DOMAINS, get_hostname):
+                canonicalise_streaming_link(link)
+
+    def current_per_link(links):
+        for link in links:
+            if check_streaming_link_platform(link):
+                canonicalise_streaming_link(link)
+
+    results = [
+        ("per link, domain scan (before)", links_per_second(legacy_per_link, links)),
+        ("per link, domain lookup", links_per_second(current_per_link, links)),
+        ("classify_streaming_links() (after)", links_per_second(classify_streaming_links, links)),
+    ]
+    for label, rate in results:
+        print(f"{label:<40} links={link_count:<6} {rate:,.0f} links/s")
+    print(f"Speed-up: {results[-1][1] / results[0][1]:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,41 @@
+'''
+Compare the per-call cost of building the YouTube client on every link (old behaviour)
+with the cached client from youtube.get_youtube_client().
+
+No API request is executed, so the numbers isolate client construction + request building.
+
+Run from project_folder:
+    python -m music_app_archive.benchmarks.bench_youtube_client [iterations]
+'''
+import sys
+
+from .utils import setup_django, summarise, time_calls
+
+
+def main(iterations: int = 200):
+    setup_django()
+
+    from googleapiclient.discovery import build
+    from music_app_archive.src.integrations.youtube import get_youtube_client, reset_youtube_client
+
+    api_key = 'benchmark-key'
+
+    def build_per_call():
+        youtube = build("youtube", "v3", developerKey=api_key, static_discovery=True)
+        youtube.videos().list(part="snippet", id="zYta6v1wZiI")
+
+    def cached_client():
+        youtube = get_youtube_client()
+        youtube.videos().list(part="snippet", id="zYta6v1wZiI")
+
+    from django.conf import settings
+    settings.YOUTUBE_API_KEY = api_key
+    reset_youtube_client()
+
+    before = summarise("build() per call (before)", time_calls(build_per_call, iterations))
+    after = summarise("get_youtube_client() (after)", time_calls(cached_client, iterations))
+    print(f"Speed-up (median): {before['median_ms'] / after['median_ms']:.1f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,45 @@
+import os
+import statistics
+import time
+
+
+def setup_django():
+    '''
+    Configure Django so the benchmarks can import the app modules outside of manage.py.
+    '''
+    import django
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'music_app_main.settings')
+    django.setup()
+
+
+def time_calls(func, iterations: int) -> list:
+    '''
+    Call func() `iterations` times and return the per-call latency in milliseconds.
+    '''
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarise(label: str, latencies: list) -> dict:
+    '''
+    Print and return mean / median / p95 for a list of latencies in milliseconds.
+    '''
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(round(len(ordered) * 0.95)) - 1)]
+    summary = {
+        'label': label,
+        'calls': len(ordered),
+        'mean_ms': statistics.mean(ordered),
+        'median_ms': statistics.median(ordered),
+        'p95_ms': p95,
+    }
+    print(
+        f"{label:<40} calls={summary['calls']:<6} "
+        f"mean={summary['mean_ms']:.3f}ms median={summary['median_ms']:.3f}ms p95={summary['p95_ms']:.3f}ms"
+    )
+    return summary
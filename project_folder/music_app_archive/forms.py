@@ -3,7 +3,7 @@ from django.core import exceptions
 from django.forms import ModelForm
 
 from .models import Playlist, Track, StreamingLink
-from .src.utils import check_streaming_link_platform
+from .src.utils import check_streaming_link_platform, canonicalise_streaming_link, supported_platforms_text
 
 
 class CreatePlaylist(ModelForm):
@@ -44,13 +44,6 @@ class AddStreamingLink(forms.Form):
         ('sample', 'Sample')
     )
 
-    PLATFORM_CHOICES = [
-        ('youtube', 'YouTube'),
-        ('youtube_music', 'YouTube Music'),
-        ('bandcamp', 'Bandcamp'),
-        ('soundcloud', 'Soundcloud'),
-    ]
-
     track_type = forms.ChoiceField(choices=TRACK_TYPE, label='Type')
     streaming_link = forms.CharField(label='Link', max_length=500)
 
@@ -61,11 +54,36 @@ class AddStreamingLink(forms.Form):
         
         if not platform:
             raise forms.ValidationError(
-                "URL must be from YouTube, Bandcamp or SoundCloud"
+                f"URL must be from {supported_platforms_text()}"
             )
+
+        #Store and look up links in their canonical form (no tracking params, one host per platform)
+        self.canonical_link = canonicalise_streaming_link(url)
+        if self.canonical_link:
+            return self.canonical_link.url
         return url
 
 
+class ImportCollection(forms.Form):
+    '''
+    Form to import a whole YouTube playlist, SoundCloud set or Bandcamp album into a playlist.
+    '''
+    collection_url = forms.CharField(label='Playlist, set or album link', max_length=500)
+
+    def clean_collection_url(self):
+        #Imported here as collection_import pulls in the integrations
+        from .src.collection_import import parse_collection_url
+
+        url = self.cleaned_data['collection_url']
+
+        self.collection_link = parse_collection_url(url)
+        if not self.collection_link:
+            raise forms.ValidationError(
+                "URL must be a YouTube playlist, SoundCloud set or Bandcamp album"
+            )
+        return self.collection_link.url
+
+
 class AddTrackToPlaylist(ModelForm):
     '''
     The following form 
@@ -103,10 +121,32 @@ class AddStreamingLinkToTrack(ModelForm):
     StreamingLink fields required:
         - streaming_platform
         - streaming_link  
+
+    Validator:
+        - The streaming_link is saved in its canonical form and the streaming_platform is taken from it,
+          so the unique constraint on streaming_link catches the same track pasted in a different format.
     '''
     class Meta:
         model = StreamingLink
         fields = (
             'streaming_platform',
             'streaming_link'
-        ) 
\ No newline at end of file
+        )
+
+    def clean_streaming_link(self):
+        url = self.cleaned_data['streaming_link']
+
+        self.canonical_link = canonicalise_streaming_link(url)
+        if not self.canonical_link:
+            raise forms.ValidationError(
+                f"URL must be a {supported_platforms_text()} track link"
+            )
+        return self.canonical_link.url
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        canonical_link = getattr(self, 'canonical_link', None)
+        if canonical_link:
+            cleaned_data['streaming_platform'] = canonical_link.platform
+        return cleaned_data 
\ No newline at end of file
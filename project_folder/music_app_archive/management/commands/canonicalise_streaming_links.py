@@ -0,0 +1,119 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import StreamingLink
+from ...src.utils import canonicalise_streaming_link
+from ...src.playlist_cache import bump_playlist_versions_for_tracks
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class Command(BaseCommand):
+    '''
+    Rewrite existing StreamingLink rows into their canonical form (see canonicalise_streaming_link()).
+
+    - Walks the table in primary-key order, batch_size rows at a time, and writes each batch with
+      one bulk_update inside its own transaction.
+    - A row whose canonical URL already belongs to another row is left untouched and reported as a
+      collision, so duplicates can be merged by hand.
+    - The platform is only corrected when the track doesn't already have a link on that platform.
+    '''
+    help = "Re-canonicalise StreamingLink.streaming_link (and streaming_platform) for existing rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows read and updated per batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        stats = {'scanned': 0, 'updated': 0, 'unchanged': 0, 'unsupported': 0, 'collisions': 0}
+        last_pk = 0
+
+        while True:
+            batch = list(
+                StreamingLink.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .only('id', 'track_id', 'streaming_platform', 'streaming_link')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            stats['scanned'] += len(batch)
+
+            changed = self.canonicalise_batch(batch, stats)
+
+            if changed and not dry_run:
+                with transaction.atomic():
+                    StreamingLink.objects.bulk_update(changed, ['streaming_link', 'streaming_platform'])
+                    #bulk_update skips the model signals, so invalidate the cached playlist pages here
+                    bump_playlist_versions_for_tracks({streaming_link.track_id for streaming_link in changed})
+            stats['updated'] += len(changed)
+
+        prefix = '[dry run] ' if dry_run else ''
+        summary = ', '.join(f"{name}={count}" for name, count in stats.items())
+        logger.info(f"{prefix}canonicalise_streaming_links finished: {summary}")
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{summary}"))
+
+    def canonicalise_batch(self, batch: list, stats: dict) -> list:
+        '''
+        Work out the new values for one batch. Returns the StreamingLink instances that changed.
+        '''
+        candidates = []
+        for streaming_link in batch:
+            canonical_link = canonicalise_streaming_link(streaming_link.streaming_link)
+            if not canonical_link:
+                stats['unsupported'] += 1
+                continue
+            if (canonical_link.url, canonical_link.platform) == (streaming_link.streaming_link, streaming_link.streaming_platform):
+                stats['unchanged'] += 1
+                continue
+            candidates.append((streaming_link, canonical_link))
+
+        if not candidates:
+            return []
+
+        #Canonical URLs already owned by a row outside this set of candidates
+        candidate_pks = [streaming_link.pk for streaming_link, _ in candidates]
+        taken_urls = set(
+            StreamingLink.objects.filter(streaming_link__in=[canonical_link.url for _, canonical_link in candidates])
+            .exclude(pk__in=candidate_pks)
+            .values_list('streaming_link', flat=True)
+        )
+        #(track, platform) pairs in use, for the unique_track_streaming_platform constraint
+        taken_platforms = set(
+            StreamingLink.objects.filter(track_id__in={streaming_link.track_id for streaming_link, _ in candidates})
+            .values_list('track_id', 'streaming_platform')
+        )
+
+        changed = []
+        for streaming_link, canonical_link in candidates:
+            if canonical_link.url in taken_urls:
+                stats['collisions'] += 1
+                self.stdout.write(
+                    f"Collision: StreamingLink {streaming_link.pk} ({streaming_link.streaming_link}) "
+                    f"canonicalises to {canonical_link.url}, which is already stored"
+                )
+                continue
+            #Two rows in this batch with the same canonical URL: the first one wins
+            taken_urls.add(canonical_link.url)
+
+            if canonical_link.platform != streaming_link.streaming_platform \
+                    and (streaming_link.track_id, canonical_link.platform) not in taken_platforms:
+                taken_platforms.discard((streaming_link.track_id, streaming_link.streaming_platform))
+                taken_platforms.add((streaming_link.track_id, canonical_link.platform))
+                streaming_link.streaming_platform = canonical_link.platform
+
+            if streaming_link.streaming_link == canonical_link.url:
+                #Only the platform differed and it couldn't be changed
+                if streaming_link.streaming_platform != canonical_link.platform:
+                    stats['unchanged'] += 1
+                    continue
+            streaming_link.streaming_link = canonical_link.url
+            changed.append(streaming_link)
+
+        return changed
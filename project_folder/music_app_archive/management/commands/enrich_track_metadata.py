@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from collections import Counter
+import time
+
+from ...models import Track, StreamingLink, CommandCheckpoint
+from ...src.integrations.main_integrations import orchestrate_platform_api_batch
+from ...src.integrations.adapters import get_adapter
+from ...src.playlist_cache import bump_playlist_versions_for_tracks
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#Track fields the command fills in, only where they are empty
+ENRICH_FIELDS = ('album_name', 'record_label', 'genre', 'purchase_link')
+
+#StreamingLink.streaming_platform values per --platform choice
+PLATFORM_CODES = {
+    'bandcamp': ('bandcamp',),
+    'soundcloud': ('soundcloud',),
+    'youtube': ('youtube', 'youtube_music'),
+}
+#When a track has several links, use the platform that knows the most about it
+PLATFORM_PREFERENCE = ('bandcamp', 'soundcloud', 'youtube', 'youtube_music')
+
+#CommandCheckpoint.name of this command's resume point
+CHECKPOINT_NAME = 'enrich_track_metadata'
+
+
+class Command(BaseCommand):
+    '''
+    Fill in empty album_name, record_label, genre and purchase_link on existing Tracks from the
+    platforms of their StreamingLinks.
+
+    - Walks the candidate Tracks in primary-key order (keyset pagination), batch_size at a time,
+      with one query for the batch's StreamingLinks.
+    - Each batch's links go through orchestrate_platform_api_batch(): batch-capable platforms (YouTube,
+      50 videos per call) in one call, the others on --workers threads, so the metadata cache, the
+      platform governors and the job deadline all apply.
+    - Each batch is written with one bulk_update in its own transaction, then the last Track id is
+      stored as the checkpoint (a CommandCheckpoint row, so it outlives a per-process cache), and an
+      interrupted run (or one stopped by --limit) carries on where it stopped. A run that gets through
+      every candidate clears it.
+    - Reports rows per second and the error rate per platform.
+
+    YouTube only knows the title and channel, so it is opt-in (--platform youtube).
+    '''
+    help = "Backfill empty album_name/record_label/genre/purchase_link on Tracks from their streaming links"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Tracks read and updated per batch')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent platform fetches')
+        parser.add_argument(
+            '--platform', action='append', choices=sorted(PLATFORM_CODES), dest='platforms',
+            help='Platform to fetch from (repeatable, default bandcamp and soundcloud)'
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many Tracks')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first Track')
+        parser.add_argument('--dry-run', action='store_true', help='Fetch and report without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        limit = options['limit']
+        platforms = options['platforms'] or ['bandcamp', 'soundcloud']
+        platform_codes = [code for platform in platforms for code in PLATFORM_CODES[platform]]
+
+        last_pk = 0 if options['restart'] else self.load_checkpoint()
+        if last_pk:
+            self.stdout.write(f"Resuming after Track {last_pk}")
+
+        stats = Counter()
+        fetches = Counter()
+        errors = Counter()
+        start = time.monotonic()
+
+        while limit is None or stats['scanned'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - stats['scanned'])
+            batch = list(
+                Track.objects.filter(self.candidate_filter(), pk__gt=last_pk)
+                .order_by('pk')
+                .only('id', 'track_type', *ENRICH_FIELDS)[:size]
+            )
+            if not batch:
+                #Ran out of candidates: the next run starts from the first Track, retrying the ones that failed
+                if not dry_run:
+                    CommandCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+                break
+            last_pk = batch[-1].pk
+            stats['scanned'] += len(batch)
+
+            links = self.pick_links(batch, platform_codes)
+            stats['no_link'] += len(batch) - len(links)
+            results = self.fetch_batch(batch, links, options['workers'], fetches, errors)
+            changed = self.apply_results(batch, results)
+
+            if not dry_run:
+                if changed:
+                    with transaction.atomic():
+                        Track.objects.bulk_update(changed, ENRICH_FIELDS)
+                        #bulk_update skips the model signals, so invalidate the cached playlist pages here
+                        bump_playlist_versions_for_tracks(track.pk for track in changed)
+                CommandCheckpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={'last_pk': last_pk})
+            stats['updated'] += len(changed)
+
+            elapsed = max(time.monotonic() - start, 1e-6)
+            self.stdout.write(
+                f"Track {last_pk}: scanned={stats['scanned']} updated={stats['updated']} "
+                f"({stats['scanned'] / elapsed:.1f} rows/s)"
+            )
+
+        elapsed = max(time.monotonic() - start, 1e-6)
+        prefix = '[dry run] ' if dry_run else ''
+        summary = ', '.join(f"{name}={stats[name]}" for name in ('scanned', 'updated', 'no_link'))
+        summary += f", rows_per_second={stats['scanned'] / elapsed:.1f}"
+        for platform in sorted(fetches):
+            summary += f", {platform}_errors={errors[platform]}/{fetches[platform]} ({errors[platform] / fetches[platform]:.0%})"
+        logger.info(f"{prefix}enrich_track_metadata finished: {summary}")
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{summary}"))
+
+    def load_checkpoint(self) -> int:
+        '''
+        The last Track id a previous run finished, or 0.
+        '''
+        checkpoint = CommandCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list('last_pk', flat=True).first()
+        return checkpoint or 0
+
+    def candidate_filter(self) -> Q:
+        '''
+        Tracks with at least one of ENRICH_FIELDS empty.
+        '''
+        condition = Q()
+        for field in ENRICH_FIELDS:
+            condition |= Q(**{field: ''})
+        return condition
+
+    def pick_links(self, batch: list, platform_codes: list) -> dict:
+        '''
+        One query for the batch's StreamingLinks. Returns {track_id: (streaming_platform, streaming_link)}
+        with the preferred platform for each track.
+        '''
+        links = {}
+        rows = StreamingLink.objects.filter(
+            track_id__in=[track.pk for track in batch],
+            streaming_platform__in=platform_codes
+        ).values_list('track_id', 'streaming_platform', 'streaming_link')
+        for track_id, streaming_platform, streaming_link in rows:
+            current = links.get(track_id)
+            if current is None or PLATFORM_PREFERENCE.index(streaming_platform) < PLATFORM_PREFERENCE.index(current[0]):
+                links[track_id] = (streaming_platform, streaming_link)
+        return links
+
+    def fetch_batch(self, batch: list, links: dict, workers: int, fetches: Counter, errors: Counter) -> dict:
+        '''
+        Fetch the metadata for the batch's links, one orchestrate_platform_api_batch() per track type.
+        Returns {track_id: meta_data_dict} for the successes and counts fetches and errors per platform.
+        '''
+        track_types = {track.pk: track.track_type for track in batch}
+        links_by_type = {}
+        for track_id, (streaming_platform, streaming_link) in links.items():
+            links_by_type.setdefault(track_types[track_id], []).append(streaming_link)
+
+        fetched = {}
+        for track_type, streaming_links in links_by_type.items():
+            fetched.update(orchestrate_platform_api_batch(
+                streaming_links, track_type, deadline_seconds=settings.METADATA_JOB_DEADLINE_SECONDS, max_workers=workers
+            ))
+
+        results = {}
+        for track_id, (streaming_platform, streaming_link) in links.items():
+            platform = get_adapter(streaming_platform).platform
+            fetches[platform] += 1
+            meta_data_dict = fetched.get(streaming_link)
+            if isinstance(meta_data_dict, dict):
+                results[track_id] = meta_data_dict
+            else:
+                errors[platform] += 1
+                logger.warning(f"Could not enrich Track {track_id} from {streaming_link}: {meta_data_dict}")
+        return results
+
+    def apply_results(self, batch: list, results: dict) -> list:
+        '''
+        Copy fetched values into empty fields. Returns the Tracks that changed.
+        Values that don't fit the field are left out.
+        '''
+        changed = []
+        for track in batch:
+            meta_data_dict = results.get(track.pk)
+            if not meta_data_dict:
+                continue
+            updated = False
+            for field in ENRICH_FIELDS:
+                value = (meta_data_dict.get(field) or '').strip()
+                if getattr(track, field) or not value or len(value) > Track._meta.get_field(field).max_length:
+                    continue
+                setattr(track, field, value)
+                updated = True
+            if updated:
+                changed.append(track)
+        return changed
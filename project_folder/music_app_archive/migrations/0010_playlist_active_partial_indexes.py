@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_app_archive', '0009_alter_streaminglink_streaming_platform'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playlist',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['owner', '-date_created'], name='playlist_owner_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playlisttrack',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['playlist', 'added_at'], name='playlist_track_active_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('music_app_archive', '0010_playlist_active_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommandCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_pk', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Command Checkpoint',
+                'verbose_name_plural': 'Command Checkpoints',
+            },
+        ),
+    ]
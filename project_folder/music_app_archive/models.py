@@ -7,6 +7,8 @@ from django.conf import settings
 
 import uuid
 
+from .src.utils import StreamingPlatformChoices, STREAMING_PLATFORM_ALIASES, PLATFORM_DOMAINS
+
 
 # Create your models here.
 class Playlist(models.Model):
@@ -75,6 +77,12 @@ class Playlist(models.Model):
             models.Index(
                 fields = ['is_private', 'is_deleted', '-date_created'],
                 name='playlist_public_feed_idx'
+            ),
+            #Overview of a user's live playlists (user_playlists), deleted rows left out of the index
+            models.Index(
+                fields=['owner', '-date_created'],
+                name='playlist_owner_active_idx',
+                condition=models.Q(is_deleted=False)
             )
         ]
 
@@ -153,14 +161,9 @@ class StreamingLink(models.Model):
     '''
     The following model contains all of the streaming information relating to a track, mix or sample that a user has posted or added to Playlists.
 
-    Refer to PLATFORM_CHOICES for the platforms that are supported.
+    The supported platforms are the registered platform adapters (see src/integrations/adapters.py).
     '''
-    PLATFORM_CHOICES = [
-        ('youtube', 'YouTube'),
-        ('youtube_music', 'YouTube Music'),
-        ('bandcamp', 'Bandcamp'),
-        ('soundcloud', 'SoundCloud')
-        ]
+    PLATFORM_CHOICES = StreamingPlatformChoices()
 
     track = models.ForeignKey(
         to='Track',
@@ -196,14 +199,8 @@ class StreamingLink(models.Model):
         '''
         Validate URL matches the selected platform
         '''
-        platform_domains = {
-            'youtube': ['youtube.com'],
-            'youtube_music': ['music.youtube.com'],
-            'bandcamp': ['bandcamp.com'],
-            'soundcloud': ['soundcloud.com']
-        }
-
-        domain_list = platform_domains.get(self.streaming_platform, [])
+        platform = STREAMING_PLATFORM_ALIASES.get(self.streaming_platform)
+        domain_list = PLATFORM_DOMAINS.get(platform, [])
         if domain_list and not any(domain in self.streaming_link.lower() for domain in domain_list):
             raise ValidationError({
                 'streaming_link': f"URL doesn't appear to be from {self.get_streaming_platform_display()}"
@@ -280,10 +277,33 @@ class PlaylistTrack(models.Model):
                 models.Index(
                     fields=['track'], #We want the user's to search within their playlists.
                     name='track_idx'
-                )            
+                ),
+                #Track count and last activity per playlist (playlist overview), removed rows left out of the index
+                models.Index(
+                    fields=['playlist', 'added_at'],
+                    name='playlist_track_active_idx',
+                    condition=models.Q(is_deleted=False)
+                )
                 ]
 
         ordering = ['playlist', 'position']
 
     def __str__(self):
-        return f"{self.playlist_id} - {self.track_id} @ {self.position}"
\ No newline at end of file
+        return f"{self.playlist_id} - {self.track_id} @ {self.position}"
+
+
+class CommandCheckpoint(models.Model):
+    '''
+    The last primary key a resumable management command (e.g. enrich_track_metadata) has finished,
+    kept in the database so an interrupted run can carry on from it whatever cache backend is configured.
+    '''
+    name = models.CharField(max_length=100, unique=True)
+    last_pk = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, editable=False)
+
+    class Meta:
+        verbose_name = 'Command Checkpoint'
+        verbose_name_plural = 'Command Checkpoints'
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_pk}"
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Playlist, PlaylistTrack, Track, StreamingLink
+from .src.playlist_cache import bump_playlist_versions, bump_playlist_versions_for_tracks
+
+
+#Invalidate the cached playlist fragments (src/playlist_cache.py) on every write to what they show.
+#Bulk writes don't send these signals, their callers bump the versions themselves.
+
+@receiver([post_save, post_delete], sender=Playlist)
+def playlist_changed(sender, instance, **kwargs):
+    bump_playlist_versions([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=PlaylistTrack)
+def playlist_track_changed(sender, instance, **kwargs):
+    bump_playlist_versions([instance.playlist_id])
+
+
+@receiver([post_save, post_delete], sender=Track)
+def track_changed(sender, instance, created=False, **kwargs):
+    #A new Track isn't in any playlist yet
+    if not created:
+        bump_playlist_versions_for_tracks([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=StreamingLink)
+def streaming_link_changed(sender, instance, **kwargs):
+    bump_playlist_versions_for_tracks([instance.track_id])
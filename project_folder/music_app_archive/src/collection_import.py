@@ -0,0 +1,290 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from collections import namedtuple
+from urllib.parse import urlparse, parse_qs
+
+from ..models import Playlist, Track, StreamingLink, PlaylistTrack
+from .integrations.youtube import get_youtube_playlist_video_ids, get_youtube_metadata_batch
+from .integrations.soundcloud import get_soundcloud_set_meta_data_dicts
+from .integrations.bandcamp import get_bandcamp_album_meta_data_dicts
+from .integrations.governor import get_governor
+from .utils import check_streaming_link_platform, canonicalise_streaming_link, classify_streaming_link, classify_streaming_links, normalise_streaming_url
+from .playlist_cache import bump_playlist_versions
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#A collection URL we know how to expand: the platform and its id (YouTube playlist id, or the URL itself)
+CollectionLink = namedtuple('CollectionLink', ['url', 'platform', 'collection_id'])
+
+#Track fields copied from a meta_data_dict, with the model's max_length
+TRACK_FIELD_LENGTHS = {
+    'track_name': 250,
+    'artist': 250,
+    'album_name': 250,
+    'mix_page': 250,
+    'record_label': 250,
+    'genre': 250,
+}
+PURCHASE_LINK_MAX_LENGTH = Track._meta.get_field('purchase_link').max_length
+#Links per query when searching for stored links by platform id
+EXISTING_LINK_LOOKUP_CHUNK = 100
+
+
+def parse_collection_url(collection_url: str) -> CollectionLink:
+    '''
+    Recognise a YouTube playlist, SoundCloud set or Bandcamp album URL.
+    Returns a CollectionLink or None if the URL isn't a collection we can import.
+    '''
+    platform = check_streaming_link_platform(collection_url)
+    if not platform:
+        return None
+
+    parsed_url = urlparse(normalise_streaming_url(collection_url))
+    path = parsed_url.path.rstrip('/')
+
+    if platform == 'youtube':
+        playlist_id = parse_qs(parsed_url.query).get('list', [''])[0]
+        if playlist_id:
+            return CollectionLink(f"https://www.youtube.com/playlist?list={playlist_id}", platform, playlist_id)
+    elif platform == 'soundcloud' and '/sets/' in path:
+        canonical_link = canonicalise_streaming_link(collection_url)
+        return CollectionLink(canonical_link.url, platform, canonical_link.platform_id)
+    elif platform == 'bandcamp' and path.startswith('/album/'):
+        canonical_link = canonicalise_streaming_link(collection_url)
+        return CollectionLink(canonical_link.url, platform, canonical_link.platform_id)
+    return None
+
+
+def expand_collection(collection_link: CollectionLink, track_type: str, max_items: int) -> dict:
+    '''
+    Turn a collection into {streaming_link: meta_data_dict or platform error}, in collection order.
+
+    - YouTube: playlistItems pages, then get_youtube_metadata_batch() (50 videos per call).
+    - SoundCloud: one /resolve call, track details come embedded in the set.
+    - Bandcamp: one album page fetch, track details come from its JSON-LD.
+
+    The expansion counts as one call against the platform's governor.
+    '''
+    with get_governor(collection_link.platform).call():
+        return fetch_collection(collection_link, track_type, max_items)
+
+
+def fetch_collection(collection_link: CollectionLink, track_type: str, max_items: int) -> dict:
+    '''
+    Platform calls behind expand_collection().
+    '''
+    if collection_link.platform == 'youtube':
+        video_ids = get_youtube_playlist_video_ids(collection_link.collection_id, max_items)
+        batch = get_youtube_metadata_batch(video_ids)
+
+        results = {}
+        for video_id in video_ids:
+            streaming_link = f"https://www.youtube.com/watch?v={video_id}"
+            meta_data_dict = batch[video_id]
+            if isinstance(meta_data_dict, dict):
+                meta_data_dict = dict(
+                    meta_data_dict,
+                    track_type=track_type,
+                    streaming_platform='youtube',
+                    streaming_link=streaming_link
+                )
+            results[streaming_link] = meta_data_dict
+        return results
+
+    if collection_link.platform == 'soundcloud':
+        return get_soundcloud_set_meta_data_dicts(collection_link.url, track_type, max_items)
+
+    return get_bandcamp_album_meta_data_dicts(collection_link.url, track_type, max_items)
+
+
+def build_track(meta_data_dict: dict, track_type: str, user) -> Track:
+    '''
+    Unsaved Track for a meta_data_dict, with values trimmed to fit the model.
+    '''
+    values = {
+        field: (meta_data_dict.get(field) or '').strip()[:max_length]
+        for field, max_length in TRACK_FIELD_LENGTHS.items()
+    }
+    purchase_link = meta_data_dict.get('purchase_link') or ''
+    return Track(
+        track_type=track_type,
+        purchase_link=purchase_link if len(purchase_link) <= PURCHASE_LINK_MAX_LENGTH else '',
+        created_by=user,
+        **values
+    )
+
+
+def find_existing_track_ids(to_import: dict) -> dict:
+    '''
+    Map the canonical links of to_import ({canonical streaming_link: (platform, meta_data_dict, platform_id)})
+    to the Track of the StreamingLink already stored for them.
+
+    Rows saved before links were canonicalised (youtu.be/X, ?si=..., trailing slashes) don't equal the
+    canonical link, so rows containing the platform id are read and compared on their canonical form.
+    '''
+    canonical_links = list(to_import)
+    existing_track_ids = {}
+    for start in range(0, len(canonical_links), EXISTING_LINK_LOOKUP_CHUNK):
+        chunk = canonical_links[start:start + EXISTING_LINK_LOOKUP_CHUNK]
+        query = Q(streaming_link__in=chunk)
+        for streaming_link in chunk:
+            #The last segment of the platform id (video id, track slug) appears in any form of the link
+            query |= Q(streaming_link__icontains=to_import[streaming_link][2].rsplit('/', 1)[-1])
+
+        for stored_link, track_id in StreamingLink.objects.filter(query).values_list('streaming_link', 'track_id'):
+            canonical_link = stored_link if stored_link in to_import else classify_streaming_link(stored_link).canonical_url
+            if canonical_link not in to_import:
+                continue
+            #A row already in the canonical form wins over legacy duplicates
+            if stored_link == canonical_link or canonical_link not in existing_track_ids:
+                existing_track_ids[canonical_link] = track_id
+    return existing_track_ids
+
+
+def import_collection_into_playlist(playlist: Playlist, user, collection_link: CollectionLink, track_type: str, progress=None) -> dict:
+    '''
+    Import every item of a collection into a playlist.
+
+    1. Expand the collection and fetch the metadata in batches (see expand_collection()).
+    2. Re-use the Track of any link that is already stored (see find_existing_track_ids()); skip tracks
+       already in the playlist.
+    3. In one transaction: bulk_create the new Track, StreamingLink and PlaylistTrack rows and restore
+       the rows of tracks that were removed from the playlist (unique_playlist_track covers removed rows),
+       with contiguous positions assigned after the playlist's current maximum. A link another import
+       stored in the meantime is skipped on insert and its Track re-used.
+
+    progress(stage, done, total) is called as the import moves along.
+    Returns a summary dict, including the per-item failures.
+    '''
+    def report(stage, done, total):
+        if progress:
+            progress(stage, done, total)
+
+    max_items = settings.COLLECTION_IMPORT_MAX_ITEMS
+    report('expanding', 0, 0)
+    items = expand_collection(collection_link, track_type, max_items)
+    report('matching', 0, len(items))
+
+    failed = []
+    #canonical streaming_link -> (platform, meta_data_dict, platform_id)
+    to_import = {}
+    for classification, meta_data_dict in zip(classify_streaming_links(items), items.values()):
+        streaming_link = classification.url
+        if not isinstance(meta_data_dict, dict):
+            failed.append({'streaming_link': streaming_link, 'error': str(meta_data_dict)})
+            continue
+        if classification.rejection_reason:
+            failed.append({'streaming_link': streaming_link, 'error': "Unsupported streaming link"})
+            continue
+        if not meta_data_dict.get('track_name') or not meta_data_dict.get('artist'):
+            failed.append({'streaming_link': streaming_link, 'error': "Missing track name or artist"})
+            continue
+        to_import.setdefault(
+            classification.canonical_url, (classification.platform, meta_data_dict, classification.platform_id)
+        )
+
+    #Links we already know about point at an existing Track
+    existing_track_ids = find_existing_track_ids(to_import)
+
+    with transaction.atomic():
+        #Serialise imports into the same playlist so the positions stay contiguous
+        Playlist.objects.select_for_update().filter(pk=playlist.pk).first()
+
+        #Rows of known tracks in this playlist: live ones are skipped, removed ones are brought back
+        in_playlist = set()
+        removed_rows = {}
+
+        def read_playlist_rows(track_ids):
+            for playlist_track in (
+                PlaylistTrack.objects.filter(playlist=playlist, track_id__in=track_ids)
+                .only('id', 'track_id', 'is_deleted')
+            ):
+                if playlist_track.is_deleted:
+                    removed_rows[playlist_track.track_id] = playlist_track
+                else:
+                    in_playlist.add(playlist_track.track_id)
+
+        read_playlist_rows(existing_track_ids.values())
+
+        new_links = [streaming_link for streaming_link in to_import if streaming_link not in existing_track_ids]
+        new_tracks = Track.objects.bulk_create(
+            [build_track(to_import[streaming_link][1], track_type, user) for streaming_link in new_links],
+            batch_size=500
+        )
+        #A concurrent import may have stored some of these links since the lookup: skip them on insert
+        #rather than abort the transaction, then read back which Track each link belongs to
+        StreamingLink.objects.bulk_create(
+            [
+                StreamingLink(
+                    track=track,
+                    streaming_platform=to_import[streaming_link][0],
+                    streaming_link=streaming_link,
+                    added_by=user
+                )
+                for streaming_link, track in zip(new_links, new_tracks)
+            ],
+            batch_size=500,
+            ignore_conflicts=True
+        )
+        new_track_ids = dict(
+            StreamingLink.objects.filter(streaming_link__in=new_links).values_list('streaming_link', 'track_id')
+        ) if new_links else {}
+        #Tracks whose link lost the race are re-used from the other import, drop ours
+        orphan_track_ids = [
+            track.pk for streaming_link, track in zip(new_links, new_tracks)
+            if new_track_ids.get(streaming_link) != track.pk
+        ]
+        if orphan_track_ids:
+            Track.objects.filter(pk__in=orphan_track_ids).delete()
+            new_tracks = [track for track in new_tracks if track.pk not in orphan_track_ids]
+            read_playlist_rows(set(new_track_ids.values()) - {track.pk for track in new_tracks})
+
+        #Keep the collection's order; skip tracks already in the playlist (or listed twice)
+        track_ids_to_add = []
+        for streaming_link in to_import:
+            track_id = new_track_ids.get(streaming_link) or existing_track_ids[streaming_link]
+            if track_id in in_playlist:
+                continue
+            in_playlist.add(track_id)
+            track_ids_to_add.append(track_id)
+
+        max_position = PlaylistTrack.objects.filter(playlist=playlist).aggregate(Max('position'))['position__max'] or 0
+        added_at = timezone.now()
+        new_rows = []
+        restored_rows = []
+        for offset, track_id in enumerate(track_ids_to_add, start=1):
+            playlist_track = removed_rows.get(track_id)
+            if playlist_track is None:
+                new_rows.append(PlaylistTrack(playlist=playlist, track_id=track_id, added_by=user, position=max_position + offset))
+                continue
+            playlist_track.is_deleted = False
+            playlist_track.position = max_position + offset
+            playlist_track.added_by = user
+            playlist_track.added_at = added_at
+            restored_rows.append(playlist_track)
+        PlaylistTrack.objects.bulk_create(new_rows, batch_size=500)
+        PlaylistTrack.objects.bulk_update(restored_rows, ['is_deleted', 'position', 'added_by', 'added_at'], batch_size=500)
+        #bulk_create and bulk_update skip the model signals, so invalidate the playlist's cached pages here
+        bump_playlist_versions([playlist.pk])
+        report('saving', len(track_ids_to_add), len(items))
+
+    summary = {
+        'total': len(items),
+        'added': len(track_ids_to_add),
+        'restored': len(restored_rows),
+        'tracks_created': len(new_tracks),
+        'tracks_reused': len(to_import) - len(new_tracks),
+        'skipped': len(to_import) - len(track_ids_to_add),
+        'failed': failed,
+    }
+    logger.info(
+        f"Imported {collection_link.url} into playlist {playlist.pk}: "
+        f"{summary['added']} added, {summary['skipped']} skipped, {len(failed)} failed"
+    )
+    return summary
@@ -20,4 +20,24 @@ class SoundcloudMetaDataError(Exception):
     '''
     Custom exception for Soundcloud metadata extraction errors
     '''
-    pass
\ No newline at end of file
+    pass
+
+class PlatformUnavailableError(OrchestratePlatformMetaDataError):
+    '''
+    Raised without calling the platform when its governor is protecting it
+    (circuit breaker open, rate limit or in-flight limit reached)
+    '''
+    def __init__(self, message: str, platform: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.platform = platform
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(OrchestratePlatformMetaDataError):
+    '''
+    Raised when a metadata extraction runs out of its time budget (see src/deadline.py).
+    partial_meta_data_dict holds whatever metadata was gathered before the deadline
+    '''
+    def __init__(self, message: str, partial_meta_data_dict: dict = None):
+        super().__init__(message)
+        self.partial_meta_data_dict = partial_meta_data_dict or {}
@@ -0,0 +1,47 @@
+import time
+
+from .custom_exceptions import DeadlineExceededError
+
+
+class Deadline:
+    '''
+    Time budget for one metadata extraction, created by the view (or job) and passed down through
+    every platform adapter and HTTP call so each step only spends what is left.
+
+        deadline = Deadline(settings.METADATA_DEADLINE_SECONDS)
+        requests.get(url, timeout=deadline.timeout(10))
+        deadline.check("SoundCloud token refresh")
+    '''
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float = None) -> float:
+        '''
+        Seconds a single step may take: what is left of the budget, capped at the step's own timeout.
+        '''
+        remaining = self.remaining()
+        return remaining if cap is None else min(remaining, cap)
+
+    def check(self, step: str):
+        '''
+        Raise DeadlineExceededError before starting `step` if the budget is already spent.
+        '''
+        if self.expired():
+            raise DeadlineExceededError(f"Ran out of the {self.budget}s metadata budget before {step}")
+
+    def __repr__(self):
+        return f"Deadline(budget={self.budget}, remaining={self.remaining():.3f})"
+
+
+def deadline_timeout(deadline: Deadline, cap: float) -> float:
+    '''
+    cap, or less if a deadline is given and has less than cap left.
+    '''
+    return cap if deadline is None else deadline.timeout(cap)
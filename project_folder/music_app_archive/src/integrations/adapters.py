@@ -0,0 +1,108 @@
+from abc import ABC, abstractmethod
+import threading
+
+from ..deadline import Deadline
+from ..utils import register_platform, unregister_platform, canonicalise_permalink, CanonicalStreamingLink, STREAMING_PLATFORM_ALIASES
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class PlatformAdapter(ABC):
+    '''
+    How the orchestrator talks to one streaming platform.
+
+    Subclasses set `platform` (the check_streaming_link_platform() value, also the governor and
+    metadata cache name), implement fetch() and set the capability flags the orchestrator uses to
+    pick the cheapest path:
+
+    - supports_batch: fetch_batch() gets many links in fewer upstream calls than one fetch() each
+    - needs_browser: fetch() may borrow a session from the Selenium browser pool
+
+    Registering the adapter adds the platform to the registry in utils.py: its `domains` to the link
+    lookup, its `streaming_platforms` ({StreamingLink.streaming_platform code: display name}, defaults
+    to {platform: display_name}) to the model choices and error messages, and canonicalise() to
+    canonicalise_streaming_link(). So a new platform only needs an adapter and a register_adapter() call.
+    '''
+    platform = None
+    display_name = None
+    streaming_platforms = {}
+    domains = ()
+    supports_batch = False
+    needs_browser = False
+
+    @abstractmethod
+    def fetch(self, streaming_url: str, track_type: str, deadline: Deadline = None) -> dict:
+        '''
+        Return the meta_data_dict for one link, raising the platform's error if it can't.
+        '''
+
+    def fetch_batch(self, streaming_urls: list, track_type: str, deadline: Deadline = None) -> dict:
+        '''
+        Return {streaming_url: meta_data_dict} with the exception in place of the dict for every link that failed.
+        '''
+        results = {}
+        for streaming_url in streaming_urls:
+            try:
+                results[streaming_url] = self.fetch(streaming_url, track_type, deadline=deadline)
+            except Exception as e:
+                results[streaming_url] = e
+        return results
+
+    def canonicalise(self, parsed_url, hostname: str) -> CanonicalStreamingLink:
+        '''
+        Canonical form of a link on this platform (see canonicalise_streaming_link()), or None.
+        Platforms that identify a track by its path can keep the default.
+        '''
+        return canonicalise_permalink(parsed_url, hostname, self.platform)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.platform}>"
+
+
+_adapters = {}
+_adapters_lock = threading.Lock()
+
+
+def register_adapter(adapter: PlatformAdapter) -> PlatformAdapter:
+    '''
+    Register (or replace) the adapter for adapter.platform and add the platform to the registry.
+    '''
+    if not adapter.platform:
+        raise ValueError(f"{type(adapter).__name__} has no platform")
+    streaming_platforms = adapter.streaming_platforms or {adapter.platform: adapter.display_name or adapter.platform}
+    with _adapters_lock:
+        _adapters[adapter.platform] = adapter
+        register_platform(adapter.platform, adapter.domains, streaming_platforms, adapter.canonicalise)
+    logger.info(f"Registered platform adapter {adapter!r}")
+    return adapter
+
+
+def unregister_adapter(platform: str):
+    '''
+    Remove a platform's adapter and registry entries (used by tests).
+    '''
+    with _adapters_lock:
+        _adapters.pop(platform, None)
+        unregister_platform(platform)
+
+
+def get_adapter(platform: str) -> PlatformAdapter:
+    '''
+    Return the adapter for a platform or a StreamingLink.streaming_platform code (e.g. youtube_music).
+    Raises ValueError for a platform nobody has registered.
+    '''
+    adapter = _adapters.get(STREAMING_PLATFORM_ALIASES.get(platform, platform))
+    if adapter is None:
+        raise ValueError(f"Unsupported platform: {platform}")
+    return adapter
+
+
+def get_adapters() -> dict:
+    '''
+    Return {platform: adapter} for every registered adapter.
+    '''
+    with _adapters_lock:
+        return dict(_adapters)
@@ -1,28 +1,172 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import requests
 
+from django.conf import settings
+
+import json
 import time
 import random
 import logging
 import os
 
+from . import http_client
 from ..custom_exceptions import BandCampMetaDataError
+from ..deadline import Deadline
 
 
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+#lxml is several times faster than the pure-Python html.parser, use it whenever it is installed
+try:
+    import lxml  # noqa: F401
+    BANDCAMP_HTML_PARSER = "lxml"
+except ImportError:
+    BANDCAMP_HTML_PARSER = "html.parser"
+
+#Only build the parts of the page the scraper reads, the rest of the HTML is skipped while parsing
+NAME_SECTION_STRAINER = SoupStrainer("div", id="name-section")
+JSON_LD_STRAINER = SoupStrainer("script", type="application/ld+json")
+TITLE_STRAINER = SoupStrainer("title")
+
+#Headers for the plain HTTP fetch, Bandcamp serves the same server-rendered HTML to browsers
+BANDCAMP_REQUEST_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (X11; Linux x86_64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/122.0.0.0 Safari/537.36'
+    ),
+    'Accept': 'text/html,application/xhtml+xml',
+    'Accept-Language': 'en-GB,en;q=0.9',
+}
+
+
+def parse_bandcamp_html(html, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    '''
+    Parse raw Bandcamp HTML (bytes or str), keeping only what parse_only matches.
+    '''
+    return BeautifulSoup(html, BANDCAMP_HTML_PARSER, parse_only=parse_only)
+
+
+def get_bandcamp_static_html(bandcamp_url: str, deadline: Deadline = None) -> bytes:
+    '''
+    Fetch a Bandcamp page with a plain HTTP request (no browser) and return the raw HTML bytes.
+    Raises BandCampMetaDataError on any HTTP failure so the caller can fall back to the browser.
+    '''
+    try:
+        response = http_client.get(
+            bandcamp_url,
+            headers=BANDCAMP_REQUEST_HEADERS,
+            timeout=(settings.HTTP_CLIENT_CONNECT_TIMEOUT, settings.BANDCAMP_STATIC_FETCH_TIMEOUT),
+            deadline=deadline
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Static fetch failed for Bandcamp URL {bandcamp_url}: {e}")
+        raise BandCampMetaDataError(f"Static fetch failed: {str(e)}") from e
+
+    return response.content
 
-def scrape_bandcamp_page(soup: BeautifulSoup) -> list:
+
+def scrape_bandcamp_json_ld(soup: BeautifulSoup) -> list:
+    '''
+    Read track_name, artist_name and album_name from the application/ld+json block that
+    Bandcamp embeds in the server-rendered HTML.
+    Returns None if there is no usable JSON-LD block.
+    '''
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            json_ld = json.loads(script.string or "")
+        except ValueError:
+            logger.debug("Skipping unparseable JSON-LD block")
+            continue
+
+        if not isinstance(json_ld, dict) or not json_ld.get("name"):
+            continue
+
+        by_artist = json_ld.get("byArtist") or {}
+        in_album = json_ld.get("inAlbum") or {}
+
+        track_name = json_ld.get("name")
+        artist_name = by_artist.get("name") if isinstance(by_artist, dict) else None
+        album_name = in_album.get("name") if isinstance(in_album, dict) else None
+
+        return [track_name, artist_name, album_name]
+
+    return None
+
+
+def get_bandcamp_album_meta_data_dicts(album_url: str, track_type: str, max_items: int) -> dict:
+    '''
+    Fetch a Bandcamp album page once and build the meta_data_dict of each track from the album's
+    JSON-LD block (MusicAlbum -> track.itemListElement), so the track pages aren't scraped one by one.
+
+    Returns {track_url: meta_data_dict}, in album order.
+    Raises BandCampMetaDataError if the page can't be fetched or has no track list.
+    '''
+    soup = parse_bandcamp_html(get_bandcamp_static_html(album_url), parse_only=JSON_LD_STRAINER)
+
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            json_ld = json.loads(script.string or "")
+        except ValueError:
+            continue
+        if not isinstance(json_ld, dict) or not isinstance(json_ld.get("track"), dict):
+            continue
+
+        album_name = json_ld.get("name") or ""
+        by_artist = json_ld.get("byArtist") or {}
+        album_artist = by_artist.get("name") if isinstance(by_artist, dict) else None
+
+        results = {}
+        for list_item in json_ld["track"].get("itemListElement", [])[:max_items]:
+            item = list_item.get("item") or {}
+            track_url = item.get("@id") or item.get("url")
+            if not track_url:
+                continue
+            item_artist = item.get("byArtist") or {}
+            results[track_url] = {
+                'track_type': track_type,
+                'track_name': item.get("name"),
+                'artist': (item_artist.get("name") if isinstance(item_artist, dict) else None) or album_artist,
+                'album_name': album_name,
+                'purchase_link': track_url,
+                'mix_page': "",
+                'record_label': "",
+                'genre': "",
+                'streaming_platform': "bandcamp",
+                'streaming_link': track_url,
+            }
+        return results
+
+    raise BandCampMetaDataError(f"Could not find the album track list for {album_url}")
+
+
+def scrape_bandcamp_page(page) -> list:
     '''
     Scrape bandcamp HTML to get the following:
         - track_name
         - artist_name
         - album_name
+
+    page is the raw HTML (bytes or str), which is parsed with NAME_SECTION_STRAINER, or an
+    already parsed BeautifulSoup.
+    Falls back to the JSON-LD block if #name-section is missing.
     '''
+    if isinstance(page, BeautifulSoup):
+        soup = page
+    else:
+        soup = parse_bandcamp_html(page, parse_only=NAME_SECTION_STRAINER)
+
     #Anchor to specific section in the HTML page
     name_section = soup.find("div", id="name-section")
     if not name_section:
+        #Raw HTML was strained to the name section, so parse the JSON-LD scripts separately
+        json_ld_soup = soup if isinstance(page, BeautifulSoup) else parse_bandcamp_html(page, parse_only=JSON_LD_STRAINER)
+        json_ld_information = scrape_bandcamp_json_ld(json_ld_soup)
+        if json_ld_information:
+            return json_ld_information
         raise BandCampMetaDataError("Could not find #name-section")
 
     #Get track_name
@@ -55,22 +199,36 @@ def scrape_bandcamp_page(soup: BeautifulSoup) -> list:
     return bandcamp_page_information
 
 
-def orchestrate_bandcamp_meta_data_dictionary(soup: BeautifulSoup, bandcamp_url: str) -> dict:
+def scrape_bandcamp_title(page) -> dict:
+    '''
+    Best-effort track_name and artist from the page <title> ("Track | Artist"), which is in the
+    first bytes the browser receives. Used as partial metadata when the deadline runs out before
+    the rest of the page has rendered. Returns {} if the title is missing or doesn't match.
+    '''
+    if not page:
+        return {}
+    title = parse_bandcamp_html(page, parse_only=TITLE_STRAINER).find("title")
+    if not title:
+        return {}
+    parts = [part.strip() for part in title.get_text().split(" | ")]
+    if len(parts) < 2 or not parts[0] or not parts[1]:
+        return {}
+    return {'track_name': parts[0], 'artist': parts[1]}
+
+
+def orchestrate_bandcamp_meta_data_dictionary(page, bandcamp_url: str) -> dict:
     '''
     The following function is the orchestration module to generate the meta_data_dictionary for 
     Bandcamp links.
 
     Order of operations:
-        - It gets the soup object
+        - It gets the raw page HTML (or a soup object)
         - Scrapes the BandCamp HTML to get the meta data
         - Generate the meta data dictionary
     '''
     try:
-        # #Get Bandcamp Soup object
-        # bandcamp_soup = get_soup(bandcamp_url)
-
         #Scrape BandCamp page to get song information
-        bandcamp_page_information = scrape_bandcamp_page(soup)
+        bandcamp_page_information = scrape_bandcamp_page(page)
 
         #Generate bandcamp_meta_data_dict
         bandcamp_meta_data_dict = {
@@ -0,0 +1,407 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+
+from django.conf import settings
+
+from contextlib import contextmanager
+import atexit
+import queue
+import threading
+import time
+import os
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+#Resources the scrapers never read, blocked over CDP even when served from an allowed host
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.css',
+    '*.mp3', '*.mp4', '*.m4a', '*.ogg', '*.webm',
+]
+
+
+def build_chrome_options() -> Options:
+    '''
+    Build the Chrome options used for every scraping session.
+
+    This function:
+    - runs Chrome headless with realistic browser fingerprinting
+    - applies the anti-detection switches
+    - applies the resource-blocking scraping profile when SELENIUM_BLOCK_RESOURCES is set
+    '''
+    #Configure Chrome options for stealth
+    chrome_options = Options()
+
+    #Headless mode
+    chrome_options.add_argument('--headless=new')
+
+    #Essential arguments to avoid detection
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    #Realistic window size
+    chrome_options.add_argument('--window-size=1920,1080')
+
+    #Set realistic user agent
+    chrome_options.add_argument(
+        'user-agent=Mozilla/5.0 (X11; Linux x86_64) '
+        'AppleWebKit/537.36 (KHTML, like Gecko) '
+        'Chrome/122.0.0.0 Safari/537.36'
+    )
+
+    #Additional privacy/security options
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--lang=en-GB')
+
+    if settings.SELENIUM_BLOCK_RESOURCES:
+        apply_scraping_profile(chrome_options)
+
+    return chrome_options
+
+
+def build_host_resolver_rules(allowed_hosts: list) -> str:
+    '''
+    --host-resolver-rules value that fails DNS for every host except allowed_hosts
+    (entries may use a leading wildcard, e.g. *.bandcamp.com).
+    '''
+    rules = ['MAP * ~NOTFOUND'] + [f"EXCLUDE {host}" for host in allowed_hosts]
+    return ', '.join(rules)
+
+
+def apply_scraping_profile(chrome_options: Options) -> Options:
+    '''
+    Strip a page down to the HTML our scrapers read.
+
+    This function:
+    - returns from driver.get() at DOMContentLoaded ('eager'), get_page_source then waits for
+      the platform's readiness selector
+    - turns off images, audio/video autoplay and notifications through Chrome prefs
+    - only resolves SELENIUM_ALLOWED_HOSTS, so CDNs (images, fonts, stylesheets, audio previews)
+      and third-party trackers are never fetched
+    Fonts and stylesheets served from an allowed host are blocked per session by block_resources().
+    '''
+    chrome_options.page_load_strategy = 'eager'
+
+    chrome_options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.media_stream': 2,
+        'profile.default_content_setting_values.notifications': 2,
+    })
+    chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+    chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+    chrome_options.add_argument('--mute-audio')
+
+    chrome_options.add_argument(f"--host-resolver-rules={build_host_resolver_rules(settings.SELENIUM_ALLOWED_HOSTS)}")
+
+    return chrome_options
+
+
+def block_resources(driver):
+    '''
+    Block BLOCKED_URL_PATTERNS for the lifetime of the session with CDP Network.setBlockedURLs.
+
+    Local Chrome exposes execute_cdp_cmd; a Remote session goes through the grid's
+    goog/cdp/execute endpoint. Best effort: the prefs and host allow-list still apply if CDP isn't available.
+    '''
+    try:
+        if hasattr(driver, 'execute_cdp_cmd'):
+            run_cdp = driver.execute_cdp_cmd
+        else:
+            driver.command_executor.add_command('executeCdpCommand', 'POST', '/session/$sessionId/goog/cdp/execute')
+            run_cdp = lambda cmd, params: driver.execute('executeCdpCommand', {'cmd': cmd, 'params': params})
+
+        run_cdp('Network.enable', {})
+        run_cdp('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        logger.warning(f"Could not block resources over CDP, relying on prefs and the host allow-list: {e}")
+
+
+def create_driver() -> webdriver.Remote:
+    '''
+    Start a new Chrome session, either on the remote Selenium service (Docker) or locally.
+    '''
+    chrome_options = build_chrome_options()
+
+    #Check if we should use remote Selenium (Docker) or local
+    selenium_url = os.getenv('SELENIUM_REMOTE_URL')
+
+    if selenium_url:
+        #Running in Docker - use remote Selenium service
+        logger.info(f"Using remote Selenium at {selenium_url}")
+        driver = webdriver.Remote(
+            command_executor=selenium_url,
+            options=chrome_options
+        )
+    else:
+        #Running locally - use local Chrome
+        logger.info("Using local Chrome WebDriver")
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.webdriver.chrome.service import Service
+
+        driver = webdriver.Chrome(
+            service=Service(ChromeDriverManager().install()),
+            options=chrome_options
+        )
+
+    if settings.SELENIUM_BLOCK_RESOURCES:
+        block_resources(driver)
+    return driver
+
+
+class BrowserSession:
+    '''
+    A single warm Chrome session owned by the BrowserSessionPool.
+    '''
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages_served = 0
+        self.created_at = time.monotonic()
+
+    def is_healthy(self) -> bool:
+        '''
+        Cheap round-trip to the browser to check the session is still alive.
+        The Selenium grid kills idle sessions after SE_NODE_SESSION_TIMEOUT.
+        '''
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException as e:
+            logger.warning(f"Browser session failed health check: {e}")
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error quitting browser session: {e}")
+
+
+class BrowserSessionPool:
+    '''
+    Thread-safe pool of pre-warmed Chrome sessions.
+
+    - At most max_size sessions are alive at once (matches SE_NODE_MAX_SESSIONS of the grid).
+    - Callers borrow a session, use it for one page, then return it.
+    - Sessions are recycled after max_pages_per_session pages, when they fail a health
+      check, or when the caller returns them with discard=True (e.g. on WebDriverException).
+    '''
+    def __init__(self, max_size: int, max_pages_per_session: int, borrow_timeout: float, driver_factory=create_driver):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.max_pages_per_session = max_pages_per_session
+        self.borrow_timeout = borrow_timeout
+        self._driver_factory = driver_factory
+
+        #LIFO so the most recently used (warmest) session is handed out first
+        self._idle = queue.LifoQueue()
+        #Limits how many callers can hold a session at the same time
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._alive = 0
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    def _reserve(self, limit: int) -> bool:
+        '''
+        Reserve room for one more live session, if fewer than limit are alive.
+        '''
+        with self._lock:
+            if self._alive >= limit:
+                return False
+            self._alive += 1
+            return True
+
+    def _start_session(self) -> BrowserSession:
+        '''
+        Start a browser for a reserved slot, giving the reservation back if Chrome fails to start.
+        '''
+        try:
+            session = BrowserSession(self._driver_factory())
+        except Exception:
+            with self._lock:
+                self._alive -= 1
+            raise
+        with self._lock:
+            self._stats['created'] += 1
+        return session
+
+    def _retire(self, session: BrowserSession, reason: str):
+        with self._lock:
+            self._alive -= 1
+            self._stats[reason] += 1
+        session.quit()
+
+    def prewarm(self, count: int = None) -> int:
+        '''
+        Start sessions until `count` (default: max_size) are alive and park them in the idle queue.
+        Returns the number of sessions started.
+        '''
+        target = self.max_size if count is None else min(count, self.max_size)
+        started = 0
+
+        while not self._closed and self._reserve(target):
+            try:
+                self._idle.put(self._start_session())
+                started += 1
+            except Exception as e:
+                logger.error(f"Failed to pre-warm browser session: {e}")
+                break
+
+        logger.info(f"Pre-warmed {started} browser session(s)")
+        return started
+
+    def borrow(self, timeout: float = None) -> BrowserSession:
+        '''
+        Borrow a healthy session, starting a new one if none are idle.
+        Raises TimeoutError if every session stays busy for longer than timeout.
+        '''
+        if self._closed:
+            raise RuntimeError("Browser session pool has been shut down")
+
+        timeout = self.borrow_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser session became available within {timeout}s")
+
+        try:
+            while True:
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    if self._reserve(self.max_size):
+                        return self._start_session()
+                    #Every live session is being pre-warmed or returned, wait for one
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No browser session became available within {timeout}s")
+                    try:
+                        session = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+
+                if session.is_healthy():
+                    with self._lock:
+                        self._stats['reused'] += 1
+                    return session
+
+                self._retire(session, 'discarded')
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, session: BrowserSession, discard: bool = False):
+        '''
+        Return a borrowed session to the pool.
+        The session is quit instead if discard is set, it has served enough pages or the pool is closed.
+        '''
+        try:
+            if discard or self._closed:
+                self._retire(session, 'discarded')
+            elif session.pages_served >= self.max_pages_per_session:
+                self._retire(session, 'recycled')
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self, timeout: float = None):
+        '''
+        Context manager around borrow()/release().
+        A WebDriverException raised inside the block discards the session.
+        '''
+        session = self.borrow(timeout)
+        discard = False
+        try:
+            yield session
+        except WebDriverException:
+            discard = True
+            raise
+        finally:
+            session.pages_served += 1
+            self.release(session, discard=discard)
+
+    def shutdown(self):
+        '''
+        Quit every idle session. Borrowed sessions are quit when they are returned.
+        '''
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(session, 'discarded')
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['alive'] = self._alive
+        stats['idle'] = self._idle.qsize()
+        stats['max_size'] = self.max_size
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserSessionPool:
+    '''
+    Return the process-wide BrowserSessionPool, creating it on first use.
+    '''
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserSessionPool(
+                    max_size=settings.SELENIUM_POOL_SIZE,
+                    max_pages_per_session=settings.SELENIUM_POOL_MAX_PAGES_PER_SESSION,
+                    borrow_timeout=settings.SELENIUM_POOL_BORROW_TIMEOUT,
+                )
+                atexit.register(_pool.shutdown)
+    return _pool
+
+
+def reset_browser_pool():
+    '''
+    Shut down and forget the process-wide pool (used by tests and on reconfiguration).
+    '''
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+
+
+def prewarm_browser_pool():
+    '''
+    Warm the pool in a background thread at worker start, if SELENIUM_POOL_PREWARM is enabled.
+    '''
+    if not settings.SELENIUM_POOL_PREWARM:
+        return None
+
+    thread = threading.Thread(
+        target=get_browser_pool().prewarm,
+        name='browser-pool-prewarm',
+        daemon=True
+    )
+    thread.start()
+    return thread
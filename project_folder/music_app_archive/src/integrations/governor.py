@@ -0,0 +1,260 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from googleapiclient.errors import HttpError
+from selenium.common.exceptions import WebDriverException
+
+from contextlib import contextmanager
+import threading
+import time
+import uuid
+import requests
+
+from ..custom_exceptions import PlatformUnavailableError, DeadlineExceededError
+from ..deadline import Deadline, deadline_timeout
+from ..utils import cache_lock
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#classify_failure() results
+FAILURE_ERROR = 'error'
+FAILURE_QUOTA = 'quota'
+
+#How long the circuit breaker state is kept once it stops changing
+GOVERNOR_STATE_TTL = 60 * 60 * 24
+
+
+def classify_failure(exc: Exception) -> str:
+    '''
+    Decide whether an exception means the platform itself is struggling.
+
+    Walks the exception chain (the integrations wrap upstream errors with `raise ... from e`):
+    - FAILURE_QUOTA: HTTP 429, or a YouTube 403 quotaExceeded / rateLimitExceeded
+    - FAILURE_ERROR: HTTP 5xx, connection errors, timeouts and WebDriver errors
+    - None: anything else, e.g. a video that doesn't exist, which says nothing about the platform's health,
+      or running out of our own metadata deadline
+    '''
+    if isinstance(exc, DeadlineExceededError):
+        return None
+    while exc is not None:
+        if isinstance(exc, HttpError):
+            status = int(getattr(exc.resp, 'status', 0) or 0)
+            if status == 429 or (status == 403 and any(reason in str(exc) for reason in ('quotaExceeded', 'rateLimitExceeded'))):
+                return FAILURE_QUOTA
+            return FAILURE_ERROR if status >= 500 else None
+        if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+            status = exc.response.status_code
+            if status == 429:
+                return FAILURE_QUOTA
+            return FAILURE_ERROR if status >= 500 else None
+        if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, WebDriverException, TimeoutError)):
+            return FAILURE_ERROR
+        exc = exc.__cause__
+    return None
+
+
+class PlatformGovernor:
+    '''
+    Outbound-call governor for one platform, with its state shared by every worker through the Django cache.
+
+    - In-flight limit: max_in_flight slot keys, each claimed with cache.add() for the length of one call and
+      deleted afterwards. Every slot expires slot_ttl seconds after it was claimed, so a slot leaked by a killed
+      worker heals itself without touching the others (slot_ttl should outlast the slowest call).
+    - Token bucket: `rate` calls per second with bursts of up to `burst`, updated under cache_lock().
+    - Circuit breaker: opens after failure_threshold consecutive platform failures (or at once on a
+      quota error) and fails fast for reset_timeout (quota_reset_timeout) seconds. After that one
+      caller is let through as a half-open probe; its outcome closes or re-opens the circuit.
+
+    Callers wait up to max_wait seconds for a token or a slot, then get PlatformUnavailableError,
+    as they do straight away while the circuit is open.
+    '''
+    def __init__(self, platform: str, max_in_flight: int, rate: float, burst: int, failure_threshold: int,
+                 reset_timeout: float, quota_reset_timeout: float, max_wait: float, slot_ttl: int = 120, poll_interval: float = 0.05):
+        self.platform = platform
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.quota_reset_timeout = quota_reset_timeout
+        self.max_wait = max_wait
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+
+    def _key(self, name: str) -> str:
+        return f"governor:{self.platform}:{name}"
+
+    def _unavailable(self, reason: str, retry_after: float = None) -> PlatformUnavailableError:
+        logger.warning(f"{self.platform} call refused: {reason}")
+        return PlatformUnavailableError(f"{self.platform} is temporarily unavailable ({reason})", self.platform, retry_after)
+
+    #Circuit breaker
+    def _check_circuit(self) -> bool:
+        '''
+        Raise if the circuit is open. Returns True if this caller is the half-open probe.
+        '''
+        open_until = cache.get(self._key('open_until'))
+        if open_until is None:
+            return False
+
+        remaining = open_until - time.time()
+        if remaining > 0:
+            raise self._unavailable("circuit open", remaining)
+        #Half-open: only one caller probes the platform, the rest keep failing fast
+        if cache.add(self._key('probe'), True, int(self.reset_timeout) + 1):
+            logger.info(f"{self.platform} circuit half-open, probing")
+            return True
+        raise self._unavailable("circuit half-open, probe in progress", self.reset_timeout)
+
+    def _open_circuit(self, timeout: float):
+        cache.set(self._key('open_until'), time.time() + timeout, GOVERNOR_STATE_TTL)
+        cache.delete_many([self._key('probe'), self._key('failures')])
+        logger.warning(f"{self.platform} circuit opened for {timeout}s")
+
+    def _record_failure(self, kind: str, probe: bool):
+        if kind == FAILURE_QUOTA:
+            self._open_circuit(self.quota_reset_timeout)
+            return
+        if probe:
+            self._open_circuit(self.reset_timeout)
+            return
+
+        failures_key = self._key('failures')
+        cache.add(failures_key, 0, GOVERNOR_STATE_TTL)
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            failures = 1
+            cache.set(failures_key, failures, GOVERNOR_STATE_TTL)
+        if failures >= self.failure_threshold:
+            self._open_circuit(self.reset_timeout)
+
+    def _record_success(self, probe: bool):
+        if probe:
+            cache.delete_many([self._key('open_until'), self._key('probe'), self._key('failures')])
+            logger.info(f"{self.platform} circuit closed")
+        else:
+            #Failures only count while they are consecutive
+            cache.delete(self._key('failures'))
+
+    #Token bucket
+    def _take_token(self, deadline: float):
+        bucket_key = self._key('bucket')
+        while True:
+            wait = self.poll_interval
+            with cache_lock(self._key('bucket_lock'), timeout=5, wait=min(self.max_wait, 1)) as acquired:
+                if acquired:
+                    now = time.time()
+                    bucket = cache.get(bucket_key) or {'tokens': self.burst, 'updated': now}
+                    tokens = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * self.rate)
+                    if tokens >= 1:
+                        cache.set(bucket_key, {'tokens': tokens - 1, 'updated': now}, GOVERNOR_STATE_TTL)
+                        return
+                    cache.set(bucket_key, {'tokens': tokens, 'updated': now}, GOVERNOR_STATE_TTL)
+                    wait = (1 - tokens) / self.rate
+
+            if time.monotonic() + wait > deadline:
+                raise self._unavailable("rate limited", wait)
+            time.sleep(wait)
+
+    #In-flight limit
+    def _slot_keys(self) -> list:
+        return [self._key(f"slot:{slot}") for slot in range(self.max_in_flight)]
+
+    def _acquire_slot(self, deadline: float) -> tuple:
+        '''
+        Claim a free slot, waiting until deadline. Returns (slot_key, token) for _release_slot().
+        '''
+        token = uuid.uuid4().hex
+        while True:
+            for slot_key in self._slot_keys():
+                #add() only sets a missing key, which is atomic on Redis
+                if cache.add(slot_key, token, self.slot_ttl):
+                    return slot_key, token
+
+            if time.monotonic() + self.poll_interval > deadline:
+                raise self._unavailable(f"{self.max_in_flight} calls already in flight")
+            time.sleep(self.poll_interval)
+
+    def _release_slot(self, slot: tuple):
+        slot_key, token = slot
+        #Only free the slot if it hasn't expired and been claimed by another call
+        if cache.get(slot_key) == token:
+            cache.delete(slot_key)
+
+    @contextmanager
+    def call(self, deadline: Deadline = None):
+        '''
+        Wrap one outbound call (or one batch of calls) to the platform.
+        Raises PlatformUnavailableError instead of running the block when the platform is being protected.
+        A metadata deadline shortens how long the caller waits for a token or a slot.
+        '''
+        probe = self._check_circuit()
+        wait_until = time.monotonic() + deadline_timeout(deadline, self.max_wait)
+        try:
+            self._take_token(wait_until)
+            slot = self._acquire_slot(wait_until)
+        except PlatformUnavailableError:
+            if probe:
+                cache.delete(self._key('probe'))
+            raise
+
+        try:
+            yield
+        except Exception as e:
+            kind = classify_failure(e)
+            if kind:
+                self._record_failure(kind, probe)
+            else:
+                self._record_success(probe)
+            raise
+        else:
+            self._record_success(probe)
+        finally:
+            self._release_slot(slot)
+
+    def state(self) -> dict:
+        '''
+        Current shared state, for debugging and the admin.
+        '''
+        slot_keys = self._slot_keys()
+        values = cache.get_many([self._key(name) for name in ('bucket', 'failures', 'open_until')] + slot_keys)
+        open_until = values.get(self._key('open_until'))
+        return {
+            'platform': self.platform,
+            'in_flight': sum(slot_key in values for slot_key in slot_keys),
+            'tokens': (values.get(self._key('bucket')) or {'tokens': self.burst})['tokens'],
+            'failures': values.get(self._key('failures'), 0),
+            'circuit_open': open_until is not None and open_until > time.time(),
+        }
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(platform: str) -> PlatformGovernor:
+    '''
+    Return the PlatformGovernor for a platform, configured from settings.PLATFORM_GOVERNOR
+    (settings.PLATFORM_GOVERNOR_DEFAULT for platforms it doesn't list).
+    '''
+    governor = _governors.get(platform)
+    if governor is None:
+        with _governors_lock:
+            governor = _governors.get(platform)
+            if governor is None:
+                limits = settings.PLATFORM_GOVERNOR.get(platform, settings.PLATFORM_GOVERNOR_DEFAULT)
+                governor = PlatformGovernor(platform, max_wait=settings.PLATFORM_GOVERNOR_MAX_WAIT, **limits)
+                _governors[platform] = governor
+    return governor
+
+
+def reset_governors():
+    '''
+    Forget the configured governors (used by tests and on reconfiguration). Shared state stays in the cache.
+    '''
+    with _governors_lock:
+        _governors.clear()
@@ -0,0 +1,193 @@
+from django.conf import settings
+
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import datetime
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..deadline import Deadline
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#Responses worth another attempt: rate limited or a server-side failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_retry_counts = {}
+
+
+def host_key(url: str) -> str:
+    '''
+    Scheme and host of a URL, e.g. https://api.soundcloud.com. Sessions and stats are kept per host key.
+    '''
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def get_session(url: str) -> requests.Session:
+    '''
+    Return the keep-alive Session for the URL's host, creating it on first use.
+
+    Each host gets its own Session and connection pool (HTTP_CLIENT_POOL_MAXSIZE connections), so a
+    worker keeps its TCP/TLS connections to api.soundcloud.com open between requests.
+    '''
+    key = host_key(url)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.HTTP_CLIENT_POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions[key] = session
+                _retry_counts[key] = 0
+    return session
+
+
+def retry_after_seconds(response: requests.Response) -> float:
+    '''
+    Seconds the server asked us to wait in its Retry-After header (delta-seconds or an HTTP date), or None.
+    '''
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_seconds(attempt: int) -> float:
+    '''
+    Full-jitter exponential backoff: a random wait between 0 and base * 2^attempt, capped at HTTP_CLIENT_MAX_BACKOFF.
+    '''
+    return random.uniform(0, min(settings.HTTP_CLIENT_MAX_BACKOFF, settings.HTTP_CLIENT_BACKOFF_BASE * (2 ** attempt)))
+
+
+def cap_timeout(timeout, deadline: Deadline):
+    '''
+    Shrink a requests timeout (seconds or a (connect, read) tuple) to what is left of the deadline.
+    '''
+    if deadline is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(deadline.timeout(part) for part in timeout)
+    return deadline.timeout(timeout)
+
+
+def request(method: str, url: str, timeout=None, retries: int = None, deadline: Deadline = None, **kwargs) -> requests.Response:
+    '''
+    Send a request on the host's pooled Session.
+
+    - timeout defaults to (HTTP_CLIENT_CONNECT_TIMEOUT, HTTP_CLIENT_READ_TIMEOUT)
+    - 429 and 5xx responses, connection errors and timeouts are retried up to `retries` times
+      (default HTTP_CLIENT_MAX_RETRIES) with jittered exponential backoff
+    - a Retry-After header replaces the backoff; if it asks for longer than HTTP_CLIENT_MAX_BACKOFF
+      the response is returned as it is, so the caller (and the platform governor) sees the 429
+    - with a deadline, each attempt's timeout is capped at what is left of it, no retry is made
+      that would outlast it, and DeadlineExceededError is raised if it has already run out
+
+    Returns the last response; callers still call raise_for_status().
+    '''
+    if timeout is None:
+        timeout = (settings.HTTP_CLIENT_CONNECT_TIMEOUT, settings.HTTP_CLIENT_READ_TIMEOUT)
+    if retries is None:
+        retries = settings.HTTP_CLIENT_MAX_RETRIES
+
+    session = get_session(url)
+    key = host_key(url)
+    attempt = 0
+    while True:
+        if deadline is not None:
+            deadline.check(f"{method} {key}")
+        try:
+            response = session.request(method, url, timeout=cap_timeout(timeout, deadline), **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            wait = backoff_seconds(attempt)
+            if attempt >= retries or (deadline is not None and wait >= deadline.remaining()):
+                raise
+            logger.warning(f"{method} {key} failed ({e}), retrying in {wait:.2f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+
+            wait = retry_after_seconds(response)
+            if wait is None:
+                wait = backoff_seconds(attempt)
+            elif wait > settings.HTTP_CLIENT_MAX_BACKOFF:
+                logger.warning(f"{method} {key} returned {response.status_code} with Retry-After {wait:.0f}s, not retrying")
+                return response
+            if deadline is not None and wait >= deadline.remaining():
+                logger.warning(f"{method} {key} returned {response.status_code}, no time left to retry")
+                return response
+            logger.warning(f"{method} {key} returned {response.status_code}, retrying in {wait:.2f}s")
+            response.close()
+
+        with _sessions_lock:
+            _retry_counts[key] = _retry_counts.get(key, 0) + 1
+        attempt += 1
+        time.sleep(wait)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def get_connection_stats() -> dict:
+    '''
+    Return {host: {'requests': n, 'connections_opened': n, 'connections_reused': n, 'retries': n}}
+    for this process, read from the urllib3 connection pools behind each Session.
+    '''
+    with _sessions_lock:
+        sessions = dict(_sessions)
+        retry_counts = dict(_retry_counts)
+
+    stats = {}
+    for key, session in sessions.items():
+        requests_sent = 0
+        connections_opened = 0
+        for adapter in set(session.adapters.values()):
+            for pool_key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(pool_key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+        stats[key] = {
+            'requests': requests_sent,
+            'connections_opened': connections_opened,
+            'connections_reused': max(requests_sent - connections_opened, 0),
+            'retries': retry_counts.get(key, 0),
+        }
+    return stats
+
+
+def reset_sessions():
+    '''
+    Close and forget every pooled Session (used by tests and on reconfiguration).
+    '''
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _retry_counts.clear()
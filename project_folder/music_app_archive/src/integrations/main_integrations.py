@@ -1,140 +1,373 @@
+from django.conf import settings
+
 from bs4 import BeautifulSoup
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException, WebDriverException
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 import random
-import logging
-import os
-
 
-from .bandcamp import orchestrate_bandcamp_meta_data_dictionary
+from .browser_pool import get_browser_pool
+from .metadata_cache import metadata_cache
+from .governor import get_governor, classify_failure
+from .bandcamp import orchestrate_bandcamp_meta_data_dictionary, get_bandcamp_static_html, scrape_bandcamp_title
 from .soundcloud import orchestrate_soundcloud_meta_data_dictionary
-from .youtube import orchestrate_get_youtube_meta_data_dict
+from .youtube import orchestrate_get_youtube_meta_data_dict, extract_youtube_video_id_from_url, get_youtube_metadata_batch, get_youtube_platform
+from .adapters import PlatformAdapter, register_adapter, get_adapter
 
-from ..custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError, OrchestratePlatformMetaDataError, SoundcloudMetaDataError
-from ..utils import check_streaming_link_platform,  orch_validate_input_string
+from ..custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError, DeadlineExceededError
+from ..deadline import Deadline, deadline_timeout
+from ..utils import (
+    check_streaming_link_platform,
+    orch_validate_input_string,
+    canonicalise_streaming_link,
+    classify_streaming_links,
+    canonicalise_youtube_link,
+    canonicalise_soundcloud_link,
+    canonicalise_bandcamp_link
+)
 
 
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def get_soup(music_platform_url: str, platform: str) -> BeautifulSoup:
+#CSS selector get_page_source() waits for before handing the page to the platform's scraper
+PAGE_READY_SELECTORS = {
+    'bandcamp': '#name-section',
+    'soundcloud': 'meta[property="og:title"]',
+}
+#Seconds between readiness checks (WebDriverWait defaults to 0.5)
+PAGE_READY_POLL_FREQUENCY = 0.1
+
+#Sums transferSize over the document and every sub-resource of the current page. Cross-origin
+#resources without Timing-Allow-Origin report 0, so this is a lower bound
+TRANSFER_SIZE_SCRIPT = (
+    "return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))"
+    ".reduce((total, entry) => total + (entry.transferSize || 0), 0);"
+)
+
+#Counts which fetch path ('static' or 'browser') served each scraped request, per platform
+_fetch_path_stats = Counter()
+_fetch_path_stats_lock = threading.Lock()
+#Browser fetches and bytes transferred, per platform
+_fetch_transfer_stats = Counter()
+
+
+def record_fetch_path(platform: str, path: str):
+    '''
+    Record which fetch path served a scraped request so we can measure the static hit rate.
+    '''
+    with _fetch_path_stats_lock:
+        _fetch_path_stats[(platform, path)] += 1
+    logger.info(f"{platform} metadata served by the {path} path")
+
+
+def get_fetch_path_stats() -> dict:
+    '''
+    Return {platform: {'static': n, 'browser': n, 'static_hit_rate': float}}.
+    '''
+    with _fetch_path_stats_lock:
+        snapshot = dict(_fetch_path_stats)
+
+    stats = {}
+    for (platform, path), count in snapshot.items():
+        stats.setdefault(platform, {'static': 0, 'browser': 0})[path] = count
+    for platform_stats in stats.values():
+        total = platform_stats['static'] + platform_stats['browser']
+        platform_stats['static_hit_rate'] = platform_stats['static'] / total if total else 0.0
+    return stats
+
+
+def record_fetch_transfer(platform: str, transferred_bytes: int):
+    '''
+    Record the bytes a browser fetch transferred, to check what the scraping profile saves.
+    '''
+    with _fetch_path_stats_lock:
+        _fetch_transfer_stats[(platform, 'fetches')] += 1
+        _fetch_transfer_stats[(platform, 'bytes')] += transferred_bytes
+
+
+def get_fetch_transfer_stats() -> dict:
+    '''
+    Return {platform: {'fetches': n, 'bytes': n, 'mean_bytes': float}} for browser fetches.
+    '''
+    with _fetch_path_stats_lock:
+        snapshot = dict(_fetch_transfer_stats)
+
+    stats = {}
+    for (platform, field), count in snapshot.items():
+        stats.setdefault(platform, {'fetches': 0, 'bytes': 0})[field] = count
+    for platform_stats in stats.values():
+        fetches = platform_stats['fetches']
+        platform_stats['mean_bytes'] = platform_stats['bytes'] / fetches if fetches else 0.0
+    return stats
+
+
+def measure_transfer_bytes(driver) -> int:
+    '''
+    Bytes transferred for the current page and its sub-resources, from the Resource Timing API.
+    Returns None if the browser didn't report a number.
+    '''
+    try:
+        transferred_bytes = driver.execute_script(TRANSFER_SIZE_SCRIPT)
+    except WebDriverException as e:
+        logger.warning(f"Could not read the transfer size of the page: {e}")
+        return None
+    return transferred_bytes if isinstance(transferred_bytes, (int, float)) else None
+
+
+def get_soup(music_platform_url: str, platform: str, human_delays: bool = None, deadline: Deadline = None) -> BeautifulSoup:
+    '''
+    Fetch a Bandcamp or Soundcloud page using Selenium and return a BeautifulSoup object
+    of the whole page. Scrapers that only need part of the page should use get_page_source().
+    '''
+    soup = BeautifulSoup(get_page_source(music_platform_url, platform, human_delays, deadline=deadline), "html.parser")
+    return soup
+
+
+def get_page_source(music_platform_url: str, platform: str, human_delays: bool = None, deadline: Deadline = None) -> str:
     '''
-    Fetch a Bandcamp or Soundcloud page using Selenium and return a BeautifulSoup object.
+    Fetch a Bandcamp or Soundcloud page using Selenium and return the rendered HTML.
 
     This function:
-    - uses headless Chrome with realistic browser fingerprinting
+    - borrows a warm headless Chrome session from the browser pool (see browser_pool.py)
     - implements anti-detection measures
-    - waits for dynamic content to load
-    - adds random delays to mimic human behavior
+    - waits until the platform's readiness selector (PAGE_READY_SELECTORS) is in the DOM, with a
+      SELENIUM_PAGE_READY_TIMEOUT limit for the whole fetch (page load included), or less if the
+      caller's deadline has less left
+    - only when human_delays is set (default settings.SELENIUM_HUMAN_DELAYS): adds random delays
+      and a scroll to mimic human behavior
     - works in both local dev and Docker environments
+    - records the bytes transferred for the page (see get_fetch_transfer_stats())
+
+    If the time runs out the page source is returned as it is and the scraper decides whether
+    it has what it needs. The session is returned to the pool afterwards; it is discarded on WebDriverException.
     '''
-    driver = None
-    
+    if human_delays is None:
+        human_delays = settings.SELENIUM_HUMAN_DELAYS
+    ready_selector = PAGE_READY_SELECTORS.get(platform, 'body')
+    if deadline is not None:
+        deadline.check(f"fetching the {platform} page in the browser")
+    borrow_timeout = None if deadline is None else deadline.timeout(settings.SELENIUM_POOL_BORROW_TIMEOUT)
+
     try:
-        #Configure Chrome options for stealth
-        chrome_options = Options()
-        
-        #Headless mode
-        chrome_options.add_argument('--headless=new')
-        
-        #Essential arguments to avoid detection
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        #Realistic window size
-        chrome_options.add_argument('--window-size=1920,1080')
-        
-        #Set realistic user agent
-        chrome_options.add_argument(
-            'user-agent=Mozilla/5.0 (X11; Linux x86_64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) '
-            'Chrome/122.0.0.0 Safari/537.36'
-        )
-        
-        #Additional privacy/security options
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--lang=en-GB')
-        
-        #Check if we should use remote Selenium (Docker) or local
-        selenium_url = os.getenv('SELENIUM_REMOTE_URL')
-        
-        if selenium_url:
-            #Running in Docker - use remote Selenium service
-            logger.info(f"Using remote Selenium at {selenium_url}")
-            driver = webdriver.Remote(
-                command_executor=selenium_url,
-                options=chrome_options
-            )
-        else:
-            #Running locally - use local Chrome
-            logger.info("Using local Chrome WebDriver")
-            from webdriver_manager.chrome import ChromeDriverManager
-            from selenium.webdriver.chrome.service import Service
+        with get_browser_pool().session(borrow_timeout) as session:
+            driver = session.driver
+            fetch_timeout = deadline_timeout(deadline, settings.SELENIUM_PAGE_READY_TIMEOUT)
+            ready_by = time.monotonic() + fetch_timeout
+
+            #Override navigator.webdriver flag (anti-detection)
+            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
-            driver = webdriver.Chrome(
-                service=Service(ChromeDriverManager().install()),
-                options=chrome_options
-            )
-        
-        #Override navigator.webdriver flag (anti-detection)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        
-        #Add random delay before loading
-        time.sleep(random.uniform(1, 2))
-        
-        #Load the page
-        driver.get(music_platform_url)
-        
-        #Wait for the page to load
-        try:
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            #Additional wait for JavaScript to execute
-            time.sleep(random.uniform(2, 3))
-        except TimeoutException:
-            logger.warning(f"Timeout waiting for page load: {music_platform_url}")
-        
-        #Scroll to simulate human behavior
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
-        time.sleep(random.uniform(0.5, 1))
-        
-        #Get page source and parse with BeautifulSoup
-        page_source = driver.page_source
-        soup = BeautifulSoup(page_source, "html.parser")
-        
-        logger.info(f"Successfully fetched {platform} page: {music_platform_url}")
-        return soup
+            if human_delays:
+                #Add random delay before loading
+                time.sleep(random.uniform(1, 2))
+            
+            #Load the page, giving up on the load (but keeping what has rendered) when time runs out
+            driver.set_page_load_timeout(max(ready_by - time.monotonic(), PAGE_READY_POLL_FREQUENCY))
+            try:
+                driver.get(music_platform_url)
+            except TimeoutException:
+                logger.warning(f"Page load timed out after {fetch_timeout:.1f}s for {platform} page: {music_platform_url}")
+                driver.execute_script("window.stop();")
+            
+            #Wait for the element the scraper needs, polling rather than sleeping
+            try:
+                WebDriverWait(driver, max(ready_by - time.monotonic(), 0), poll_frequency=PAGE_READY_POLL_FREQUENCY).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector))
+                )
+            except TimeoutException:
+                logger.warning(f"Timeout waiting for '{ready_selector}' on {platform} page: {music_platform_url}")
+            
+            if human_delays:
+                #Additional wait for JavaScript to execute
+                time.sleep(random.uniform(2, 3))
+                #Scroll to simulate human behavior
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
+                time.sleep(random.uniform(0.5, 1))
+            
+            #Get page source
+            page_source = driver.page_source
+            transferred_bytes = measure_transfer_bytes(driver)
+
+        if transferred_bytes is not None:
+            record_fetch_transfer(platform, int(transferred_bytes))
+        logger.info(f"Successfully fetched {platform} page: {music_platform_url} ({transferred_bytes} bytes transferred)")
+        return page_source
         
     except TimeoutException as e:
         logger.error(f"Timeout loading {platform} URL {music_platform_url}: {e}")
         raise
+    except TimeoutError as e:
+        #No pooled browser became free in time
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceededError(f"Ran out of time waiting for a browser for {music_platform_url}") from e
+        raise
     except WebDriverException as e:
         logger.error(f"WebDriver error fetching {platform} URL {music_platform_url}: {e}")
         raise
     except Exception as e:
         logger.error(f"Unexpected error fetching {platform} URL {music_platform_url}: {e}")
         raise
-    finally:
-        #Always close the browser
-        if driver:
-            driver.quit()
 
 
-def orchestrate_platform_api(streaming_url: str, track_type: str) -> dict:
+def get_bandcamp_meta_data_dict(bandcamp_url: str, deadline: Deadline = None) -> dict:
     '''
-    
+    Generate the Bandcamp meta_data_dict, trying the cheap static HTML fetch first.
+    The headless browser (get_page_source) only runs when the static parse raises BandCampMetaDataError.
+
+    If the deadline runs out while the browser renders the page, DeadlineExceededError carries the
+    track name and artist from the page <title> when it has them.
+    '''
+    try:
+        html = get_bandcamp_static_html(bandcamp_url, deadline=deadline)
+        meta_data_dict = orchestrate_bandcamp_meta_data_dictionary(html, bandcamp_url)
+        record_fetch_path('bandcamp', 'static')
+        return meta_data_dict
+    except BandCampMetaDataError as e:
+        logger.info(f"Static Bandcamp parse failed for {bandcamp_url}, falling back to browser: {e}")
+
+    #The scraper parses only the regions it needs, so hand it the raw page source
+    page_source = get_page_source(bandcamp_url, 'bandcamp', deadline=deadline)
+    try:
+        meta_data_dict = orchestrate_bandcamp_meta_data_dictionary(page_source, bandcamp_url)
+    except BandCampMetaDataError as e:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceededError(
+                f"Ran out of time rendering {bandcamp_url}",
+                partial_meta_data_dict=scrape_bandcamp_title(page_source)
+            ) from e
+        raise
+    record_fetch_path('bandcamp', 'browser')
+    return meta_data_dict
+
+
+class YouTubeAdapter(PlatformAdapter):
+    '''
+    YouTube Data API: one videos.list call per link, or per 50 links in a batch.
+    '''
+    platform = 'youtube'
+    streaming_platforms = {'youtube': 'YouTube', 'youtube_music': 'YouTube Music'}
+    domains = ('youtube.com', 'youtu.be', 'music.youtube.com', 'm.youtube.com')
+    supports_batch = True
+
+    def fetch(self, streaming_url: str, track_type: str, deadline: Deadline = None) -> dict:
+        return orchestrate_get_youtube_meta_data_dict(streaming_url, track_type, deadline=deadline)
+
+    def canonicalise(self, parsed_url, hostname: str):
+        return canonicalise_youtube_link(parsed_url, hostname)
+
+    def fetch_batch(self, streaming_urls: list, track_type: str, deadline: Deadline = None) -> dict:
+        video_ids = {streaming_url: extract_youtube_video_id_from_url(streaming_url) for streaming_url in streaming_urls}
+        batch = get_youtube_metadata_batch(list(dict.fromkeys(video_id for video_id in video_ids.values() if video_id)), deadline=deadline)
+
+        results = {}
+        for streaming_url, video_id in video_ids.items():
+            meta_data_dict = batch.get(video_id) if video_id else None
+            if meta_data_dict is None:
+                meta_data_dict = YouTubeMetaDataError(f"Could not extract a valid YouTube video id from {streaming_url}")
+            elif isinstance(meta_data_dict, dict):
+                meta_data_dict = dict(
+                    meta_data_dict,
+                    track_type=track_type,
+                    streaming_platform=get_youtube_platform(streaming_url),
+                    streaming_link=streaming_url
+                )
+            results[streaming_url] = meta_data_dict
+        return results
+
+
+class SoundcloudAdapter(PlatformAdapter):
+    '''
+    SoundCloud API: one /resolve call per link.
+    '''
+    platform = 'soundcloud'
+    display_name = 'SoundCloud'
+    domains = ('soundcloud.com',)
+
+    def fetch(self, streaming_url: str, track_type: str, deadline: Deadline = None) -> dict:
+        return orchestrate_soundcloud_meta_data_dictionary(streaming_url, track_type, deadline=deadline)
+
+    def canonicalise(self, parsed_url, hostname: str):
+        return canonicalise_soundcloud_link(parsed_url, hostname)
+
+
+class BandcampAdapter(PlatformAdapter):
+    '''
+    Bandcamp scraper: static HTML first, the headless browser when that fails (see get_bandcamp_meta_data_dict()).
+    '''
+    platform = 'bandcamp'
+    display_name = 'Bandcamp'
+    domains = ('bandcamp.com',)
+    needs_browser = True
+
+    def fetch(self, streaming_url: str, track_type: str, deadline: Deadline = None) -> dict:
+        return get_bandcamp_meta_data_dict(streaming_url, deadline=deadline)
+
+    def canonicalise(self, parsed_url, hostname: str):
+        return canonicalise_bandcamp_link(parsed_url, hostname)
+
+
+#Registration order is the order of StreamingLink's platform choices
+register_adapter(YouTubeAdapter())
+register_adapter(BandcampAdapter())
+register_adapter(SoundcloudAdapter())
+
+
+def fetch_platform_meta_data_dict(streaming_url: str, track_type: str, platform: str, deadline: Deadline = None) -> dict:
+    '''
+    Call the platform's adapter for a streaming_url (no caching), through the platform's
+    governor (see governor.py). Raises PlatformUnavailableError when the governor refuses the call.
+    '''
+    adapter = get_adapter(platform)
+    with get_governor(adapter.platform).call(deadline):
+        return adapter.fetch(streaming_url, track_type, deadline=deadline)
+
+
+def fetch_platform_meta_data_batch(adapter: PlatformAdapter, streaming_urls: list, track_type: str, deadline: Deadline = None) -> dict:
+    '''
+    Call adapter.fetch_batch() (no caching) as one call through the platform's governor.
+    Returns {streaming_url: meta_data_dict or exception}, with the governor's refusal against every link.
+
+    fetch_batch() hands errors back per link instead of raising them, so the first platform failure
+    (quota, 5xx, ...) among them is re-raised inside the governor call for the circuit breaker to see.
+    '''
+    batch = None
+    try:
+        with get_governor(adapter.platform).call(deadline):
+            batch = adapter.fetch_batch(streaming_urls, track_type, deadline=deadline)
+            failure = next(
+                (error for error in batch.values() if isinstance(error, Exception) and classify_failure(error)),
+                None
+            )
+            if failure is not None:
+                raise failure
+    except Exception as e:
+        logger.warning(f"{adapter.platform} batch of {len(streaming_urls)} link(s) failed: {e}")
+        if batch is None:
+            batch = {streaming_url: e for streaming_url in streaming_urls}
+    else:
+        logger.info(f"Fetched {len(streaming_urls)} {adapter.platform} link(s) in one batch")
+    return batch
+
+
+def orchestrate_platform_api(streaming_url: str, track_type: str, deadline: Deadline = None) -> dict:
+    '''
+    Generate the meta_data_dict for a streaming_url.
+
+    Results (and, briefly, platform errors) are served from metadata_cache when the same
+    link was fetched recently; otherwise the platform API or scraper is called, once for
+    all concurrent submissions of the same link.
+
+    deadline (see src/deadline.py) bounds the whole extraction: every platform call only spends
+    what is left of it, and DeadlineExceededError (with any partial metadata) is raised once it runs out.
     '''
     #Validate inputs
     orch_validate_input_string(streaming_url, 'streaming_url')
@@ -150,14 +383,13 @@ def orchestrate_platform_api(streaming_url: str, track_type: str) -> dict:
 
         logger.info(f"The following platform, {platform}, has been detected.")
         
-        #Choose which streaming platform
-        if platform == 'youtube' or platform == 'youtube.music':
-            meta_data_dict = orchestrate_get_youtube_meta_data_dict(streaming_url, track_type)
-        elif platform == 'bandcamp':
-            soup = get_soup(streaming_url, platform)
-            meta_data_dict = orchestrate_bandcamp_meta_data_dictionary(soup, streaming_url)
-        elif platform == 'soundcloud':
-                meta_data_dict =  orchestrate_soundcloud_meta_data_dictionary(streaming_url, track_type)
+        meta_data_dict = metadata_cache.get_or_fetch(
+            streaming_url,
+            track_type,
+            platform,
+            lambda: fetch_platform_meta_data_dict(streaming_url, track_type, platform, deadline),
+            deadline=deadline
+        )
         logger.info(f"Successfully extracted metadata from {platform} for: {streaming_url}")
         return meta_data_dict
     except YouTubeMetaDataError as e:
@@ -169,7 +401,80 @@ def orchestrate_platform_api(streaming_url: str, track_type: str) -> dict:
     except SoundcloudMetaDataError as e:
         logger.error(f"Soundcloud metadata error for {streaming_url}: {str(e)}")
         raise
+    except PlatformUnavailableError as e:
+        logger.warning(f"Platform unavailable for {streaming_url}: {str(e)}")
+        raise
+    except DeadlineExceededError as e:
+        logger.warning(f"Metadata deadline exceeded for {streaming_url}: {str(e)}")
+        canonical_link = canonicalise_streaming_link(streaming_url)
+        if canonical_link:
+            e.partial_meta_data_dict.setdefault('streaming_platform', canonical_link.platform)
+        raise
     except Exception as e:
         logger.error(f"Unexpected error in orchestrate_platform_api for {streaming_url}: {str(e)}")
         raise ValueError(f"Failed to extract metadata: {str(e)}") from e
-    
\ No newline at end of file
+    
+
+
+def orchestrate_platform_api_batch(streaming_urls: list, track_type: str, deadline_seconds: float = None, max_workers: int = 4) -> dict:
+    '''
+    Generate the meta_data_dict of many streaming_urls, taking the cheapest path each platform's adapter offers.
+
+    - Links already in metadata_cache are served from it.
+    - Platforms with supports_batch get one fetch_batch() call for the rest of their links, as one governor
+      call bounded by a Deadline(deadline_seconds). Results and platform errors are cached as
+      orchestrate_platform_api() caches them, and links already being fetched elsewhere wait for that fetch.
+    - The other links go through orchestrate_platform_api() on max_workers threads, each with its own
+      Deadline(deadline_seconds). Links whose adapter needs_browser share at most SELENIUM_POOL_SIZE of
+      those threads, so API-based platforms never queue behind the browser pool.
+
+    Returns {streaming_url: meta_data_dict} with the exception in place of the dict for every link that failed.
+    '''
+    results = {}
+    by_adapter = {}
+    for classification in classify_streaming_links(streaming_urls):
+        if classification.rejection_reason:
+            results[classification.url] = ValueError(f"Unsupported platform for streaming_url: {classification.url}")
+            continue
+        try:
+            adapter = get_adapter(classification.platform)
+        except ValueError as e:
+            results[classification.url] = e
+            continue
+        by_adapter.setdefault(adapter, []).append(classification.url)
+
+    single_fetches = []
+    for adapter, urls in by_adapter.items():
+        if not adapter.supports_batch:
+            single_fetches.extend((adapter, url) for url in urls)
+            continue
+
+        deadline = Deadline(deadline_seconds) if deadline_seconds else None
+        batch, in_flight = metadata_cache.get_or_fetch_many(
+            urls, track_type, adapter.platform,
+            lambda misses: fetch_platform_meta_data_batch(adapter, misses, track_type, deadline)
+        )
+        results.update(batch)
+        #Links someone else is already fetching wait for that fetch on the single path
+        single_fetches.extend((adapter, url) for url in in_flight)
+
+    browser_slots = threading.BoundedSemaphore(max(1, min(max_workers, settings.SELENIUM_POOL_SIZE)))
+
+    def fetch(item):
+        adapter, url = item
+        deadline = Deadline(deadline_seconds) if deadline_seconds else None
+        try:
+            if adapter.needs_browser:
+                with browser_slots:
+                    return url, orchestrate_platform_api(url, track_type, deadline=deadline)
+            return url, orchestrate_platform_api(url, track_type, deadline=deadline)
+        except Exception as e:
+            return url, e
+
+    if single_fetches:
+        #API-based links first, so they aren't held up by the browser-bound ones
+        single_fetches.sort(key=lambda item: item[0].needs_browser)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata-batch") as executor:
+            results.update(executor.map(fetch, single_fetches))
+
+    return {url: results[url] for url in dict.fromkeys(streaming_urls)}
@@ -0,0 +1,339 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from collections import Counter, OrderedDict
+from contextlib import ExitStack
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
+import hashlib
+import threading
+import time
+
+from ..utils import canonicalise_streaming_link, cache_lock
+from ..custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError, SoundcloudMetaDataError
+from ..deadline import Deadline, deadline_timeout
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#Platform errors that are cached for a short time so a broken link doesn't hammer the upstream
+NEGATIVE_CACHE_ERRORS = {
+    error.__name__: error
+    for error in (YouTubeMetaDataError, BandCampMetaDataError, SoundcloudMetaDataError)
+}
+
+#Query parameters that never change which track a URL points at
+TRACKING_QUERY_PARAMS = ('si', 'feature', 'ref', 'utm_source', 'utm_medium', 'utm_campaign', 'utm_content', 'utm_term')
+
+
+def canonical_cache_url(streaming_url: str) -> str:
+    '''
+    Normalise a streaming URL for use as a cache key.
+    Supported links use canonicalise_streaming_link(), so youtu.be/X and youtube.com/watch?v=X&t=42
+    share an entry. Anything else gets a lowercase scheme/host, no fragment, no tracking parameters
+    and a stable query-parameter order.
+    '''
+    canonical_link = canonicalise_streaming_link(streaming_url)
+    if canonical_link:
+        return canonical_link.url
+
+    parsed = urlparse(streaming_url.strip())
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if name not in TRACKING_QUERY_PARAMS
+    )
+    return urlunparse((
+        (parsed.scheme or 'https').lower(),
+        (parsed.netloc or '').lower(),
+        parsed.path.rstrip('/') or '/',
+        '',
+        urlencode(query),
+        ''
+    ))
+
+
+class _Flight:
+    '''
+    One in-progress fetch in this process, which concurrent callers for the same key wait on.
+    '''
+    def __init__(self):
+        self.done = threading.Event()
+        self.meta_data_dict = None
+        self.error = None
+
+
+class MetadataCache:
+    '''
+    Two-tier cache for meta_data_dict results, sitting in front of the platform adapters.
+
+    - Keyed on the canonical streaming URL + track_type.
+    - Local tier: per-process LRU (bounded by max_local_entries) for the hottest links.
+    - Shared tier: the Django cache, so every worker benefits from a fetch.
+    - Successful results live for the platform's TTL; platform errors are cached for
+      negative_ttl seconds and re-raised on a hit.
+    - Single-flight on a miss: one caller per key fetches, while concurrent callers wait up to
+      single_flight_wait seconds for its result, threads in this process on the leader's _Flight
+      and other workers on the shared tier while the leader holds a cache_lock().
+    '''
+    key_prefix = 'metadata:v1'
+
+    def __init__(self, ttls: dict, negative_ttl: int, max_local_entries: int,
+                 single_flight_wait: float = 10, lock_timeout: int = 30, poll_interval: float = 0.05):
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self.max_local_entries = max_local_entries
+        self.single_flight_wait = single_flight_wait
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = Counter()
+        self._flights = {}
+
+    def make_key(self, streaming_url: str, track_type: str) -> str:
+        digest = hashlib.sha1(f"{canonical_cache_url(streaming_url)}|{track_type}".encode()).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_local(self, key: str):
+        with self._lock:
+            item = self._local.get(key)
+            if item is None:
+                return None
+            expires_at, entry = item
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key: str, entry: dict, ttl: int):
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def get_entry(self, key: str):
+        '''
+        Look the key up in the local tier, then the shared tier.
+        Returns the raw cache entry or None on a miss.
+        '''
+        entry = self._get_local(key)
+        if entry is not None:
+            self._count('local_hits')
+            return entry
+
+        entry = cache.get(key)
+        if entry is not None:
+            self._count('shared_hits')
+            #Shared entries carry their remaining lifetime so the local copy can't outlive them
+            ttl = max(int(entry.get('expires_at', 0) - time.time()), 0)
+            if ttl:
+                self._set_local(key, entry, ttl)
+            return entry
+
+        self._count('misses')
+        return None
+
+    def _store(self, key: str, entry: dict, ttl: int):
+        entry['expires_at'] = time.time() + ttl
+        self._set_local(key, entry, ttl)
+        cache.set(key, entry, ttl)
+
+    def set(self, key: str, platform: str, meta_data_dict: dict):
+        ttl = self.ttls.get(platform, 0)
+        if ttl <= 0:
+            return
+        self._store(key, {'meta_data_dict': dict(meta_data_dict)}, ttl)
+
+    def set_error(self, key: str, error: Exception):
+        if self.negative_ttl <= 0:
+            return
+        self._store(key, {'error': type(error).__name__, 'message': str(error)}, self.negative_ttl)
+
+    def result_from_entry(self, entry: dict) -> dict:
+        '''
+        Turn a cache entry back into a meta_data_dict, re-raising a negatively cached error.
+        '''
+        if 'error' in entry:
+            self._count('negative_hits')
+            raise NEGATIVE_CACHE_ERRORS[entry['error']](entry['message'])
+        #Hand out a copy so callers can't mutate the cached dict
+        return dict(entry['meta_data_dict'])
+
+    def get_or_fetch(self, streaming_url: str, track_type: str, platform: str, fetch, deadline: Deadline = None) -> dict:
+        '''
+        Return the cached meta_data_dict for streaming_url/track_type, calling fetch() on a miss.
+
+        Concurrent misses for the same key share one fetch(). A caller that has waited
+        single_flight_wait seconds (or what is left of its deadline) without a result, or whose
+        leader failed for its own reasons (deadline, governor), calls fetch() itself.
+        '''
+        key = self.make_key(streaming_url, track_type)
+
+        entry = self.get_entry(key)
+        if entry is not None:
+            logger.info(f"Metadata cache hit for {streaming_url}")
+            return self.result_from_entry(entry)
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(deadline_timeout(deadline, self.single_flight_wait)):
+                if flight.meta_data_dict is not None:
+                    self._count('coalesced')
+                    logger.info(f"Shared an in-flight metadata fetch for {streaming_url}")
+                    return dict(flight.meta_data_dict)
+                if isinstance(flight.error, tuple(NEGATIVE_CACHE_ERRORS.values())):
+                    self._count('coalesced')
+                    raise type(flight.error)(str(flight.error))
+            return self._fetch_once(key, streaming_url, platform, fetch, deadline)
+
+        try:
+            meta_data_dict = self._fetch_once(key, streaming_url, platform, fetch, deadline)
+            flight.meta_data_dict = meta_data_dict
+            return dict(meta_data_dict)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _fetch_once(self, key: str, streaming_url: str, platform: str, fetch, deadline: Deadline = None) -> dict:
+        '''
+        Call fetch() and cache the outcome, unless another worker is already fetching the key,
+        in which case wait for its result to reach the shared tier first.
+        '''
+        lock_key = f"{key}:lock"
+        with cache_lock(lock_key, timeout=self.lock_timeout, wait=0) as acquired:
+            if not acquired:
+                entry = self._wait_for_shared_entry(key, lock_key, deadline_timeout(deadline, self.single_flight_wait))
+                if entry is not None:
+                    self._count('coalesced_shared')
+                    logger.info(f"Shared another worker's metadata fetch for {streaming_url}")
+                    return self.result_from_entry(entry)
+
+            try:
+                meta_data_dict = fetch()
+            except tuple(NEGATIVE_CACHE_ERRORS.values()) as e:
+                self.set_error(key, e)
+                raise
+
+            self.set(key, platform, meta_data_dict)
+            return dict(meta_data_dict)
+
+    def get_or_fetch_many(self, streaming_urls: list, track_type: str, platform: str, fetch_batch) -> tuple:
+        '''
+        Batch version of get_or_fetch(): cached links are served from the cache and the links nobody else is
+        fetching go to one fetch_batch(urls) call, which returns {url: meta_data_dict or exception}.
+        Results and negatively cached errors are stored as get_or_fetch() stores them.
+
+        Returns (results, in_flight): in_flight lists the links another thread or worker is already fetching,
+        for the caller to hand to get_or_fetch(), which waits for that fetch.
+        '''
+        results = {}
+        in_flight = []
+        #url -> (key, _Flight) for the links this call fetches
+        leading = {}
+        with ExitStack() as locks:
+            for streaming_url in dict.fromkeys(streaming_urls):
+                key = self.make_key(streaming_url, track_type)
+                entry = self.get_entry(key)
+                if entry is not None:
+                    try:
+                        results[streaming_url] = self.result_from_entry(entry)
+                    except Exception as e:
+                        results[streaming_url] = e
+                    continue
+
+                with self._lock:
+                    if key in self._flights:
+                        in_flight.append(streaming_url)
+                        continue
+                    flight = self._flights[key] = _Flight()
+                if not locks.enter_context(cache_lock(f"{key}:lock", timeout=self.lock_timeout, wait=0)):
+                    #Another worker is fetching it: let go of the flight, get_or_fetch() will wait for that worker
+                    self._land(key, flight)
+                    in_flight.append(streaming_url)
+                    continue
+                leading[streaming_url] = (key, flight)
+
+            if not leading:
+                return results, in_flight
+
+            try:
+                batch = fetch_batch(list(leading))
+            except Exception as e:
+                batch = {streaming_url: e for streaming_url in leading}
+
+            for streaming_url, (key, flight) in leading.items():
+                meta_data_dict = batch.get(streaming_url)
+                if isinstance(meta_data_dict, dict):
+                    self.set(key, platform, meta_data_dict)
+                    flight.meta_data_dict = meta_data_dict
+                    meta_data_dict = dict(meta_data_dict)
+                elif isinstance(meta_data_dict, Exception):
+                    if isinstance(meta_data_dict, tuple(NEGATIVE_CACHE_ERRORS.values())):
+                        self.set_error(key, meta_data_dict)
+                    flight.error = meta_data_dict
+                self._land(key, flight)
+                results[streaming_url] = meta_data_dict
+        return results, in_flight
+
+    def _land(self, key: str, flight: _Flight):
+        with self._lock:
+            self._flights.pop(key, None)
+        flight.done.set()
+
+    def _wait_for_shared_entry(self, key: str, lock_key: str, wait: float):
+        '''
+        Poll the shared tier until the entry appears, the lock holder lets go without storing one, or `wait` runs out.
+        '''
+        wait_until = time.monotonic() + wait
+        while True:
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+            if cache.get(lock_key) is None or time.monotonic() + self.poll_interval > wait_until:
+                return None
+            time.sleep(self.poll_interval)
+
+    def invalidate(self, streaming_url: str, track_type: str):
+        key = self.make_key(streaming_url, track_type)
+        with self._lock:
+            self._local.pop(key, None)
+        cache.delete(key)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['local_entries'] = len(self._local)
+        hits = stats.get('local_hits', 0) + stats.get('shared_hits', 0)
+        lookups = hits + stats.get('misses', 0)
+        stats['hit_rate'] = hits / lookups if lookups else 0.0
+        return stats
+
+
+metadata_cache = MetadataCache(
+    ttls=settings.METADATA_CACHE_TTLS,
+    negative_ttl=settings.METADATA_CACHE_NEGATIVE_TTL,
+    max_local_entries=settings.METADATA_CACHE_LOCAL_MAX_ENTRIES,
+    single_flight_wait=settings.METADATA_SINGLE_FLIGHT_WAIT,
+    lock_timeout=settings.METADATA_SINGLE_FLIGHT_LOCK_TIMEOUT,
+)
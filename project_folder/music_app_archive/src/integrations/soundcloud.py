@@ -2,54 +2,193 @@ from bs4 import BeautifulSoup
 import requests
 
 from django.conf import settings
+from django.core.cache import cache
 
-from ..custom_exceptions import SoundcloudMetaDataError
+import threading
+
+from . import http_client
+from ..custom_exceptions import SoundcloudMetaDataError, DeadlineExceededError
+from ..deadline import Deadline, deadline_timeout
+from ..utils import cache_lock
 
 
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SOUNDCLOUD_TOKEN_URL = "https://api.soundcloud.com/oauth2/token"
+SOUNDCLOUD_RESOLVE_URL = "https://api.soundcloud.com/resolve"
+#SoundCloud client-credential tokens last an hour if the response doesn't say otherwise
+SOUNDCLOUD_DEFAULT_TOKEN_LIFETIME = 3600
+
 
-def get_soundcloud_metadata(soundcloud_url: str) -> dict:
+class SoundcloudTokenProvider:
     '''
-    Use SoundCloud API to get get a response json
+    Shares one SoundCloud OAuth access token between every request and every worker.
+
+    - The token lives in the Django cache until shortly before it expires (expires_in - refresh margin).
+    - Refreshes happen under an in-process lock plus a cache lock, so only one refresh runs
+      when many workers find the token missing at the same time.
     '''
-    try:
-        # Get OAuth access token using client credentials
-        token_response = requests.post("https://api.soundcloud.com/oauth2/token", data={
+    cache_key = "soundcloud:access_token"
+    lock_key = "soundcloud:access_token:lock"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def get_token(self, stale_token: str = None, deadline: Deadline = None) -> str:
+        '''
+        Return a valid access token.
+        Pass the token that was just rejected as stale_token to force a refresh; if another
+        worker has already replaced it, the new token is returned without another refresh.
+        '''
+        token = cache.get(self.cache_key)
+        if token and token != stale_token:
+            return token
+
+        with self._lock:
+            with cache_lock(self.lock_key, wait=deadline_timeout(deadline, 5)) as acquired:
+                if not acquired:
+                    logger.warning("Timed out waiting for the SoundCloud token lock, refreshing anyway")
+
+                #Another thread or worker may have refreshed while we waited
+                token = cache.get(self.cache_key)
+                if token and token != stale_token:
+                    return token
+
+                return self._refresh(deadline)
+
+    def _refresh(self, deadline: Deadline = None) -> str:
+        '''
+        Request a new token with client credentials and store it in the cache.
+        '''
+        token_response = http_client.post(SOUNDCLOUD_TOKEN_URL, data={
             "grant_type": "client_credentials",
             "client_id": settings.SOUNDCLOUD_CLIENT_ID,
             "client_secret": settings.SOUNDCLOUD_CLIENT_SECRET
-        })
+        }, deadline=deadline)
         token_response.raise_for_status()
-        access_token = token_response.json().get("access_token")
+        token_json = token_response.json()
+        access_token = token_json.get("access_token")
 
         if not access_token:
             raise SoundcloudMetaDataError("Failed to retrieve SoundCloud access token")
 
-        # Resolve the URL to a track object using OAuth token
-        resolve_endpoint = "https://api.soundcloud.com/resolve"
-        headers = {"Authorization": f"OAuth {access_token}"}
-        params = {"url": soundcloud_url}
+        try:
+            expires_in = int(token_json.get("expires_in") or SOUNDCLOUD_DEFAULT_TOKEN_LIFETIME)
+        except (TypeError, ValueError):
+            expires_in = SOUNDCLOUD_DEFAULT_TOKEN_LIFETIME
+
+        cache.set(self.cache_key, access_token, max(expires_in - settings.SOUNDCLOUD_TOKEN_REFRESH_MARGIN, 1))
+        logger.info(f"Refreshed SoundCloud access token, valid for {expires_in}s")
+        return access_token
+
+    def invalidate(self):
+        cache.delete(self.cache_key)
+
+
+soundcloud_token_provider = SoundcloudTokenProvider()
+
+
+def resolve_soundcloud_url(soundcloud_url: str, access_token: str, deadline: Deadline = None) -> requests.Response:
+    '''
+    Call the /resolve endpoint for a SoundCloud URL with the given OAuth token.
+    '''
+    headers = {"Authorization": f"OAuth {access_token}"}
+    params = {"url": soundcloud_url}
+    return http_client.get(SOUNDCLOUD_RESOLVE_URL, params=params, headers=headers, deadline=deadline)
 
-        response = requests.get(resolve_endpoint, params=params, headers=headers)
+
+def get_soundcloud_metadata(soundcloud_url: str, deadline: Deadline = None) -> dict:
+    '''
+    Use SoundCloud API to get get a response json.
+    The access token comes from the shared token cache; a 401 triggers one retry with a refreshed token.
+    Every call spends from the deadline, if one is given.
+    '''
+    try:
+        access_token = soundcloud_token_provider.get_token(deadline=deadline)
+
+        # Resolve the URL to a track object using OAuth token
+        response = resolve_soundcloud_url(soundcloud_url, access_token, deadline=deadline)
+        if response.status_code == 401:
+            logger.info("SoundCloud rejected the cached access token, refreshing and retrying once")
+            access_token = soundcloud_token_provider.get_token(stale_token=access_token, deadline=deadline)
+            response = resolve_soundcloud_url(soundcloud_url, access_token, deadline=deadline)
         response.raise_for_status()
         soundcloud_metadata = response.json()
 
         return soundcloud_metadata
 
-    except SoundcloudMetaDataError:
+    except (SoundcloudMetaDataError, DeadlineExceededError):
         raise
     except requests.exceptions.HTTPError as e:
         logger.error(f"HTTP error fetching SoundCloud metadata for {soundcloud_url}: {e}")
         raise SoundcloudMetaDataError(f"HTTP error fetching SoundCloud metadata: {str(e)}") from e
+    except requests.exceptions.Timeout as e:
+        if deadline is not None and deadline.expired():
+            #Our own budget ran out, not a SoundCloud failure (and not worth negatively caching)
+            raise DeadlineExceededError("Ran out of time waiting for the SoundCloud API") from e
+        logger.error(f"Timed out fetching SoundCloud metadata for {soundcloud_url}: {e}")
+        raise SoundcloudMetaDataError(f"Timed out fetching SoundCloud metadata: {str(e)}") from e
     except Exception as e:
         logger.error(f"Unexpected error fetching SoundCloud metadata for {soundcloud_url}: {e}")
         raise SoundcloudMetaDataError(f"Failed to fetch SoundCloud metadata: {str(e)}") from e
     
 
-def orchestrate_soundcloud_meta_data_dictionary(soundcloud_url: str, track_type: str) -> dict:
+def build_soundcloud_meta_data_dict(soundcloud_response: dict, soundcloud_url: str, track_type: str) -> dict:
+    '''
+    Generate the soundcloud_metadata_dict from a SoundCloud track object, based on the track_type.
+    '''
+    #Extract metadat from soundcloud_response and generate soundcloud_metadata_dict based on track_type
+    if track_type == "mix":
+        soundcloud_metadata_dict = {
+            'track_type': track_type,
+            'track_name':  soundcloud_response.get("title"),
+            'artist': soundcloud_response.get("metadata_artist"),
+            'mix_page': soundcloud_response.get("user", {}).get("username"),
+            'streaming_platform': "soundcloud",
+            'streaming_link': soundcloud_url
+        }
+    else:
+        soundcloud_metadata_dict = {
+            'track_type': track_type,
+            'track_name': soundcloud_response.get("title"),
+            'artist': soundcloud_response.get("user", {}).get("username"),
+            'streaming_platform': "soundcloud",
+            'streaming_link': soundcloud_url,
+            'purchase_link': soundcloud_response.get("purchase_url"),
+            'record_label': soundcloud_response.get("label_name"),
+            'genre': soundcloud_response.get("tag_list")
+        }
+    return soundcloud_metadata_dict
+
+
+def get_soundcloud_set_meta_data_dicts(set_url: str, track_type: str, max_items: int) -> dict:
+    '''
+    Resolve a SoundCloud set (playlist/album) once and build the meta_data_dict of each of its tracks
+    from the embedded track objects, so no per-track API call is needed.
+
+    Returns {track_url: meta_data_dict or SoundcloudMetaDataError}, in set order.
+    '''
+    set_response = get_soundcloud_metadata(set_url)
+    if set_response.get("kind") != "playlist":
+        raise SoundcloudMetaDataError(f"SoundCloud URL is not a set: {set_url}")
+
+    results = {}
+    for track in (set_response.get("tracks") or [])[:max_items]:
+        track_url = track.get("permalink_url")
+        if not track_url:
+            #Long sets only embed the id of the later tracks
+            results[f"soundcloud:track:{track.get('id')}"] = SoundcloudMetaDataError(
+                f"SoundCloud returned no details for track id={track.get('id')}"
+            )
+            continue
+        results[track_url] = build_soundcloud_meta_data_dict(track, track_url, track_type)
+
+    return results
+
+
+def orchestrate_soundcloud_meta_data_dictionary(soundcloud_url: str, track_type: str, deadline: Deadline = None) -> dict:
     '''
     The following function is the orchestration module to generate the meta_data_dictionary for 
     Soundcloud links.
@@ -60,33 +199,11 @@ def orchestrate_soundcloud_meta_data_dictionary(soundcloud_url: str, track_type:
     '''
     try:
         #Get the information via the API
-        soundcloud_response = get_soundcloud_metadata(soundcloud_url)
-
-        #Extract metadat from soundcloud_response and generate soundcloud_metadata_dict based on track_type
-        if track_type == "mix":
-            soundcloud_metadata_dict = {
-                'track_type': track_type,
-                'track_name':  soundcloud_response.get("title"),
-                'artist': soundcloud_response.get("metadata_artist"),
-                'mix_page': soundcloud_response.get("user", {}).get("username"),
-                'streaming_platform': "soundcloud",
-                'streaming_link': soundcloud_url
-            }
-        else:
-            soundcloud_metadata_dict = {
-                'track_type': track_type,
-                'track_name': soundcloud_response.get("title"),
-                'artist': soundcloud_response.get("user", {}).get("username"),
-                'streaming_platform': "soundcloud",
-                'streaming_link': soundcloud_url,
-                'purchase_link': soundcloud_response.get("purchase_url"),
-                'record_label': soundcloud_response.get("label_name"),
-                'genre': soundcloud_response.get("tag_list")
-            }
-                
-        return soundcloud_metadata_dict
-
-    except SoundcloudMetaDataError:
+        soundcloud_response = get_soundcloud_metadata(soundcloud_url, deadline=deadline)
+
+        return build_soundcloud_meta_data_dict(soundcloud_response, soundcloud_url, track_type)
+
+    except (SoundcloudMetaDataError, DeadlineExceededError):
         raise
     except Exception as e:
         logger.error(f"Unexpected error orchestrating Soundcloud metadata for {soundcloud_url}: {e}")
@@ -1,60 +1,51 @@
-from urllib.parse import urlparse, parse_qs
-import re
+from urllib.parse import urlparse, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import json
+import threading
 
 from django.conf import settings
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
 
-from ..utils import orch_validate_input_string
-from ..custom_exceptions import YouTubeMetaDataError
+from ..utils import orch_validate_input_string, platform_for_hostname, normalise_streaming_url, youtube_video_id, YOUTUBE_VIDEO_ID_RE
+from ..custom_exceptions import YouTubeMetaDataError, DeadlineExceededError
+from ..deadline import Deadline
 
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+#videos.list accepts at most 50 ids per call, and a call costs the same quota whatever the count
+YOUTUBE_MAX_IDS_PER_REQUEST = 50
+
 
 def extract_youtube_video_id_from_url(youtube_url: str) -> str:
     '''
-    Extract a YouTube video id from a variety of URL formats.
+    Extract a YouTube video id from a variety of URL formats (watch?v=, youtu.be, m. and music.youtube.com,
+    /shorts/, /live/, /embed/), the same ones canonicalise_streaming_link() accepts.
     Returns the 11-char video id or None if it cannot be extracted.
     '''
     #validate youtube_url
     orch_validate_input_string(youtube_url, 'youtube_url')
 
     try:
-        parsed_url = urlparse(youtube_url)
-    except Exception as exc:
+        parsed_url = urlsplit(normalise_streaming_url(youtube_url))
+        hostname = (parsed_url.hostname or "").lower()
+    except ValueError as exc:
         logger.exception("Failed to parse URL %r: %s", youtube_url, exc)
         return None
 
-    hostname = parsed_url.hostname or ""
-    hostname = hostname.lower()
-
-    # Standard watch URL: youtube.com/watch?v=VIDEO_ID
-    if hostname in ("www.youtube.com", "youtube.com", "music.youtube.com"):
-        query_params = parse_qs(parsed_url.query)
-        vid = query_params.get("v", [None])[0]
-        if vid and re.match(r"^[A-Za-z0-9_-]{11}$", vid):
-            return vid
-        logger.debug("No valid 'v' param found in URL %r", youtube_url)
-        return None
-
-    #Shortened URL: youtu.be/VIDEO_ID
-    if hostname == "youtu.be":
-        path = (parsed_url.path or "").lstrip("/")
-        if path and re.match(r"^[A-Za-z0-9_-]{11}$", path):
-            return path
-        logger.debug("Short youtu.be URL did not contain a valid id: %r", youtube_url)
+    if platform_for_hostname(hostname) != 'youtube':
+        logger.debug("extract_youtube_video_id_from_url: unsupported hostname %r in URL %r", hostname, youtube_url)
         return None
 
-    #Some embedded urls: /embed/VIDEO_ID
-    if "/embed/" in parsed_url.path:
-        candidate = parsed_url.path.split("/embed/")[-1].split("/")[0]
-        if re.match(r"^[A-Za-z0-9_-]{11}$", candidate):
-            return candidate
-
-    logger.debug("extract_youtube_video_id_from_url: unsupported hostname %r in URL %r", hostname, youtube_url)
-    return None
+    video_id = youtube_video_id(parsed_url, hostname)
+    if video_id is None:
+        logger.debug("No valid video id found in URL %r", youtube_url)
+    return video_id
 
 
 def get_artist_from_channel_title(channel_title: str) -> str:
@@ -98,29 +89,132 @@ def get_youtube_platform(youtube_url: str) -> str:
         return "youtube"
 
 
-def get_youtube_metadata_dict(video_id: str) -> dict:
+#Process-wide YouTube client, rebuilt only when the API key changes
+_youtube_client = None
+_youtube_client_key = None
+_youtube_client_lock = threading.Lock()
+#httplib2.Http is not thread-safe, so every thread executes requests on its own connection
+_thread_local = threading.local()
+
+
+def load_youtube_discovery_document() -> str:
+    '''
+    Load the YouTube Data API v3 discovery document without a network fetch.
+
+    Uses settings.YOUTUBE_DISCOVERY_DOCUMENT if it points at a file, otherwise the
+    document that ships inside google-api-python-client.
+    '''
+    discovery_path = getattr(settings, "YOUTUBE_DISCOVERY_DOCUMENT", None)
+    if discovery_path:
+        with open(discovery_path, encoding="utf-8") as discovery_file:
+            return discovery_file.read()
+
+    discovery_document = get_static_doc("youtube", "v3")
+    if not discovery_document:
+        raise YouTubeMetaDataError("YouTube discovery document is not available offline")
+    return discovery_document
+
+
+def get_youtube_client():
+    '''
+    Return the cached YouTube Data API client, building it on first use.
+    Thread-safe; the client is rebuilt only when settings.YOUTUBE_API_KEY changes.
+    '''
+    global _youtube_client, _youtube_client_key
+
+    api_key = settings.YOUTUBE_API_KEY
+    client = _youtube_client
+    if client is not None and _youtube_client_key == api_key:
+        return client
+
+    with _youtube_client_lock:
+        if _youtube_client is None or _youtube_client_key != api_key:
+            logger.info("Building YouTube client from the offline discovery document")
+            _youtube_client = build_from_document(
+                json.loads(load_youtube_discovery_document()),
+                developerKey=api_key,
+                http=build_http()
+            )
+            _youtube_client_key = api_key
+        return _youtube_client
+
+
+def reset_youtube_client():
+    '''
+    Drop the cached YouTube client (used by tests).
+    '''
+    global _youtube_client, _youtube_client_key
+    with _youtube_client_lock:
+        _youtube_client = None
+        _youtube_client_key = None
+
+
+def get_thread_http():
+    '''
+    Return this thread's HTTP connection for executing YouTube requests.
+    '''
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        http = build_http()
+        _thread_local.http = http
+    return http
+
+
+@contextmanager
+def http_timeout(http, seconds: float):
+    '''
+    Temporarily apply a timeout to this thread's httplib2 connection: new sockets pick up http.timeout,
+    keep-alive sockets that are already open are updated in place.
+    '''
+    def apply(timeout):
+        http.timeout = timeout
+        for connection in http.connections.values():
+            if getattr(connection, 'sock', None) is not None:
+                connection.sock.settimeout(timeout)
+
+    previous_timeout = http.timeout
+    apply(seconds)
+    try:
+        yield http
+    finally:
+        apply(previous_timeout)
+
+
+def get_youtube_metadata_dict(video_id: str, deadline: Deadline = None) -> dict:
     '''
     Retrieve YouTube metadata for a given video_id using the YouTube Data API.
     Raises YouTubeMetaDataError on failure. Returns a normalized dict on success.
+    With a deadline the call only waits for what is left of it (DeadlineExceededError once it runs out).
     '''
     #Validate video_id
     orch_validate_input_string(video_id, "video_id")
     #basic sanity check of ID shape
-    if not re.match(r"^[A-Za-z0-9_-]{11}$", video_id):
+    if not YOUTUBE_VIDEO_ID_RE.match(video_id):
         raise YouTubeMetaDataError(f"video_id does not look valid: {video_id}")
 
     try:
-        youtube = build("youtube", "v3", developerKey=settings.YOUTUBE_API_KEY)
+        youtube = get_youtube_client()
     except Exception as exc:
         logger.exception("Failed to build YouTube client: %s", exc)
         raise YouTubeMetaDataError("Failed to initialize YouTube client") from exc
     
     try:
-        response = youtube.videos().list(part="snippet", id=video_id).execute()
+        http = get_thread_http()
+        if deadline is None:
+            response = youtube.videos().list(part="snippet", id=video_id).execute(http=http)
+        else:
+            deadline.check("the YouTube videos.list call")
+            with http_timeout(http, deadline.timeout(http.timeout)):
+                response = youtube.videos().list(part="snippet", id=video_id).execute(http=http)
+    except DeadlineExceededError:
+        raise
     except HttpError as exc:
         logger.exception("YouTube API HttpError for id=%s: %s", video_id, exc)
         raise YouTubeMetaDataError(f"YouTube API error: {exc}") from exc
     except Exception as exc:
+        if deadline is not None and deadline.expired():
+            logger.warning("YouTube API call for id=%s ran out of time: %s", video_id, exc)
+            raise DeadlineExceededError("Ran out of time waiting for the YouTube API") from exc
         logger.exception("Unexpected error calling YouTube API for id=%s: %s", video_id, exc)
         raise YouTubeMetaDataError("Unexpected error calling YouTube API") from exc
     
@@ -133,8 +227,13 @@ def get_youtube_metadata_dict(video_id: str) -> dict:
         raise YouTubeMetaDataError(f"No video found for id={video_id}")
     
     item=items[0]
-    snippet = item["snippet"]
+    return build_youtube_meta_data_dict(item["snippet"])
 
+
+def build_youtube_meta_data_dict(snippet: dict) -> dict:
+    '''
+    Turn the snippet of a videos.list item into the normalized meta_data_dict.
+    '''
     #Get the title out relevant fields
     track_name = snippet.get("title")
     #Get the artist from channel title
@@ -157,7 +256,143 @@ def get_youtube_metadata_dict(video_id: str) -> dict:
     return meta_data_dict
 
 
-def orchestrate_get_youtube_meta_data_dict(youtube_url: str, track_type: str) -> dict:
+def fetch_youtube_metadata_chunk(youtube, video_ids: list, deadline: Deadline = None) -> dict:
+    '''
+    One videos.list call for up to YOUTUBE_MAX_IDS_PER_REQUEST ids, waiting at most what is left of the deadline.
+    Returns {video_id: meta_data_dict or YouTubeMetaDataError}; an API failure is reported against every id in the chunk.
+    '''
+    try:
+        #No maxResults: the API doesn't support it together with id, the chunk size already bounds the response
+        request = youtube.videos().list(part="snippet", id=",".join(video_ids))
+        http = get_thread_http()
+        if deadline is None:
+            response = request.execute(http=http)
+        else:
+            deadline.check("the YouTube videos.list call")
+            with http_timeout(http, deadline.timeout(http.timeout)):
+                response = request.execute(http=http)
+    except DeadlineExceededError as exc:
+        return {video_id: exc for video_id in video_ids}
+    except HttpError as exc:
+        logger.exception("YouTube API HttpError for batch of %d ids: %s", len(video_ids), exc)
+        error = YouTubeMetaDataError(f"YouTube API error: {exc}")
+        #Chained like `raise ... from exc`, so classify_failure() sees the quota / 5xx status
+        error.__cause__ = exc
+        return {video_id: error for video_id in video_ids}
+    except Exception as exc:
+        if deadline is not None and deadline.expired():
+            logger.warning("YouTube API call for a batch of %d ids ran out of time: %s", len(video_ids), exc)
+            error = DeadlineExceededError("Ran out of time waiting for the YouTube API")
+            error.__cause__ = exc
+            return {video_id: error for video_id in video_ids}
+        logger.exception("Unexpected error calling YouTube API for batch of %d ids: %s", len(video_ids), exc)
+        error = YouTubeMetaDataError("Unexpected error calling YouTube API")
+        error.__cause__ = exc
+        return {video_id: error for video_id in video_ids}
+
+    found = {}
+    for item in response.get("items", []):
+        try:
+            found[item["id"]] = build_youtube_meta_data_dict(item["snippet"])
+        except Exception as exc:
+            logger.exception("Could not parse YouTube item %r: %s", item.get("id"), exc)
+
+    #Private, deleted or unknown ids are simply missing from the response
+    return {
+        video_id: found.get(video_id) or YouTubeMetaDataError(f"No video found for id={video_id}")
+        for video_id in video_ids
+    }
+
+
+def get_youtube_metadata_batch(video_ids: list, deadline: Deadline = None) -> dict:
+    '''
+    Retrieve YouTube metadata for many video ids with as few videos.list calls as possible.
+
+    - Ids are de-duplicated and split into chunks of YOUTUBE_MAX_IDS_PER_REQUEST (50).
+    - Chunks run concurrently on up to settings.YOUTUBE_BATCH_MAX_WORKERS threads.
+    - Returns {video_id: meta_data_dict} with a YouTubeMetaDataError in place of the dict
+      for every id that failed, so one bad id never fails the whole batch.
+    - With a deadline every call only waits for what is left of it.
+    '''
+    results = {}
+    valid_ids = []
+    for video_id in dict.fromkeys(video_ids):
+        if isinstance(video_id, str) and YOUTUBE_VIDEO_ID_RE.match(video_id):
+            valid_ids.append(video_id)
+        else:
+            results[video_id] = YouTubeMetaDataError(f"video_id does not look valid: {video_id}")
+
+    if not valid_ids:
+        return results
+
+    try:
+        youtube = get_youtube_client()
+    except Exception as exc:
+        logger.exception("Failed to build YouTube client: %s", exc)
+        error = YouTubeMetaDataError("Failed to initialize YouTube client")
+        results.update({video_id: error for video_id in valid_ids})
+        return results
+
+    chunks = [
+        valid_ids[start:start + YOUTUBE_MAX_IDS_PER_REQUEST]
+        for start in range(0, len(valid_ids), YOUTUBE_MAX_IDS_PER_REQUEST)
+    ]
+    if len(chunks) == 1:
+        results.update(fetch_youtube_metadata_chunk(youtube, chunks[0], deadline))
+        return results
+
+    max_workers = min(settings.YOUTUBE_BATCH_MAX_WORKERS, len(chunks))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="youtube-batch") as executor:
+        for chunk_results in executor.map(lambda chunk: fetch_youtube_metadata_chunk(youtube, chunk, deadline), chunks):
+            results.update(chunk_results)
+
+    logger.info(f"Fetched YouTube metadata for {len(valid_ids)} id(s) in {len(chunks)} request(s)")
+    return results
+
+
+def get_youtube_playlist_video_ids(playlist_id: str, max_items: int) -> list:
+    '''
+    Page through playlistItems.list (50 items per call) and return up to max_items video ids, in playlist order.
+    Raises YouTubeMetaDataError if the playlist can't be read (private, deleted, quota, ...).
+    '''
+    orch_validate_input_string(playlist_id, "playlist_id")
+
+    try:
+        youtube = get_youtube_client()
+    except Exception as exc:
+        logger.exception("Failed to build YouTube client: %s", exc)
+        raise YouTubeMetaDataError("Failed to initialize YouTube client") from exc
+
+    video_ids = []
+    page_token = None
+    while len(video_ids) < max_items:
+        try:
+            response = youtube.playlistItems().list(
+                part="contentDetails",
+                playlistId=playlist_id,
+                maxResults=YOUTUBE_MAX_IDS_PER_REQUEST,
+                pageToken=page_token
+            ).execute(http=get_thread_http())
+        except HttpError as exc:
+            logger.exception("YouTube API HttpError for playlist=%s: %s", playlist_id, exc)
+            raise YouTubeMetaDataError(f"YouTube API error: {exc}") from exc
+        except Exception as exc:
+            logger.exception("Unexpected error calling YouTube API for playlist=%s: %s", playlist_id, exc)
+            raise YouTubeMetaDataError("Unexpected error calling YouTube API") from exc
+
+        for item in response.get("items", []):
+            video_id = item.get("contentDetails", {}).get("videoId")
+            if video_id:
+                video_ids.append(video_id)
+
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    return video_ids[:max_items]
+
+
+def orchestrate_get_youtube_meta_data_dict(youtube_url: str, track_type: str, deadline: Deadline = None) -> dict:
     '''
     High-level orchestrator: extract id, fetch metadata, and update the dict.
     Raises ValueError or YouTubeMetadataError if something goes wrong.
@@ -172,7 +407,7 @@ def orchestrate_get_youtube_meta_data_dict(youtube_url: str, track_type: str) ->
 
     try:
         #Generate meta_data_dict
-        meta_data_dict =  get_youtube_metadata_dict(youtube_video_id)
+        meta_data_dict =  get_youtube_metadata_dict(youtube_video_id, deadline=deadline)
         #Add streaming_platform to meta_data_dict
         streaming_platform = get_youtube_platform(youtube_url)
         meta_data_dict.update({"streaming_platform": streaming_platform})
@@ -180,7 +415,7 @@ def orchestrate_get_youtube_meta_data_dict(youtube_url: str, track_type: str) ->
         meta_data_dict.update({"track_type": track_type})
         meta_data_dict.update({"streaming_link": youtube_url})
         return meta_data_dict
-    except YouTubeMetaDataError:
+    except (YouTubeMetaDataError, DeadlineExceededError):
         raise
     except Exception as e:
         logger.error(f"Unexpected error orchestrating YouTube metadata for {youtube_url}: {e}")
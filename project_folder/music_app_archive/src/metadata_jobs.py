@@ -0,0 +1,254 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import uuid
+
+from .integrations.main_integrations import orchestrate_platform_api
+from .custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError, DeadlineExceededError
+from .deadline import Deadline
+
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+#Job statuses
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+#Metadata fetched, meta_data_dict is ready
+JOB_DONE = 'done'
+#Platform error, meta_data_dict holds the blank dict for manual entry
+JOB_FALLBACK = 'fallback'
+#Invalid URL or unexpected error, the user has to submit the link again
+JOB_FAILED = 'failed'
+
+FINISHED_JOB_STATUSES = (JOB_DONE, JOB_FALLBACK, JOB_FAILED)
+
+#Job kinds, so a status view never reads another kind's fields (jobs share the cache namespace)
+JOB_KIND_METADATA = 'metadata'
+JOB_KIND_COLLECTION_IMPORT = 'collection_import'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def build_manual_meta_data_dict(streaming_link: str, track_type: str, partial_meta_data_dict: dict = None) -> dict:
+    '''
+    Minimal meta_data_dict used when the platform couldn't give us metadata, so the user can enter it manually.
+    Non-empty values from partial_meta_data_dict (e.g. DeadlineExceededError.partial_meta_data_dict) are kept.
+    '''
+    meta_data_dict = {
+        'track_type': track_type,
+        'streaming_link': streaming_link,
+        'streaming_platform': 'unknown',
+        'track_name': '',
+        'artist': '',
+        'album_name': '',
+        'mix_page': '',
+        'record_label': '',
+        'genre': '',
+        'purchase_link': ''
+    }
+    meta_data_dict.update({key: value for key, value in (partial_meta_data_dict or {}).items() if value})
+    return meta_data_dict
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    '''
+    Return the process-wide thread pool that runs metadata jobs, creating it on first use.
+    '''
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.METADATA_JOBS_WORKERS,
+                    thread_name_prefix='metadata-job'
+                )
+    return _executor
+
+
+def job_cache_key(job_id: str) -> str:
+    return f"metadata_job:{job_id}"
+
+
+def get_metadata_job(job_id: str) -> dict:
+    '''
+    Return the job's state dict, or None if it doesn't exist (or has expired).
+    '''
+    return cache.get(job_cache_key(job_id))
+
+
+def update_metadata_job(job_id: str, **fields) -> dict:
+    '''
+    Merge fields into the job's state. Only the worker running the job writes to it after creation.
+    '''
+    job = get_metadata_job(job_id) or {}
+    job.update(fields, updated_at=time.time())
+    cache.set(job_cache_key(job_id), job, settings.METADATA_JOBS_TTL)
+    return job
+
+
+def enqueue_metadata_job(streaming_link: str, track_type: str, user_id: int) -> str:
+    '''
+    Record a pending job in the cache and hand it to the worker pool.
+    Returns the job_id the client polls with.
+    '''
+    job_id = uuid.uuid4().hex
+    update_metadata_job(
+        job_id,
+        status=JOB_PENDING,
+        kind=JOB_KIND_METADATA,
+        user_id=user_id,
+        streaming_link=streaming_link,
+        track_type=track_type,
+        meta_data_dict=None,
+        message='',
+        created_at=time.time()
+    )
+    get_job_executor().submit(run_metadata_job, job_id)
+    logger.info(f"Enqueued metadata job {job_id} for {streaming_link}")
+    return job_id
+
+
+def run_metadata_job(job_id: str):
+    '''
+    Worker side of a metadata job: call orchestrate_platform_api() and store the outcome on the job,
+    mirroring the error handling of views.add_streaming_link_to_playlist().
+    '''
+    job = get_metadata_job(job_id)
+    if job is None:
+        logger.warning(f"Metadata job {job_id} expired before it ran")
+        return
+
+    streaming_link = job['streaming_link']
+    track_type = job['track_type']
+    update_metadata_job(job_id, status=JOB_RUNNING)
+
+    try:
+        meta_data_dict = orchestrate_platform_api(streaming_link, track_type, deadline=Deadline(settings.METADATA_JOB_DEADLINE_SECONDS))
+        update_metadata_job(job_id, status=JOB_DONE, meta_data_dict=meta_data_dict)
+        logger.info(f"Metadata job {job_id} finished for {streaming_link}")
+    except DeadlineExceededError as e:
+        logger.warning(f"Metadata job {job_id} ran out of time for {streaming_link}: {str(e)}")
+        update_metadata_job(
+            job_id,
+            status=JOB_FALLBACK,
+            meta_data_dict=build_manual_meta_data_dict(streaming_link, track_type, e.partial_meta_data_dict),
+            message="Fetching metadata took too long. Please check the track details and fill in the rest manually."
+        )
+    except (YouTubeMetaDataError, BandCampMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError) as e:
+        logger.warning(f"Platform API error in metadata job {job_id} for {streaming_link}: {str(e)}")
+        update_metadata_job(
+            job_id,
+            status=JOB_FALLBACK,
+            meta_data_dict=build_manual_meta_data_dict(streaming_link, track_type),
+            message=f"Could not fetch metadata: {str(e)}. Please enter track details manually."
+        )
+    except ValueError as e:
+        logger.warning(f"Invalid URL in metadata job {job_id}: {streaming_link} - {str(e)}")
+        update_metadata_job(job_id, status=JOB_FAILED, message=str(e))
+    except Exception as e:
+        logger.exception(f"Unexpected error in metadata job {job_id} for {streaming_link}: {e}")
+        update_metadata_job(job_id, status=JOB_FAILED, message="An unexpected error occurred. Please try again.")
+    finally:
+        #Worker threads aren't part of a request, so clean up their DB connections ourselves
+        close_old_connections()
+
+
+def _record_collection_import_job(playlist_id: int, user_id: int, collection_url: str, track_type: str) -> str:
+    '''
+    Store a pending collection import job and return its job_id.
+    '''
+    job_id = uuid.uuid4().hex
+    update_metadata_job(
+        job_id,
+        status=JOB_PENDING,
+        kind=JOB_KIND_COLLECTION_IMPORT,
+        user_id=user_id,
+        playlist_id=playlist_id,
+        collection_url=collection_url,
+        track_type=track_type,
+        progress={'stage': 'pending', 'done': 0, 'total': 0},
+        result=None,
+        message='',
+        created_at=time.time()
+    )
+    return job_id
+
+
+def enqueue_collection_import_job(playlist_id: int, user_id: int, collection_url: str, track_type: str) -> str:
+    '''
+    Record a pending collection import and hand it to the worker pool.
+    Returns the job_id the client polls with.
+    '''
+    job_id = _record_collection_import_job(playlist_id, user_id, collection_url, track_type)
+    get_job_executor().submit(run_collection_import_job, job_id)
+    logger.info(f"Enqueued collection import job {job_id} for {collection_url}")
+    return job_id
+
+
+def run_collection_import_now(playlist_id: int, user_id: int, collection_url: str, track_type: str) -> str:
+    '''
+    Record a collection import and run it in the calling thread, for when METADATA_JOBS_ENABLED is off.
+    Returns the job_id of the finished job, so import_collection_status() shows the summary as usual.
+    '''
+    job_id = _record_collection_import_job(playlist_id, user_id, collection_url, track_type)
+    logger.info(f"Running collection import job {job_id} for {collection_url} in the request")
+    _run_collection_import(job_id)
+    return job_id
+
+
+def run_collection_import_job(job_id: str):
+    '''
+    Worker side of a collection import, see _run_collection_import().
+    '''
+    try:
+        _run_collection_import(job_id)
+    finally:
+        #Worker threads aren't part of a request, so clean up their DB connections ourselves
+        close_old_connections()
+
+
+def _run_collection_import(job_id: str):
+    '''
+    Run import_collection_into_playlist() for a recorded job and store the progress and the summary on it.
+    '''
+    #Imported here as it pulls in the models
+    from ..models import Playlist
+    from music_app_auth.models import CustomUser
+    from .collection_import import parse_collection_url, import_collection_into_playlist
+
+    job = get_metadata_job(job_id)
+    if job is None:
+        logger.warning(f"Collection import job {job_id} expired before it ran")
+        return
+
+    update_metadata_job(job_id, status=JOB_RUNNING)
+
+    def progress(stage, done, total):
+        update_metadata_job(job_id, progress={'stage': stage, 'done': done, 'total': total})
+
+    try:
+        playlist = Playlist.objects.get(pk=job['playlist_id'], owner_id=job['user_id'], is_deleted=False)
+        user = CustomUser.objects.get(pk=job['user_id'])
+        collection_link = parse_collection_url(job['collection_url'])
+        if not collection_link:
+            raise ValueError("URL must be a YouTube playlist, SoundCloud set or Bandcamp album")
+
+        summary = import_collection_into_playlist(playlist, user, collection_link, job['track_type'], progress=progress)
+        update_metadata_job(job_id, status=JOB_DONE, result=summary)
+    except (YouTubeMetaDataError, BandCampMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError) as e:
+        logger.warning(f"Platform API error in collection import job {job_id}: {str(e)}")
+        update_metadata_job(job_id, status=JOB_FAILED, message=f"Could not read the collection: {str(e)}")
+    except (ValueError, Playlist.DoesNotExist) as e:
+        logger.warning(f"Collection import job {job_id} rejected: {str(e)}")
+        update_metadata_job(job_id, status=JOB_FAILED, message=str(e))
+    except Exception as e:
+        logger.exception(f"Unexpected error in collection import job {job_id}: {e}")
+        update_metadata_job(job_id, status=JOB_FAILED, message="An unexpected error occurred. Please try again.")
+
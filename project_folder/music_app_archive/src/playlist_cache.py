@@ -0,0 +1,134 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from collections import Counter
+import threading
+import time
+
+from ..models import PlaylistTrack
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class PlaylistFragmentCache:
+    '''
+    Cache for rendered playlist fragments, invalidated by a version number per playlist.
+
+    - Fragments are stored under {key_prefix}:{playlist_id}:{version}:{name}, so bumping the
+      playlist's version makes every fragment of it unreachable at once; the old entries just expire.
+    - Versions live in the Django cache without an expiry and are bumped with cache.incr(), which is
+      atomic on Redis. A version that is missing (never set, or evicted) starts from the current time
+      in microseconds, so it can't land back on a number that old fragments were stored under.
+    - bump() runs straight away and, inside a transaction, again once it commits: a reader that
+      rendered the old rows before the commit can't leave them cached under the new version.
+    '''
+    key_prefix = 'playlist_fragments:v1'
+
+    def __init__(self, timeout: int):
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def version_key(self, playlist_id: int) -> str:
+        return f"{self.key_prefix}:version:{playlist_id}"
+
+    def make_key(self, playlist_id: int, version: int, name: str) -> str:
+        return f"{self.key_prefix}:{playlist_id}:{version}:{name}"
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def initial_version(self) -> int:
+        #Microseconds: old fragments would need a million bumps a second to collide with it
+        return time.time_ns() // 1000
+
+    def get_version(self, playlist_id: int) -> int:
+        key = self.version_key(playlist_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, self.initial_version(), None)
+            version = cache.get(key)
+        return version
+
+    def _bump_now(self, playlist_ids: set):
+        for playlist_id in playlist_ids:
+            key = self.version_key(playlist_id)
+            try:
+                cache.incr(key)
+            except ValueError:
+                #Not set yet (or evicted), any fresh version will do
+                cache.add(key, self.initial_version(), None)
+            self._count('bumps')
+        logger.debug(f"Bumped playlist fragment versions for playlists {sorted(playlist_ids)}")
+
+    def bump(self, playlist_ids):
+        '''
+        Invalidate every cached fragment of the given playlists.
+        '''
+        playlist_ids = {playlist_id for playlist_id in playlist_ids if playlist_id is not None}
+        if not playlist_ids:
+            return
+        self._bump_now(playlist_ids)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: self._bump_now(playlist_ids))
+
+    def get_or_set(self, playlist_id: int, name: str, build) -> tuple:
+        '''
+        Return (value, hit): the cached fragment `name` of the playlist's current version, or build()'s
+        result, which is cached for `timeout` seconds (0 turns the cache off).
+        '''
+        if not self.timeout:
+            return build(), False
+
+        key = self.make_key(playlist_id, self.get_version(playlist_id), name)
+        value = cache.get(key)
+        if value is not None:
+            self._count('hits')
+            return value, True
+
+        self._count('misses')
+        value = build()
+        cache.set(key, value, self.timeout)
+        return value, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats.get('hits', 0) + stats.get('misses', 0)
+        stats['hit_rate'] = stats.get('hits', 0) / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+playlist_fragment_cache = PlaylistFragmentCache(timeout=settings.PLAYLIST_FRAGMENT_CACHE_TTL)
+
+
+def playlist_ids_for_tracks(track_ids) -> set:
+    '''
+    Ids of the playlists (removed rows included) that hold any of the tracks.
+    '''
+    return set(
+        PlaylistTrack.objects.filter(track_id__in=track_ids).values_list('playlist_id', flat=True).distinct()
+    )
+
+
+def bump_playlist_versions(playlist_ids):
+    playlist_fragment_cache.bump(playlist_ids)
+
+
+def bump_playlist_versions_for_tracks(track_ids):
+    '''
+    Invalidate the playlists showing these tracks, for writes that skip the model signals
+    (bulk_create, bulk_update, QuerySet.update()).
+    '''
+    track_ids = list(track_ids)
+    if track_ids:
+        playlist_fragment_cache.bump(playlist_ids_for_tracks(track_ids))
@@ -1,6 +1,18 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery
 from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils import timezone
 
-from ..models import Playlist
+from collections import namedtuple
+from itertools import islice
+import json
+
+from ..models import Playlist, PlaylistTrack, StreamingLink
+from .playlist_cache import playlist_fragment_cache
+from .utils import STREAMING_PLATFORM_NAMES
 
 
 def get_playlist(playlist_name, user):
@@ -15,65 +27,389 @@ def get_playlist(playlist_name, user):
     return playlist
 
 
+def _count_subquery(queryset) -> Subquery:
+    '''
+    COUNT() of a queryset correlated on OuterRef, as an annotation. COUNT as a plain function
+    rather than an aggregate, so there is no GROUP BY and an empty match counts 0.
+    '''
+    return Subquery(
+        queryset.order_by().annotate(count=Func(F('pk'), function='COUNT')).values('count'),
+        output_field=IntegerField()
+    )
+
+
+def playlist_overview_queryset(owner):
+    '''
+    The owner's live playlists, newest first, each annotated in the same query with:
+        - track_count: PlaylistTracks that aren't removed
+        - last_added_at: when the latest of them was added (None for an empty playlist)
+        - <platform>_links: e.g. bandcamp_links, how many of them have a link on that platform
+
+    The annotations are correlated subqueries on playlist_track_active_idx (partial, is_deleted = false),
+    so they are only worked out for the playlists on the page being read.
+    '''
+    active_tracks = PlaylistTrack.objects.filter(playlist=OuterRef('pk'), is_deleted=False)
+    active_links = StreamingLink.objects.filter(
+        track__playlist_entries__playlist=OuterRef('pk'),
+        track__playlist_entries__is_deleted=False
+    )
+    platform_counts = {
+        f"{platform_code}_links": _count_subquery(active_links.filter(streaming_platform=platform_code))
+        for platform_code in STREAMING_PLATFORM_NAMES
+    }
+    return Playlist.objects.filter(
+        owner=owner,
+        is_deleted=False
+        ).select_related('owner').annotate(
+            track_count=_count_subquery(active_tracks),
+            last_added_at=Subquery(active_tracks.order_by('-added_at').values('added_at')[:1]),
+            **platform_counts
+        ).order_by('-date_created')
+
+
+def get_playlist_overview_page(owner, page_number=None, per_page: int = None):
+    '''
+    One page (django.core.paginator.Page, default settings.PLAYLIST_OVERVIEW_PAGE_SIZE playlists) of
+    playlist_overview_queryset(). Two queries whatever the number of playlists: the count and the page.
+
+    Each playlist also gets platform_mix, [(platform name, tracks with a link on it), ...] for the
+    platforms it uses. Invalid or out-of-range page numbers give the first or last page.
+    '''
+    paginator = Paginator(playlist_overview_queryset(owner), per_page or settings.PLAYLIST_OVERVIEW_PAGE_SIZE)
+    page = paginator.get_page(page_number)
+    page.object_list = list(page.object_list)
+    for playlist in page.object_list:
+        playlist.platform_mix = [
+            (platform_name, getattr(playlist, f"{platform_code}_links"))
+            for platform_code, platform_name in STREAMING_PLATFORM_NAMES.items()
+            if getattr(playlist, f"{platform_code}_links")
+        ]
+    return page
+
+
+def get_existing_track_meta_data_dict(*streaming_links: str) -> dict:
+    '''
+    Look up streaming links that are already archived (one query on the unique streaming_link index)
+    and return the meta_data_dict of their Track, with existing_track_id set, or None if none is stored.
+
+    Pass the canonical link and the link as submitted, so rows saved before links were canonicalised match too.
+    '''
+    streaming_link = StreamingLink.objects.select_related('track').filter(
+        streaming_link__in={link for link in streaming_links if link}
+    ).first()
+    if streaming_link is None:
+        return None
+
+    track = streaming_link.track
+    return {
+        'existing_track_id': track.id,
+        'track_type': track.track_type,
+        'track_name': track.track_name,
+        'artist': track.artist,
+        'album_name': track.album_name,
+        'mix_page': track.mix_page,
+        'record_label': track.record_label,
+        'genre': track.genre,
+        'purchase_link': track.purchase_link,
+        'streaming_platform': streaming_link.streaming_platform,
+        'streaming_link': streaming_link.streaming_link,
+    }
+
+
+def add_existing_track_to_playlist(playlist, track_id: int, user) -> bool:
+    '''
+    Add an archived Track to a playlist with a single PlaylistTrack insert (no Track or StreamingLink rows).
+    A track that was removed from the playlist still has its row (unique_playlist_track covers removed
+    rows), so that row is restored at the end of the playlist instead.
+    Returns False if the track is already in the playlist.
+    '''
+    try:
+        with transaction.atomic():
+            playlist_track = PlaylistTrack.objects.select_for_update().filter(playlist=playlist, track_id=track_id).first()
+            if playlist_track is None:
+                PlaylistTrack.objects.create(playlist=playlist, track_id=track_id, added_by=user)
+                return True
+            if not playlist_track.is_deleted:
+                return False
+            restore_playlist_track(playlist_track, user)
+    except IntegrityError:
+        return False
+    return True
+
+
+def restore_playlist_track(playlist_track, user):
+    '''
+    Bring back a removed PlaylistTrack as if it had just been added: at the end of the playlist, with a new
+    added_at and added_by. Saved with save(), so the playlist's cached pages are invalidated by the signal.
+    '''
+    playlist_track.is_deleted = False
+    #save() puts a row without a position after the playlist's last one
+    playlist_track.position = None
+    playlist_track.added_by = user
+    playlist_track.added_at = timezone.now()
+    playlist_track.save(update_fields=['is_deleted', 'position', 'added_by', 'added_at'])
+
+
+#A streaming link as the playlist templates show it
+PlaylistTrackLink = namedtuple('PlaylistTrackLink', ['id', 'platform', 'platform_code', 'url'])
+
+
+class PlaylistTrackRow:
+    '''
+    One playlist row with only the values the playlist templates show.
+
+    Uses __slots__ rather than a dict per row. row['track_name'] still works for code written against the old dicts.
+    '''
+    __slots__ = (
+        'id', 'position', 'track_id', 'track_name', 'artist', 'album_name', 'genre',
+        'record_label', 'mix_page', 'date_added', 'added_by', 'streaming_links'
+    )
+
+    def __init__(self, id, position, track_id, track_name, artist, album_name, genre,
+                 record_label, mix_page, date_added, added_by, streaming_links):
+        self.id = id
+        self.position = position
+        self.track_id = track_id
+        self.track_name = track_name
+        self.artist = artist
+        self.album_name = album_name
+        self.genre = genre
+        self.record_label = record_label
+        self.mix_page = mix_page
+        self.date_added = date_added
+        self.added_by = added_by
+        self.streaming_links = streaming_links
+
+    def __getitem__(self, field: str):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    #The first link, kept for templates that show a single link
+    @property
+    def streaming_platform(self) -> str:
+        return self.streaming_links[0].platform if self.streaming_links else '-'
+
+    @property
+    def link(self) -> str:
+        return self.streaming_links[0].url if self.streaming_links else '#'
+
+    def __repr__(self):
+        return f"<PlaylistTrackRow {self.position}: {self.track_name} - {self.artist}>"
+
+
+#Columns read for each playlist row, in PlaylistTrackRow order (the links are added separately)
+PLAYLIST_TRACK_COLUMNS = (
+    'id', 'position', 'track_id',
+    'track__track_name', 'track__artist', 'track__album_name', 'track__genre',
+    'track__record_label', 'track__mix_page', 'added_at', 'added_by__username'
+)
+
+#One page of a playlist: its rows and the cursor for the next page (None on the last page)
+PlaylistTrackPage = namedtuple('PlaylistTrackPage', ['rows', 'next_cursor'])
+
+
+def group_streaming_links(streaming_links) -> dict:
+    '''
+    Read (track_id, id, streaming_platform, streaming_link) for a StreamingLink queryset and return
+    {track_id: [PlaylistTrackLink, ...]}.
+    '''
+    links_by_track = {}
+    rows = streaming_links.order_by('track_id', 'id').values_list('track_id', 'id', 'streaming_platform', 'streaming_link')
+    for track_id, link_id, platform_code, url in rows:
+        links_by_track.setdefault(track_id, []).append(
+            PlaylistTrackLink(link_id, STREAMING_PLATFORM_NAMES.get(platform_code, platform_code), platform_code, url)
+        )
+    return links_by_track
+
+
+def build_playlist_track_rows(rows: list, links_by_track: dict) -> list:
+    '''
+    Turn PLAYLIST_TRACK_COLUMNS value tuples into PlaylistTrackRow objects.
+    '''
+    return [
+        PlaylistTrackRow(
+            playlist_track_id, position, track_id, track_name, artist,
+            album_name or '-', genre or '-', record_label or '-', mix_page or '-',
+            added_at, added_by or 'Unknown', links_by_track.get(track_id, ())
+        )
+        for (playlist_track_id, position, track_id, track_name, artist, album_name, genre,
+             record_label, mix_page, added_at, added_by) in rows
+    ]
+
+
 def get_playlist_tracks(playlist) -> list:
     '''
-    Retrieve all tracks in a playlist with their streaming links.
-    
-    Args:
-        playlist: Playlist instance
-        
-    Returns:
-        List of dictionaries with track data and streaming links
-    '''
-    from ..models import PlaylistTrack
-
-    #1. Get relevant PlaylistTrack from the model, along with Track + StreamingLink meta data
-    playlist_tracks = PlaylistTrack.objects.filter(
-        playlist=playlist
-        ).select_related(
-            'track',
-            'added_by'
-        ).prefetch_related(
-            'track__streaming_links'
-        ).order_by('position')
-    
-    #2. Create empty list
-    list_of_tracks = []
-
-    #3. Build list for track data
-    for playlist_track in playlist_tracks:
-        track = playlist_track.track
-
-        #Get streaming_links for specific track
-        streaming_links = list(track.streaming_links.all())
-
-        #Create dictionary to pass through context
-        track_data = {
-            'position': playlist_track.position,
-            'track_id': track.id,
-            'track_name': track.track_name,
-            'artist': track.artist,
-            'album_name': track.album_name or '-',
-            'genre': track.genre or '-',
-            'record_label': track.record_label or '-',
-            'mix_page': track.mix_page or '-',
-            'date_added': playlist_track.added_at,
-            'added_by': playlist_track.added_by.username if playlist_track.added_by else 'Unknown',
-            'streaming_links': [
-                {
-                    'platform': link.get_streaming_platform_display(),
-                    'platform_code': link.streaming_platform,
-                    'url': link.streaming_link,
-                    'id': link.id
-                }
-                for link in streaming_links
-            ],
-            # For backward compatibility with your template
-            'streaming_platform': streaming_links[0].get_streaming_platform_display() if streaming_links else '-',
-            'link': streaming_links[0].streaming_link if streaming_links else '#',
-        }
-
-        #4. Append track_data to list_of_tracks
-        list_of_tracks.append(track_data)
-
-        return list_of_tracks
+    Retrieve every track of a playlist, in position order, as PlaylistTrackRow objects.
+    Pages of a large playlist are read with get_playlist_tracks_page().
+
+    Two queries, both reading only the columns the templates use:
+        1. PlaylistTrack joined to Track and the adding user, as value tuples
+        2. The StreamingLinks of those tracks, grouped per track in Python
+
+    Returns an empty list for an empty playlist. Removed (is_deleted) rows are left out.
+    '''
+    playlist_tracks = PlaylistTrack.objects.filter(playlist=playlist, is_deleted=False)
+
+    #1. Playlist rows with their Track and added_by columns
+    rows = list(playlist_tracks.order_by('position').values_list(*PLAYLIST_TRACK_COLUMNS))
+    if not rows:
+        return []
+
+    #2. Streaming links of the same tracks, with the playlist as a subquery rather than thousands of ids
+    links_by_track = group_streaming_links(
+        StreamingLink.objects.filter(track_id__in=playlist_tracks.values('track_id'))
+    )
+    return build_playlist_track_rows(rows, links_by_track)
+
+
+def get_playlist_tracks_page(playlist, after: int = None, page_size: int = None) -> PlaylistTrackPage:
+    '''
+    Retrieve one page of a playlist: up to page_size rows (default settings.PLAYLIST_PAGE_SIZE) with
+    a position greater than `after`, the cursor returned with the previous page.
+
+    Keyset pagination on (playlist, position), served by playlist_position_idx: every page costs the
+    same however deep it is. Removing tracks only sets is_deleted and never renumbers positions,
+    so a cursor stays valid while the playlist is edited.
+
+    Returns PlaylistTrackPage(rows, next_cursor), next_cursor being None on the last page.
+    '''
+    page_size = page_size or settings.PLAYLIST_PAGE_SIZE
+    playlist_tracks = PlaylistTrack.objects.filter(playlist=playlist, is_deleted=False, position__isnull=False)
+    if after is not None:
+        playlist_tracks = playlist_tracks.filter(position__gt=after)
+
+    #One extra row tells us whether there is a next page
+    rows = list(playlist_tracks.order_by('position').values_list(*PLAYLIST_TRACK_COLUMNS)[:page_size + 1])
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if not rows:
+        return PlaylistTrackPage([], None)
+
+    links_by_track = group_streaming_links(
+        StreamingLink.objects.filter(track_id__in=[row[2] for row in rows])
+    )
+    return PlaylistTrackPage(build_playlist_track_rows(rows, links_by_track), rows[-1][1] if has_next else None)
+
+
+#One page of playlist rows with its rendered <tr> rows, as kept in the playlist fragment cache
+PlaylistRowsFragment = namedtuple('PlaylistRowsFragment', ['rows', 'rows_html', 'next_cursor'])
+
+
+def get_playlist_rows_fragment(playlist, after: int = None, page_size: int = None) -> tuple:
+    '''
+    One page of a playlist (see get_playlist_tracks_page()) rendered with playlist_track_rows.html,
+    from playlist_fragment_cache while nothing in the playlist has changed.
+
+    Returns (PlaylistRowsFragment, cache_hit).
+    '''
+    page_size = page_size or settings.PLAYLIST_PAGE_SIZE
+
+    def render() -> PlaylistRowsFragment:
+        page = get_playlist_tracks_page(playlist, after=after, page_size=page_size)
+        rows_html = render_to_string('playlist_track_rows.html', {
+            'list_of_playlist_tracks': page.rows,
+            'playlist_type': playlist.playlist_type,
+        })
+        return PlaylistRowsFragment(page.rows, rows_html, page.next_cursor)
+
+    return playlist_fragment_cache.get_or_set(playlist.pk, f"rows:{playlist.playlist_type}:{after}:{page_size}", render)
+
+
+def parse_playlist_page_params(params) -> tuple:
+    '''
+    Read the `after` cursor and `page_size` from request.GET. page_size is capped at
+    settings.PLAYLIST_MAX_PAGE_SIZE. Raises ValueError if either is not a positive integer.
+    '''
+    after = params.get('after') or None
+    page_size = params.get('page_size') or None
+    if after is not None:
+        after = int(after)
+        if after < 0:
+            raise ValueError(f"Invalid cursor: {after}")
+    if page_size is not None:
+        page_size = int(page_size)
+        if page_size < 1:
+            raise ValueError(f"Invalid page_size: {page_size}")
+        page_size = min(page_size, settings.PLAYLIST_MAX_PAGE_SIZE)
+    return after, page_size
+
+
+def playlist_track_record(row: tuple, streaming_links) -> dict:
+    '''
+    The export form of one PLAYLIST_TRACK_COLUMNS tuple: stored values as they are (no '-' placeholders),
+    the date in ISO 8601 and the track's streaming links.
+    '''
+    (playlist_track_id, position, track_id, track_name, artist, album_name, genre,
+     record_label, mix_page, added_at, added_by) = row
+    return {
+        'id': playlist_track_id,
+        'position': position,
+        'track_id': track_id,
+        'track_name': track_name,
+        'artist': artist,
+        'album_name': album_name,
+        'genre': genre,
+        'record_label': record_label,
+        'mix_page': mix_page,
+        'added_at': added_at.isoformat() if added_at else None,
+        'added_by': added_by,
+        'streaming_links': [
+            {'platform': link.platform_code, 'url': link.url}
+            for link in streaming_links
+        ],
+    }
+
+
+def iter_playlist_track_records(playlist, chunk_size: int = None):
+    '''
+    Yield the export records of a playlist (see playlist_track_record()) in position order, a list of
+    up to chunk_size (default settings.PLAYLIST_EXPORT_CHUNK_SIZE) at a time.
+
+    The rows come from a server-side cursor (.iterator()) and each chunk's streaming links from one
+    query, so only one chunk is held in memory however long the playlist is.
+    '''
+    chunk_size = chunk_size or settings.PLAYLIST_EXPORT_CHUNK_SIZE
+    playlist_tracks = PlaylistTrack.objects.filter(playlist=playlist, is_deleted=False)
+    rows = playlist_tracks.order_by('position').values_list(*PLAYLIST_TRACK_COLUMNS).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        first_position, last_position = chunk[0][1], chunk[-1][1]
+        if first_position is not None and last_position is not None:
+            #The chunk's position range as a subquery (playlist_position_idx), cheaper than thousands of ids
+            track_ids = playlist_tracks.filter(position__range=(first_position, last_position)).values('track_id')
+        else:
+            track_ids = [row[2] for row in chunk]
+        links_by_track = group_streaming_links(StreamingLink.objects.filter(track_id__in=track_ids))
+        yield [playlist_track_record(row, links_by_track.get(row[2], ())) for row in chunk]
+
+
+def stream_playlist_ndjson(playlist, chunk_size: int = None):
+    '''
+    A playlist's tracks as NDJSON (one JSON object per line), one string per chunk of rows.
+    '''
+    for records in iter_playlist_track_records(playlist, chunk_size):
+        yield ''.join(json.dumps(record) + '\n' for record in records)
+
+
+def stream_playlist_json(playlist, chunk_size: int = None):
+    '''
+    A playlist as one JSON document, {"playlist": {...}, "tracks": [...]}, written a chunk of rows at a time.
+    '''
+    header = {
+        'playlist_name': playlist.playlist_name,
+        'owner': playlist.owner.username,
+        'playlist_type': playlist.playlist_type,
+        'description': playlist.description,
+    }
+    yield f'{{"playlist": {json.dumps(header)}, "tracks": ['
+    separator = ''
+    for records in iter_playlist_track_records(playlist, chunk_size):
+        #The chunk's records without the list brackets
+        yield separator + json.dumps(records)[1:-1]
+        separator = ', '
+    yield ']}\n'
@@ -1,15 +1,29 @@
 import requests
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlsplit, parse_qs
+from collections import namedtuple
+from contextlib import contextmanager
+import re
+import time
+import uuid
+
+from django.core.cache import cache
 
 import logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-PLATFORM_DOMAINS = {
-    'youtube': ['youtube.com', 'youtu.be', 'music.youtube.com', 'm.youtube.com'],
-    'bandcamp': ['bandcamp.com'],
-    'soundcloud': ['soundcloud.com'],
-}
+#Platform registry, filled in by register_platform() when a platform adapter is registered (the built-in
+#adapters are registered by integrations/main_integrations.py, which MusicAppArchiveConfig.ready() loads)
+#platform -> domains
+PLATFORM_DOMAINS = {}
+#Hostname (or parent domain) -> platform, so a hostname is classified with one dict lookup per label
+PLATFORM_DOMAIN_LOOKUP = {}
+#StreamingLink.streaming_platform code -> display name, in registration order (the model's choices)
+STREAMING_PLATFORM_NAMES = {}
+#StreamingLink.streaming_platform code -> platform
+STREAMING_PLATFORM_ALIASES = {}
+#platform -> canonicaliser(parsed_url, hostname), returning a CanonicalStreamingLink or None
+PLATFORM_CANONICALISERS = {}
 
 PLAYLIST_TO_TRACK_TYPE = {
     'tracks': 'track',
@@ -29,6 +43,17 @@ def orch_validate_input_string(input_string: str, name_input_string: str):
         logger.error(f"{name_input_string} must be a string, got {type(input_string)}")
         raise ValueError(f"{name_input_string} must be a string, got {type(input_string)}")
 
+def normalise_streaming_url(streaming_url: str) -> str:
+    '''
+    Strip a submitted link and give it https:// if it was pasted without a scheme (e.g. 'youtu.be/zYta6v1wZiI'),
+    so every check parses it the same way. Shared by check_streaming_link_platform() and classify_streaming_link().
+    '''
+    url = streaming_url.strip()
+    if '://' not in url:
+        url = f"https://{url}"
+    return url
+
+
 def get_hostname(streaming_url: str) -> str:
     '''
     The following function reads in a streaming_url and returns the hostname as a string.
@@ -45,6 +70,71 @@ def get_hostname(streaming_url: str) -> str:
         return None
 
 
+def register_platform(platform: str, domains, streaming_platforms: dict, canonicaliser=None):
+    '''
+    Add a platform to the registry: its domains (so its links are recognised), its
+    StreamingLink.streaming_platform codes and display names, and the function that canonicalises its links
+    (canonicalise_permalink() if None). Called when a platform adapter is registered (see integrations/adapters.py).
+    '''
+    known_domains = PLATFORM_DOMAINS.setdefault(platform, [])
+    for domain in domains:
+        domain = domain.lower()
+        if domain not in known_domains:
+            known_domains.append(domain)
+        PLATFORM_DOMAIN_LOOKUP[domain] = platform
+    for streaming_platform, display_name in streaming_platforms.items():
+        STREAMING_PLATFORM_NAMES[streaming_platform] = display_name
+        STREAMING_PLATFORM_ALIASES[streaming_platform] = platform
+    if canonicaliser:
+        PLATFORM_CANONICALISERS[platform] = canonicaliser
+
+
+def unregister_platform(platform: str):
+    '''
+    Forget a platform (used by tests).
+    '''
+    for domain in PLATFORM_DOMAINS.pop(platform, []):
+        if PLATFORM_DOMAIN_LOOKUP.get(domain) == platform:
+            del PLATFORM_DOMAIN_LOOKUP[domain]
+    for streaming_platform, aliased in list(STREAMING_PLATFORM_ALIASES.items()):
+        if aliased == platform:
+            del STREAMING_PLATFORM_ALIASES[streaming_platform]
+            STREAMING_PLATFORM_NAMES.pop(streaming_platform, None)
+    PLATFORM_CANONICALISERS.pop(platform, None)
+
+
+class StreamingPlatformChoices:
+    '''
+    StreamingLink.streaming_platform choices, read from the registry each time they are iterated,
+    so a registered adapter's platform is a valid choice without a model change.
+    '''
+    def __iter__(self):
+        return iter(list(STREAMING_PLATFORM_NAMES.items()))
+
+
+def supported_platforms_text() -> str:
+    '''
+    Display names of the registered platforms for error messages, e.g. 'YouTube, Bandcamp or SoundCloud'.
+    '''
+    names = [STREAMING_PLATFORM_NAMES.get(platform, platform) for platform in PLATFORM_DOMAINS]
+    if len(names) < 2:
+        return ''.join(names)
+    return f"{', '.join(names[:-1])} or {names[-1]}"
+
+
+def platform_for_hostname(hostname: str) -> str:
+    '''
+    Return the platform whose domain is the hostname or one of its parent domains
+    (e.g. artist.bandcamp.com -> bandcamp), or None.
+    '''
+    while hostname:
+        platform = PLATFORM_DOMAIN_LOOKUP.get(hostname)
+        if platform:
+            return platform
+        hostname = hostname.partition('.')[2]
+    return None
+
+
 def check_streaming_link_platform(streaming_link: str) -> str:
     '''
     The following function takes in a streaming link and checks if the hostname matches the 
@@ -52,21 +142,178 @@ def check_streaming_link_platform(streaming_link: str) -> str:
     '''
     try:
         #Get host name
-        hostname = get_hostname(streaming_link)    
+        hostname = get_hostname(normalise_streaming_url(streaming_link))
         
         if not hostname:
             return None
         
-        for platform, domains in PLATFORM_DOMAINS.items():
-            if any(hostname == domain or hostname.endswith(f'.{domain}') 
-                for domain in domains):
-                return platform
-        
-        return None
+        return platform_for_hostname(hostname)
     except Exception:
         return None
     
 
+#Result of canonicalise_streaming_link(): the URL we store/cache on, the StreamingLink platform
+#choice and the platform-native id (YouTube video/playlist id, SoundCloud or Bandcamp permalink path)
+CanonicalStreamingLink = namedtuple('CanonicalStreamingLink', ['url', 'platform', 'platform_id'])
+
+YOUTUBE_VIDEO_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_PLAYLIST_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+#Path prefixes that carry the video id as the next segment, e.g. /shorts/VIDEO_ID
+YOUTUBE_ID_PATH_PREFIXES = ('embed', 'shorts', 'live', 'v')
+
+
+def youtube_video_id(parsed_url, hostname: str) -> str:
+    '''
+    Pull the video id out of a parsed YouTube URL, or return None.
+    '''
+    if hostname == 'youtu.be':
+        candidate = parsed_url.path.strip('/').split('/')[0]
+        return candidate if YOUTUBE_VIDEO_ID_RE.match(candidate) else None
+
+    candidate = parse_qs(parsed_url.query).get('v', [''])[0]
+    if YOUTUBE_VIDEO_ID_RE.match(candidate):
+        return candidate
+
+    segments = [segment for segment in parsed_url.path.split('/') if segment]
+    if len(segments) >= 2 and segments[0] in YOUTUBE_ID_PATH_PREFIXES and YOUTUBE_VIDEO_ID_RE.match(segments[1]):
+        return segments[1]
+    return None
+
+
+def canonicalise_youtube_link(parsed_url, hostname: str) -> CanonicalStreamingLink:
+    '''
+    youtube.com/watch?v=X&list=..&t=42, youtu.be/X, m.youtube.com/watch?v=X and /shorts/X all
+    become https://www.youtube.com/watch?v=X. music.youtube.com stays its own platform.
+    '''
+    is_music = hostname == 'music.youtube.com'
+    base_url = 'https://music.youtube.com' if is_music else 'https://www.youtube.com'
+    platform = 'youtube_music' if is_music else 'youtube'
+
+    video_id = youtube_video_id(parsed_url, hostname)
+    if video_id:
+        return CanonicalStreamingLink(f"{base_url}/watch?v={video_id}", platform, video_id)
+
+    #Playlist links (no video id) are kept as the bare playlist
+    playlist_id = parse_qs(parsed_url.query).get('list', [''])[0]
+    if parsed_url.path.rstrip('/') == '/playlist' and YOUTUBE_PLAYLIST_ID_RE.match(playlist_id):
+        return CanonicalStreamingLink(f"{base_url}/playlist?list={playlist_id}", platform, playlist_id)
+    return None
+
+
+def canonicalise_permalink(parsed_url, hostname: str, platform: str) -> CanonicalStreamingLink:
+    '''
+    For platforms that identify a track by its path: drop the query (?si=, ?from=, ...) and fragment
+    and strip the trailing slash. The path is kept as is (it may be case-sensitive) and is the platform_id.
+    '''
+    path = parsed_url.path.rstrip('/')
+    if not path:
+        return None
+    return CanonicalStreamingLink(f"https://{hostname}{path}", platform, path.lstrip('/'))
+
+
+def canonicalise_soundcloud_link(parsed_url, hostname: str) -> CanonicalStreamingLink:
+    '''
+    SoundCloud permalinks, see canonicalise_permalink(). Paths are case-sensitive (secret tokens
+    like /s-AbCdEf, on.soundcloud.com short links), so they are not lowercased.
+    '''
+    #m.soundcloud.com and www.soundcloud.com serve the same permalinks
+    if hostname in ('m.soundcloud.com', 'www.soundcloud.com'):
+        hostname = 'soundcloud.com'
+    return canonicalise_permalink(parsed_url, hostname, 'soundcloud')
+
+
+def canonicalise_bandcamp_link(parsed_url, hostname: str) -> CanonicalStreamingLink:
+    '''
+    Bandcamp permalinks, see canonicalise_permalink(). Bandcamp paths are case-insensitive, so they are
+    lowercased, and the artist subdomain is part of the platform_id.
+    '''
+    path = parsed_url.path.rstrip('/').lower()
+    if not path:
+        return None
+    #<artist>.bandcamp.com/track/<slug> -> 'artist/track/slug'
+    return CanonicalStreamingLink(f"https://{hostname}{path}", 'bandcamp', f"{hostname.split('.')[0]}{path}")
+
+
+#Result of classify_streaming_link(): canonical_url/platform/platform_id are None when the link is
+#rejected, and rejection_reason then says why (one of the REJECT_* values)
+StreamingLinkClassification = namedtuple(
+    'StreamingLinkClassification', ['url', 'platform', 'canonical_url', 'platform_id', 'rejection_reason']
+)
+
+REJECT_EMPTY = 'empty'
+REJECT_MALFORMED = 'malformed'
+REJECT_UNSUPPORTED_PLATFORM = 'unsupported_platform'
+REJECT_UNRECOGNISED_LINK = 'unrecognised_link'
+
+
+def classify_streaming_link(streaming_link: str) -> StreamingLinkClassification:
+    '''
+    Classify one link: platform, canonical URL and platform-native id, or why it was rejected.
+    One urlsplit() and a PLATFORM_DOMAIN_LOOKUP walk per link; see classify_streaming_links() for many.
+    '''
+    if not streaming_link or not isinstance(streaming_link, str) or not streaming_link.strip():
+        return StreamingLinkClassification(streaming_link, None, None, None, REJECT_EMPTY)
+
+    url = normalise_streaming_url(streaming_link)
+
+    try:
+        parsed_url = urlsplit(url)
+        hostname = (parsed_url.hostname or '').lower()
+    except ValueError:
+        return StreamingLinkClassification(streaming_link, None, None, None, REJECT_MALFORMED)
+
+    platform = platform_for_hostname(hostname)
+    if not platform:
+        return StreamingLinkClassification(streaming_link, None, None, None, REJECT_UNSUPPORTED_PLATFORM)
+
+    canonicaliser = PLATFORM_CANONICALISERS.get(platform)
+    if canonicaliser:
+        canonical_link = canonicaliser(parsed_url, hostname)
+    else:
+        canonical_link = canonicalise_permalink(parsed_url, hostname, platform)
+    if not canonical_link:
+        return StreamingLinkClassification(streaming_link, platform, None, None, REJECT_UNRECOGNISED_LINK)
+
+    return StreamingLinkClassification(
+        streaming_link, canonical_link.platform, canonical_link.url, canonical_link.platform_id, None
+    )
+
+
+def classify_streaming_links(streaming_links) -> list:
+    '''
+    Classify an iterable of links (e.g. a few thousand from an import) in one pass.
+    Returns a StreamingLinkClassification per link, in order; repeated links are only parsed once.
+    '''
+    seen = {}
+    results = []
+    for streaming_link in streaming_links:
+        try:
+            classification = seen.get(streaming_link)
+        except TypeError:
+            #Unhashable junk, classify_streaming_link() rejects it
+            classification = None
+        if classification is None:
+            classification = classify_streaming_link(streaming_link)
+            if isinstance(streaming_link, str):
+                seen[streaming_link] = classification
+        results.append(classification)
+    return results
+
+
+def canonicalise_streaming_link(streaming_link: str) -> CanonicalStreamingLink:
+    '''
+    Return the canonical form of a streaming link as a CanonicalStreamingLink(url, platform, platform_id),
+    or None if the link is not from a supported platform (or doesn't point at anything we can identify).
+
+    Runs once when a link is submitted (forms) so StreamingLink.streaming_link, the metadata cache and
+    existence checks all compare the same string for the same track.
+    '''
+    classification = classify_streaming_link(streaming_link)
+    if classification.rejection_reason:
+        return None
+    return CanonicalStreamingLink(classification.canonical_url, classification.platform, classification.platform_id)
+
+
 def map_playlist_type_track_type(playlist_type: str) -> str:
     '''
     Maps playlist type to the corresponding track_type
@@ -80,4 +327,31 @@ def map_playlist_type_track_type(playlist_type: str) -> str:
         raise ValueError(
             f"Invalid playlist_type: '{playlist_type}'. "
             f"Must be one of {list(PLAYLIST_TO_TRACK_TYPE.keys())}"
-        )
\ No newline at end of file
+        )
+
+
+@contextmanager
+def cache_lock(lock_key: str, timeout: int = 30, wait: float = 5, poll_interval: float = 0.05):
+    '''
+    Best-effort lock shared by every worker through the Django cache.
+
+    cache.add() only sets the key if it is missing, which is atomic on Redis.
+    Yields True if the lock was acquired within `wait` seconds, otherwise False,
+    so callers can decide whether to go ahead without it.
+    The lock expires after `timeout` seconds in case the holder dies.
+    '''
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+
+    acquired = cache.add(lock_key, token, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        acquired = cache.add(lock_key, token, timeout)
+
+    try:
+        yield acquired
+    finally:
+        #Only release the lock if we still own it
+        if acquired and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
@@ -0,0 +1,204 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+
+from ..models import Track, StreamingLink
+from ..src.custom_exceptions import SoundcloudMetaDataError
+from ..src.deadline import Deadline
+from ..src.integrations.metadata_cache import metadata_cache
+
+User = get_user_model()
+
+
+class CanonicaliseStreamingLinksTest(TestCase):
+    '''
+    Test the canonicalise_streaming_links management command
+    '''
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="test1@user.com",
+            password="Meep!234",
+            username="simple_john",
+            email_verified=True
+        )
+        self.track_1 = Track.objects.create(track_name='If I Had A Gun…', artist='Noel Gallagher', created_by=self.user)
+        self.track_2 = Track.objects.create(track_name='Future', artist='Nils Petter Molvær', created_by=self.user)
+        self.track_3 = Track.objects.create(track_name='Another Life', artist='Horse Vision', created_by=self.user)
+
+        self.youtube_link = StreamingLink.objects.create(
+            track=self.track_1,
+            streaming_platform='youtube',
+            streaming_link='https://www.youtube.com/watch?v=zYta6v1wZiI&list=LL&index=1'
+        )
+        self.soundcloud_link = StreamingLink.objects.create(
+            track=self.track_2,
+            streaming_platform='soundcloud',
+            streaming_link='https://soundcloud.com/artist/future?si=abc123'
+        )
+        #Same video as youtube_link, pasted as a short link for another track
+        self.duplicate_link = StreamingLink.objects.create(
+            track=self.track_3,
+            streaming_platform='youtube',
+            streaming_link='https://youtu.be/zYta6v1wZiI'
+        )
+
+    def test_rows_are_canonicalised_in_batches(self):
+        out = StringIO()
+        call_command('canonicalise_streaming_links', batch_size=1, stdout=out)
+
+        self.youtube_link.refresh_from_db()
+        self.soundcloud_link.refresh_from_db()
+        self.assertEqual(self.youtube_link.streaming_link, 'https://www.youtube.com/watch?v=zYta6v1wZiI')
+        self.assertEqual(self.soundcloud_link.streaming_link, 'https://soundcloud.com/artist/future')
+        self.assertIn('scanned=3', out.getvalue())
+        self.assertIn('updated=2', out.getvalue())
+
+    def test_collisions_are_reported_and_left_alone(self):
+        out = StringIO()
+        call_command('canonicalise_streaming_links', stdout=out)
+
+        self.duplicate_link.refresh_from_db()
+        self.assertEqual(self.duplicate_link.streaming_link, 'https://youtu.be/zYta6v1wZiI')
+        self.assertIn(f"Collision: StreamingLink {self.duplicate_link.pk}", out.getvalue())
+        self.assertIn('collisions=1', out.getvalue())
+
+    def test_dry_run_does_not_write(self):
+        out = StringIO()
+        call_command('canonicalise_streaming_links', dry_run=True, stdout=out)
+
+        self.soundcloud_link.refresh_from_db()
+        self.assertEqual(self.soundcloud_link.streaming_link, 'https://soundcloud.com/artist/future?si=abc123')
+        self.assertIn('[dry run]', out.getvalue())
+
+
+class EnrichTrackMetadataTest(TestCase):
+    '''
+    Test the enrich_track_metadata management command
+    '''
+    def setUp(self):
+        cache.clear()
+        metadata_cache.clear_local()
+        self.user = User.objects.create_user(
+            email="test1@user.com",
+            password="Meep!234",
+            username="simple_john",
+            email_verified=True
+        )
+        self.bandcamp_track = Track.objects.create(track_name='How Are We', artist='Horse Vision', genre='indie', created_by=self.user)
+        self.soundcloud_track = Track.objects.create(track_name='Future', artist='Nils Petter Molvær', created_by=self.user)
+        self.complete_track = Track.objects.create(
+            track_name='Another Life', artist='Horse Vision', album_name='Another Life', record_label='Self-released',
+            genre='indie', purchase_link='https://horsevision.bandcamp.com/album/another-life', created_by=self.user
+        )
+        self.unlinked_track = Track.objects.create(track_name='No Link', artist='Nobody', created_by=self.user)
+
+        self.bandcamp_link = StreamingLink.objects.create(
+            track=self.bandcamp_track,
+            streaming_platform='bandcamp',
+            streaming_link='https://horsevision.bandcamp.com/track/how-are-we'
+        )
+        StreamingLink.objects.create(
+            track=self.bandcamp_track,
+            streaming_platform='youtube',
+            streaming_link='https://www.youtube.com/watch?v=zYta6v1wZiI'
+        )
+        StreamingLink.objects.create(
+            track=self.soundcloud_track,
+            streaming_platform='soundcloud',
+            streaming_link='https://soundcloud.com/artist/future'
+        )
+        StreamingLink.objects.create(
+            track=self.complete_track,
+            streaming_platform='bandcamp',
+            streaming_link='https://horsevision.bandcamp.com/track/another-life'
+        )
+
+    def fake_orchestrate(self, streaming_link, track_type, deadline=None):
+        if 'soundcloud' in streaming_link:
+            raise SoundcloudMetaDataError("HTTP 404")
+        return {
+            'track_name': 'How Are We',
+            'artist': 'Horse Vision',
+            'album_name': 'Another Life',
+            'genre': 'ambient',
+            'purchase_link': streaming_link,
+            'record_label': '',
+        }
+
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_platform_api')
+    def test_empty_fields_are_filled(self, mock_orchestrate):
+        mock_orchestrate.side_effect = self.fake_orchestrate
+        out = StringIO()
+
+        call_command('enrich_track_metadata', batch_size=1, stdout=out)
+
+        self.bandcamp_track.refresh_from_db()
+        self.assertEqual(self.bandcamp_track.album_name, 'Another Life')
+        self.assertEqual(self.bandcamp_track.purchase_link, self.bandcamp_link.streaming_link)
+        #Existing values are never overwritten
+        self.assertEqual(self.bandcamp_track.genre, 'indie')
+        #The Bandcamp link is preferred over the YouTube one, and complete tracks aren't fetched
+        self.assertEqual([c.args[0] for c in mock_orchestrate.call_args_list].count(self.bandcamp_link.streaming_link), 1)
+        self.assertEqual(mock_orchestrate.call_count, 2)
+        self.assertIn('scanned=3, updated=1, no_link=1', out.getvalue())
+        self.assertIn('soundcloud_errors=1/1 (100%)', out.getvalue())
+        self.assertIn('bandcamp_errors=0/1 (0%)', out.getvalue())
+        self.assertIn('rows_per_second=', out.getvalue())
+
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_platform_api')
+    def test_checkpoint_resumes_after_last_batch(self, mock_orchestrate):
+        mock_orchestrate.side_effect = self.fake_orchestrate
+
+        call_command('enrich_track_metadata', limit=1, stdout=StringIO())
+        out = StringIO()
+        call_command('enrich_track_metadata', stdout=out)
+
+        self.assertIn(f"Resuming after Track {self.bandcamp_track.pk}", out.getvalue())
+        self.assertIn('scanned=2', out.getvalue())
+
+        out = StringIO()
+        call_command('enrich_track_metadata', restart=True, dry_run=True, stdout=out)
+        self.assertIn('[dry run] scanned=3', out.getvalue())
+
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_platform_api')
+    def test_checkpoint_survives_a_fresh_cache(self, mock_orchestrate):
+        mock_orchestrate.side_effect = self.fake_orchestrate
+
+        call_command('enrich_track_metadata', limit=1, stdout=StringIO())
+        #A new process with the LocMemCache fallback starts with an empty cache
+        cache.clear()
+        metadata_cache.clear_local()
+        out = StringIO()
+        call_command('enrich_track_metadata', stdout=out)
+
+        self.assertIn(f"Resuming after Track {self.bandcamp_track.pk}", out.getvalue())
+        self.assertIn('scanned=2', out.getvalue())
+
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_platform_api')
+    def test_finished_run_clears_checkpoint(self, mock_orchestrate):
+        mock_orchestrate.side_effect = self.fake_orchestrate
+        call_command('enrich_track_metadata', stdout=StringIO())
+
+        #The SoundCloud track failed, the next run starts over and retries it
+        out = StringIO()
+        call_command('enrich_track_metadata', stdout=out)
+        self.assertNotIn('Resuming', out.getvalue())
+        self.assertIn('scanned=3', out.getvalue())
+        self.assertIn('soundcloud_errors=1/1', out.getvalue())
+        self.assertEqual(mock_orchestrate.call_count, 4)
+
+    @patch('music_app_archive.src.integrations.main_integrations.get_youtube_metadata_batch')
+    def test_youtube_links_are_batched(self, mock_batch):
+        mock_batch.return_value = {'zYta6v1wZiI': {'track_name': 'How Are We', 'artist': 'Horse Vision', 'album_name': ''}}
+        out = StringIO()
+
+        call_command('enrich_track_metadata', platform=['youtube'], stdout=out)
+
+        mock_batch.assert_called_once()
+        self.assertEqual(mock_batch.call_args.args, (['zYta6v1wZiI'],))
+        self.assertIsInstance(mock_batch.call_args.kwargs['deadline'], Deadline)
+        self.assertIn('youtube_errors=0/1 (0%)', out.getvalue())
@@ -1,12 +1,30 @@
-from django.test import TestCase
-from unittest.mock import patch, MagicMock, call
+from django.test import TestCase, override_settings
+import json
+import time
+from unittest.mock import patch, MagicMock, PropertyMock, call
 from bs4 import BeautifulSoup
-from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
+from selenium.webdriver.common.by import By
+from django.core.cache import cache
 
 from ..src.integrations.youtube import *
 from ..src.integrations.bandcamp import *
 from ..src.integrations.soundcloud import *
 from ..src.integrations.main_integrations import *
+from ..src.integrations.browser_pool import BrowserSessionPool, reset_browser_pool, build_host_resolver_rules, block_resources, BLOCKED_URL_PATTERNS
+from ..src.integrations.metadata_cache import MetadataCache, metadata_cache, canonical_cache_url
+from ..src.integrations.governor import PlatformGovernor, classify_failure, get_governor, reset_governors, FAILURE_ERROR, FAILURE_QUOTA
+from ..src.custom_exceptions import PlatformUnavailableError, DeadlineExceededError
+from ..src.deadline import Deadline, deadline_timeout
+from ..src.utils import canonicalise_streaming_link
+from ..models import StreamingLink
+from ..forms import AddStreamingLink
+from ..src.integrations import http_client
+from ..src.integrations.adapters import PlatformAdapter, register_adapter, unregister_adapter, get_adapter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+from googleapiclient.errors import HttpError
+import requests
 
 
 class YouTubeIntegrationTest(TestCase):
@@ -29,6 +47,18 @@ class YouTubeIntegrationTest(TestCase):
         video_id = extract_youtube_video_id_from_url(self.youtube_music_url)
         self.assertEqual(video_id, "xvmaOOKTiKE")
 
+    def test_extract_youtube_video_id_matches_canonicaliser(self):
+        #Every form canonicalise_streaming_link() accepts gives the same id
+        for url in (
+            "https://m.youtube.com/watch?v=zYta6v1wZiI",
+            "https://www.youtube.com/shorts/zYta6v1wZiI",
+            "https://www.youtube.com/live/zYta6v1wZiI",
+            "https://www.youtube.com/embed/zYta6v1wZiI",
+            "https://youtu.be/zYta6v1wZiI?si=abc123",
+        ):
+            self.assertEqual(extract_youtube_video_id_from_url(url), "zYta6v1wZiI", url)
+            self.assertEqual(canonicalise_streaming_link(url).platform_id, "zYta6v1wZiI", url)
+
     def test_extract_youtube_video_id_from_url_negative(self):
         #Test invalid url music
         video_id = extract_youtube_video_id_from_url("https://maps.google.com/")
@@ -46,7 +76,7 @@ class YouTubeIntegrationTest(TestCase):
         streaming_platform=get_youtube_platform(self.youtube_music_url)
         self.assertEqual(streaming_platform, "youtube_music")
 
-    @patch("music_app_archive.src.integrations.youtube.build")
+    @patch("music_app_archive.src.integrations.youtube.get_youtube_client")
     def test_get_youtube_metadata_positive(self, mock_build):
         #Prepare fake API return
         fake_response = {
@@ -74,6 +104,83 @@ class YouTubeIntegrationTest(TestCase):
         self.assertIsNotNone(meta_data_dict["description"])
         self.assertEqual(meta_data_dict["artist"], "Noel Gallagher")
 
+    @patch("music_app_archive.src.integrations.youtube.build_from_document")
+    def test_youtube_client_is_cached_per_key(self, mock_build_from_document):
+        reset_youtube_client()
+        self.addCleanup(reset_youtube_client)
+
+        with self.settings(YOUTUBE_API_KEY="key-1"):
+            first = get_youtube_client()
+            second = get_youtube_client()
+        with self.settings(YOUTUBE_API_KEY="key-2"):
+            get_youtube_client()
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_build_from_document.call_count, 2)
+        self.assertEqual(mock_build_from_document.call_args[1]["developerKey"], "key-2")
+
+    @patch("music_app_archive.src.integrations.youtube.get_youtube_client")
+    def test_get_youtube_metadata_batch_chunks_ids(self, mock_build):
+        video_ids = [f"video{index:06d}" for index in range(120)]
+
+        #No maxResults: videos.list doesn't support it together with id
+        def fake_list(part, id):
+            request = MagicMock()
+            request.execute.return_value = {
+                "items": [
+                    {"id": video_id, "snippet": {"title": f"Title {video_id}", "channelTitle": "Noel Gallagher - Topic"}}
+                    for video_id in id.split(",")
+                    if video_id != "video000007"
+                ]
+            }
+            return request
+
+        mock_client = MagicMock()
+        mock_client.videos.return_value.list.side_effect = fake_list
+        mock_build.return_value = mock_client
+
+        results = get_youtube_metadata_batch(video_ids + ["not-an-id"])
+
+        #120 ids -> 50 + 50 + 20
+        self.assertEqual(mock_client.videos.return_value.list.call_count, 3)
+        self.assertEqual(results["video000001"]["track_name"], "Title video000001")
+        self.assertEqual(results["video000001"]["artist"], "Noel Gallagher")
+        self.assertIsInstance(results["video000007"], YouTubeMetaDataError)
+        self.assertIsInstance(results["not-an-id"], YouTubeMetaDataError)
+        self.assertEqual(len(results), 121)
+
+    @patch("music_app_archive.src.integrations.youtube.get_youtube_client")
+    def test_get_youtube_metadata_batch_api_error_is_per_id(self, mock_build):
+        mock_client = MagicMock()
+        mock_client.videos.return_value.list.return_value.execute.side_effect = HttpError(MagicMock(status=403), b"quotaExceeded")
+        mock_build.return_value = mock_client
+
+        results = get_youtube_metadata_batch(["zYta6v1wZiI", "V4tc_r4O_6k"])
+
+        self.assertIsInstance(results["zYta6v1wZiI"], YouTubeMetaDataError)
+        self.assertIsInstance(results["V4tc_r4O_6k"], YouTubeMetaDataError)
+        self.assertIsInstance(results["zYta6v1wZiI"].__cause__, HttpError)
+
+    @patch("music_app_archive.src.integrations.youtube.get_youtube_client")
+    def test_get_youtube_playlist_video_ids_pages(self, mock_build):
+        mock_client = MagicMock()
+        mock_client.playlistItems.return_value.list.return_value.execute.side_effect = [
+            {"items": [{"contentDetails": {"videoId": "zYta6v1wZiI"}}], "nextPageToken": "page-2"},
+            {"items": [{"contentDetails": {"videoId": "V4tc_r4O_6k"}}]},
+        ]
+        mock_build.return_value = mock_client
+
+        video_ids = get_youtube_playlist_video_ids("PL1234", max_items=10)
+
+        self.assertEqual(video_ids, ["zYta6v1wZiI", "V4tc_r4O_6k"])
+        self.assertEqual(mock_client.playlistItems.return_value.list.call_args[1]["pageToken"], "page-2")
+
+    def test_load_youtube_discovery_document_offline(self):
+        discovery_document = json.loads(load_youtube_discovery_document())
+
+        self.assertEqual(discovery_document["name"], "youtube")
+        self.assertIn("videos", discovery_document["resources"])
+
 
 class TestGetSoup(TestCase):
     '''
@@ -81,6 +188,10 @@ class TestGetSoup(TestCase):
     '''
     
     def setUp(self):
+        #Each test gets a fresh browser pool so mocked drivers don't leak between tests
+        reset_browser_pool()
+        self.addCleanup(reset_browser_pool)
+
         self.bandcamp_url = "https://artist.bandcamp.com/track/song-name"
 
         self.platform = "bandcamp"
@@ -103,7 +214,7 @@ class TestGetSoup(TestCase):
         '''
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     def test_get_soup_with_remote_selenium(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
@@ -124,12 +235,13 @@ class TestGetSoup(TestCase):
         
         mock_driver.execute_script.assert_called()
         mock_driver.get.assert_called_once_with(self.bandcamp_url)
-        mock_driver.quit.assert_called_once()
+        #Session goes back to the pool rather than being quit
+        mock_driver.quit.assert_not_called()
     
     @patch.dict('os.environ', {}, clear=True)
     @patch('selenium.webdriver.chrome.service.Service')
     @patch('webdriver_manager.chrome.ChromeDriverManager')
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Chrome')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Chrome')
     def test_get_soup_with_local_chrome(self, mock_chrome, mock_driver_manager, mock_service):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
@@ -144,10 +256,10 @@ class TestGetSoup(TestCase):
 
         mock_chrome.assert_called_once()
         mock_service.assert_called_once_with('/fake/path/chromedriver')
-        mock_driver.quit.assert_called_once()
+        mock_driver.quit.assert_not_called()
         
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     def test_get_soup_parses_bandcamp_elements(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
@@ -163,26 +275,90 @@ class TestGetSoup(TestCase):
         self.assertIsNotNone(track_info)
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     @patch('music_app_archive.src.integrations.main_integrations.time.sleep')
     def test_get_soup_implements_delays(self, mock_sleep, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
         mock_remote.return_value = mock_driver
         
-        get_soup(self.bandcamp_url, self.platform)
+        get_soup(self.bandcamp_url, self.platform, human_delays=True)
         
         self.assertTrue(mock_sleep.called)
         self.assertGreater(mock_sleep.call_count, 1)
+
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.main_integrations.time.sleep')
+    def test_get_soup_fast_mode_does_not_sleep(self, mock_sleep, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        mock_remote.return_value = mock_driver
+
+        soup = get_soup(self.bandcamp_url, self.platform)
+
+        self.assertEqual(soup.title.string, "Song Name | Artist Name")
+        mock_sleep.assert_not_called()
+        #Waits on the element the Bandcamp scraper reads, not just <body>
+        mock_driver.find_element.assert_called_with(By.CSS_SELECTOR, '#name-section')
+
+    @override_settings(SELENIUM_HUMAN_DELAYS=True)
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.main_integrations.time.sleep')
+    def test_get_soup_human_delays_setting(self, mock_sleep, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        mock_remote.return_value = mock_driver
+
+        get_soup(self.bandcamp_url, self.platform)
+
+        self.assertEqual(mock_sleep.call_count, 3)
+
+    @override_settings(SELENIUM_PAGE_READY_TIMEOUT=0)
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_page_source_returns_page_after_deadline(self, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = "<html><body>Still loading</body></html>"
+        mock_driver.find_element.side_effect = NoSuchElementException("#name-section")
+        mock_remote.return_value = mock_driver
+
+        page_source = get_page_source(self.bandcamp_url, self.platform)
+
+        #The scraper decides what to do with an incomplete page
+        self.assertEqual(page_source, "<html><body>Still loading</body></html>")
+        mock_driver.quit.assert_not_called()
+
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_page_source_page_load_capped_by_deadline(self, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        mock_driver.get.side_effect = TimeoutException("page load")
+        mock_remote.return_value = mock_driver
+
+        page_source = get_page_source(self.bandcamp_url, self.platform, deadline=Deadline(1))
+
+        #The page load gets what is left of the 1s budget, not SELENIUM_PAGE_READY_TIMEOUT, then is stopped
+        self.assertLessEqual(mock_driver.set_page_load_timeout.call_args.args[0], 1)
+        mock_driver.execute_script.assert_any_call("window.stop();")
+        self.assertEqual(page_source, self.mock_bandcamp_html)
+
+    def test_get_page_source_expired_deadline_skips_browser(self):
+        with patch('music_app_archive.src.integrations.main_integrations.get_browser_pool') as mock_pool:
+            with self.assertRaises(DeadlineExceededError):
+                get_page_source(self.bandcamp_url, self.platform, deadline=Deadline(0))
+        mock_pool.assert_not_called()
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     def test_get_soup_executes_javascript(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
         mock_remote.return_value = mock_driver
         
-        get_soup(self.bandcamp_url, self.platform)
+        get_soup(self.bandcamp_url, self.platform, human_delays=True)
         
         self.assertTrue(mock_driver.execute_script.called)
         
@@ -194,7 +370,7 @@ class TestGetSoup(TestCase):
         self.assertTrue(scroll_called, "Scroll script should be executed")
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     def test_get_soup_sets_chrome_options(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
@@ -209,18 +385,91 @@ class TestGetSoup(TestCase):
         self.assertTrue(hasattr(options, 'arguments'))
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
-    def test_get_soup_driver_cleanup_on_success(self, mock_remote):
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_soup_uses_scraping_profile(self, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        #webdriver.Remote has no execute_cdp_cmd
+        del mock_driver.execute_cdp_cmd
+        mock_remote.return_value = mock_driver
+
+        get_soup(self.bandcamp_url, self.platform)
+
+        options = mock_remote.call_args[1]['options']
+        self.assertEqual(options.page_load_strategy, 'eager')
+        self.assertEqual(options.experimental_options['prefs']['profile.managed_default_content_settings.images'], 2)
+        host_rules = next(argument for argument in options.arguments if argument.startswith('--host-resolver-rules='))
+        self.assertIn('MAP * ~NOTFOUND', host_rules)
+        self.assertIn('EXCLUDE *.bandcamp.com', host_rules)
+        #Remote sessions send the CDP blocklist through the grid
+        mock_driver.execute.assert_any_call(
+            'executeCdpCommand', {'cmd': 'Network.setBlockedURLs', 'params': {'urls': BLOCKED_URL_PATTERNS}}
+        )
+
+    @override_settings(SELENIUM_BLOCK_RESOURCES=False)
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_soup_scraping_profile_can_be_disabled(self, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        mock_remote.return_value = mock_driver
+
+        get_soup(self.bandcamp_url, self.platform)
+
+        options = mock_remote.call_args[1]['options']
+        self.assertEqual(options.page_load_strategy, 'normal')
+        self.assertFalse(any(argument.startswith('--host-resolver-rules=') for argument in options.arguments))
+        mock_driver.execute.assert_not_called()
+
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_page_source_records_transfer_bytes(self, mock_remote):
+        mock_driver = MagicMock()
+        mock_driver.page_source = self.mock_bandcamp_html
+        mock_driver.execute_script.side_effect = lambda script: 48213 if script == TRANSFER_SIZE_SCRIPT else None
+        mock_remote.return_value = mock_driver
+        before = get_fetch_transfer_stats().get('bandcamp', {'fetches': 0, 'bytes': 0})
+
+        get_page_source(self.bandcamp_url, self.platform)
+
+        stats = get_fetch_transfer_stats()['bandcamp']
+        self.assertEqual(stats['fetches'], before['fetches'] + 1)
+        self.assertEqual(stats['bytes'], before['bytes'] + 48213)
+
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_soup_reuses_pooled_session(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
         mock_remote.return_value = mock_driver
         
+        get_soup(self.bandcamp_url, self.platform)
         get_soup(self.bandcamp_url, self.platform)
         
-        mock_driver.quit.assert_called_once()
+        #Second call borrows the warm browser instead of starting a new one
+        mock_remote.assert_called_once()
+        self.assertEqual(mock_driver.get.call_count, 2)
+        mock_driver.quit.assert_not_called()
+
+    @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
+    def test_get_soup_discards_session_on_webdriver_error(self, mock_remote):
+        broken_driver = MagicMock()
+        broken_driver.get.side_effect = WebDriverException("session crashed")
+        healthy_driver = MagicMock()
+        healthy_driver.page_source = self.mock_bandcamp_html
+        mock_remote.side_effect = [broken_driver, healthy_driver]
+
+        with self.assertRaises(WebDriverException):
+            get_soup(self.bandcamp_url, self.platform)
+        broken_driver.quit.assert_called_once()
+
+        soup = get_soup(self.bandcamp_url, self.platform)
+        self.assertEqual(soup.title.string, "Song Name | Artist Name")
+        self.assertEqual(mock_remote.call_count, 2)
     
     @patch.dict('os.environ', {'SELENIUM_REMOTE_URL': 'http://selenium:4444'})
-    @patch('music_app_archive.src.integrations.main_integrations.webdriver.Remote')
+    @patch('music_app_archive.src.integrations.browser_pool.webdriver.Remote')
     def test_get_soup_returns_parseable_html(self, mock_remote):
         mock_driver = MagicMock()
         mock_driver.page_source = self.mock_bandcamp_html
@@ -234,6 +483,102 @@ class TestGetSoup(TestCase):
         self.assertEqual(len(soup.find_all('h3')), 2)
 
 
+class BrowserSessionPoolTest(TestCase):
+    '''
+    Test the BrowserSessionPool in browser_pool.py with fake drivers
+    '''
+    def setUp(self):
+        self.drivers = []
+
+        def fake_driver_factory():
+            driver = MagicMock()
+            self.drivers.append(driver)
+            return driver
+
+        self.pool = BrowserSessionPool(
+            max_size=2,
+            max_pages_per_session=3,
+            borrow_timeout=0.1,
+            driver_factory=fake_driver_factory
+        )
+        self.addCleanup(self.pool.shutdown)
+
+    def test_prewarm_starts_sessions_up_to_max_size(self):
+        started = self.pool.prewarm()
+
+        self.assertEqual(started, 2)
+        self.assertEqual(self.pool.stats()['idle'], 2)
+        self.assertEqual(self.pool.prewarm(), 0)
+
+    def test_borrow_reuses_returned_session(self):
+        with self.pool.session() as first:
+            pass
+        with self.pool.session() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.drivers), 1)
+        self.assertEqual(self.pool.stats()['reused'], 1)
+
+    def test_session_recycled_after_max_pages(self):
+        for _ in range(3):
+            with self.pool.session():
+                pass
+
+        self.drivers[0].quit.assert_called_once()
+        self.assertEqual(self.pool.stats()['recycled'], 1)
+        self.assertEqual(self.pool.stats()['alive'], 0)
+
+    def test_unhealthy_idle_session_is_replaced(self):
+        self.pool.prewarm(1)
+        type(self.drivers[0]).current_url = PropertyMock(side_effect=WebDriverException("gone"))
+
+        session = self.pool.borrow()
+        self.pool.release(session)
+
+        self.assertIsNot(session.driver, self.drivers[0])
+        self.drivers[0].quit.assert_called_once()
+        self.assertEqual(self.pool.stats()['discarded'], 1)
+
+    def test_borrow_times_out_when_pool_exhausted(self):
+        first = self.pool.borrow()
+        second = self.pool.borrow()
+
+        with self.assertRaises(TimeoutError):
+            self.pool.borrow()
+
+        self.pool.release(first)
+        self.pool.release(second)
+        self.assertEqual(len(self.drivers), 2)
+
+
+class ScrapingProfileTest(TestCase):
+    '''
+    Test the resource-blocking helpers in browser_pool.py
+    '''
+    def test_build_host_resolver_rules(self):
+        rules = build_host_resolver_rules(['bandcamp.com', '*.bandcamp.com'])
+
+        self.assertEqual(rules, 'MAP * ~NOTFOUND, EXCLUDE bandcamp.com, EXCLUDE *.bandcamp.com')
+
+    def test_block_resources_with_local_chrome(self):
+        driver = MagicMock()
+
+        block_resources(driver)
+
+        driver.execute_cdp_cmd.assert_has_calls([
+            call('Network.enable', {}),
+            call('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS}),
+        ])
+
+    def test_block_resources_failure_is_not_fatal(self):
+        driver = MagicMock()
+        driver.execute_cdp_cmd.side_effect = WebDriverException("unknown command")
+
+        #Prefs and the host allow-list still apply, so the session stays usable
+        block_resources(driver)
+
+
 class BandcampIntegrationTest(TestCase):
     '''
     Test the Bandcamp integration functions that works with bandcamp.py module.
@@ -349,6 +694,47 @@ class BandcampIntegrationTest(TestCase):
         
         self.assertIn("Could not find #name-section", str(context.exception))
 
+    def test_scrape_bandcamp_page_json_ld_fallback(self):
+        html = '''
+        <html>
+            <head>
+                <script type="application/ld+json">
+                    {"@type": "MusicRecording", "name": "How Are We",
+                     "byArtist": {"@type": "MusicGroup", "name": "Horse Vision"},
+                     "inAlbum": {"@type": "MusicAlbum", "name": "Another Life"}}
+                </script>
+            </head>
+            <body></body>
+        </html>
+        '''
+        soup = BeautifulSoup(html, 'html.parser')
+        result = scrape_bandcamp_page(soup)
+
+        self.assertEqual(result, ['How Are We', 'Horse Vision', 'Another Life'])
+
+    def test_scrape_bandcamp_page_accepts_raw_html(self):
+        '''
+        Test raw HTML (bytes or str) is parsed with the strainer and gives the same result as a full soup
+        '''
+        full_soup_result = scrape_bandcamp_page(BeautifulSoup(self.mock_album_with_dash_html, 'html.parser'))
+
+        self.assertEqual(scrape_bandcamp_page(self.mock_album_with_dash_html), full_soup_result)
+        self.assertEqual(scrape_bandcamp_page(self.mock_album_with_dash_html.encode()), full_soup_result)
+
+    def test_scrape_bandcamp_page_raw_html_json_ld_fallback(self):
+        html = b'''
+        <html><head>
+            <script type="application/ld+json">{"name": "How Are We", "byArtist": {"name": "Horse Vision"}}</script>
+        </head><body><div id="pgBd"></div></body></html>
+        '''
+        self.assertEqual(scrape_bandcamp_page(html), ['How Are We', 'Horse Vision', None])
+
+    def test_parse_bandcamp_html_keeps_only_strained_region(self):
+        soup = parse_bandcamp_html(self.mock_album_with_dash_html, parse_only=NAME_SECTION_STRAINER)
+
+        self.assertIsNotNone(soup.find("div", id="name-section"))
+        self.assertIsNone(soup.find("body"))
+
     def test_scrape_bandcamp_page_missing_track_title(self):
         html = '''
         <html>
@@ -496,12 +882,47 @@ class BandcampIntegrationTest(TestCase):
         self.assertEqual(result.get('record_label'), '')
         self.assertEqual(result.get('genre'), '')
 
+    @patch('music_app_archive.src.integrations.bandcamp.http_client.get')
+    def test_get_bandcamp_album_meta_data_dicts(self, mock_get):
+        '''
+        Test the album JSON-LD yields a meta_data_dict per track from a single page fetch
+        '''
+        album_json_ld = {
+            "@type": "MusicAlbum",
+            "name": "Another Life",
+            "byArtist": {"name": "Horse Vision"},
+            "track": {
+                "itemListElement": [
+                    {"position": 1, "item": {"@id": "https://horsevision.bandcamp.com/track/another-life", "name": "Another Life"}},
+                    {"position": 2, "item": {"@id": "https://horsevision.bandcamp.com/track/how-are-we", "name": "How Are We"}},
+                ]
+            }
+        }
+        mock_get.return_value.content = (
+            '<html><head><script type="application/ld+json">' + json.dumps(album_json_ld) + '</script></head></html>'
+        ).encode()
+
+        results = get_bandcamp_album_meta_data_dicts("https://horsevision.bandcamp.com/album/another-life", "track", 10)
+
+        mock_get.assert_called_once()
+        self.assertEqual(list(results), [
+            "https://horsevision.bandcamp.com/track/another-life",
+            "https://horsevision.bandcamp.com/track/how-are-we",
+        ])
+        meta_data_dict = results["https://horsevision.bandcamp.com/track/how-are-we"]
+        self.assertEqual(meta_data_dict["track_name"], "How Are We")
+        self.assertEqual(meta_data_dict["artist"], "Horse Vision")
+        self.assertEqual(meta_data_dict["album_name"], "Another Life")
+
 
 class SoundcloudIntegrationTest(TestCase):
     '''
     Test the Soundcloud integration functions in soundcloud.py
     '''
     def setUp(self):
+        #The access token is cached in the Django cache, start every test without one
+        cache.clear()
+
         self.soundcloud_url = "https://soundcloud.com/resident-advisor/ex-795-avalon-emerson"
         self.soundcloud_track_url = "https://soundcloud.com/scissorandthread/drowning-reiling-hull-dub-1"
         self.mix_track_type = "mix"
@@ -548,8 +969,8 @@ class SoundcloudIntegrationTest(TestCase):
 
     # --- get_soundcloud_metadata tests ---
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_positive(self, mock_post, mock_get):
         '''
         Test get_soundcloud_metadata returns the full response dict
@@ -562,8 +983,8 @@ class SoundcloudIntegrationTest(TestCase):
         self.assertEqual(result.get("title"), "EX.795 Avalon Emerson")
         self.assertEqual(result.get("user", {}).get("username"), "Resident Advisor")
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_calls_token_endpoint(self, mock_post, mock_get):
         '''
         Test that the OAuth token endpoint is called correctly
@@ -578,11 +999,12 @@ class SoundcloudIntegrationTest(TestCase):
                 "grant_type": "client_credentials",
                 "client_id": settings.SOUNDCLOUD_CLIENT_ID,
                 "client_secret": settings.SOUNDCLOUD_CLIENT_SECRET
-            }
+            },
+            deadline=None
         )
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_calls_resolve_endpoint(self, mock_post, mock_get):
         '''
         Test that the resolve endpoint is called with correct params and auth header
@@ -594,11 +1016,12 @@ class SoundcloudIntegrationTest(TestCase):
         mock_get.assert_called_once_with(
             "https://api.soundcloud.com/resolve",
             params={"url": self.soundcloud_url},
-            headers={"Authorization": f"OAuth {self.mock_access_token}"}
+            headers={"Authorization": f"OAuth {self.mock_access_token}"},
+            deadline=None
         )
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_token_failure(self, mock_post, mock_get):
         '''
         Test that a token request HTTP failure raises SoundcloudMetaDataError
@@ -611,8 +1034,8 @@ class SoundcloudIntegrationTest(TestCase):
         self.assertIn("HTTP error fetching SoundCloud metadata", str(context.exception))
         mock_get.assert_not_called()
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_resolve_failure(self, mock_post, mock_get):
         '''
         Test that a resolve request HTTP failure raises SoundcloudMetaDataError
@@ -628,8 +1051,8 @@ class SoundcloudIntegrationTest(TestCase):
 
         self.assertIn("HTTP error fetching SoundCloud metadata", str(context.exception))
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_missing_access_token(self, mock_post, mock_get):
         '''
         Test that a missing access token in the token response raises SoundcloudMetaDataError
@@ -644,8 +1067,60 @@ class SoundcloudIntegrationTest(TestCase):
         self.assertIn("Failed to retrieve SoundCloud access token", str(context.exception))
         mock_get.assert_not_called()
 
-    @patch('music_app_archive.src.integrations.soundcloud.requests.get')
-    @patch('music_app_archive.src.integrations.soundcloud.requests.post')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
+    def test_get_soundcloud_metadata_reuses_cached_token(self, mock_post, mock_get):
+        '''
+        Test that the access token is requested once and reused for later calls
+        '''
+        self._mock_requests(mock_post, mock_get)
+
+        get_soundcloud_metadata(self.soundcloud_url)
+        get_soundcloud_metadata(self.soundcloud_track_url)
+
+        mock_post.assert_called_once()
+        self.assertEqual(mock_get.call_count, 2)
+
+    @patch('music_app_archive.src.integrations.soundcloud.cache.set')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
+    def test_token_cached_until_shortly_before_expiry(self, mock_post, mock_get, mock_cache_set):
+        '''
+        Test that the token TTL is expires_in minus the refresh margin
+        '''
+        self._mock_requests(mock_post, mock_get)
+        mock_post.return_value.json.return_value = {"access_token": self.mock_access_token, "expires_in": 600}
+
+        with self.settings(SOUNDCLOUD_TOKEN_REFRESH_MARGIN=60):
+            get_soundcloud_metadata(self.soundcloud_url)
+
+        mock_cache_set.assert_called_once_with(SoundcloudTokenProvider.cache_key, self.mock_access_token, 540)
+
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
+    def test_get_soundcloud_metadata_retries_once_on_401(self, mock_post, mock_get):
+        '''
+        Test that a 401 forces a token refresh and a single retry
+        '''
+        cache.set(SoundcloudTokenProvider.cache_key, "expired_token")
+        self._mock_requests(mock_post, mock_get)
+        unauthorised = MagicMock(status_code=401)
+        resolved = MagicMock(status_code=200)
+        resolved.json.return_value = self.mock_mix_response
+        mock_get.side_effect = [unauthorised, resolved]
+
+        result = get_soundcloud_metadata(self.soundcloud_url)
+
+        self.assertEqual(result.get("title"), "EX.795 Avalon Emerson")
+        mock_post.assert_called_once()
+        self.assertEqual(
+            mock_get.call_args_list[1][1]["headers"],
+            {"Authorization": f"OAuth {self.mock_access_token}"}
+        )
+        self.assertEqual(cache.get(SoundcloudTokenProvider.cache_key), self.mock_access_token)
+
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
     def test_get_soundcloud_metadata_unexpected_error(self, mock_post, mock_get):
         '''
         Test that an unexpected error raises SoundcloudMetaDataError
@@ -778,11 +1253,37 @@ class SoundcloudIntegrationTest(TestCase):
 
         orchestrate_soundcloud_meta_data_dictionary(self.soundcloud_url, self.mix_track_type)
 
-        mock_get_metadata.assert_called_once_with(self.soundcloud_url)
+        mock_get_metadata.assert_called_once_with(self.soundcloud_url, deadline=None)
+
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.get')
+    @patch('music_app_archive.src.integrations.soundcloud.http_client.post')
+    def test_get_soundcloud_set_meta_data_dicts(self, mock_post, mock_get):
+        '''
+        Test one resolve call yields a meta_data_dict per track in the set
+        '''
+        set_response = {
+            "kind": "playlist",
+            "tracks": [
+                dict(self.mock_track_response, permalink_url=self.soundcloud_track_url),
+                {"id": 42},
+            ]
+        }
+        self._mock_requests(mock_post, mock_get, track_response=set_response)
+
+        results = get_soundcloud_set_meta_data_dicts("https://soundcloud.com/scissorandthread/sets/dubs", "track", 10)
+
+        mock_get.assert_called_once()
+        self.assertEqual(results[self.soundcloud_track_url]["track_name"], "Drowning (Reiling Hull Dub)")
+        self.assertEqual(results[self.soundcloud_track_url]["streaming_link"], self.soundcloud_track_url)
+        self.assertIsInstance(results["soundcloud:track:42"], SoundcloudMetaDataError)
+
 
-        
 class MainIntegrationTest(TestCase):
     def setUp(self):
+        #Start every test with an empty metadata cache
+        cache.clear()
+        metadata_cache.clear_local()
+
         self.bandcamp_track_url = "https://horsevision.bandcamp.com/track/how-are-we"
         self.track_type = 'track'
         self.empty_url = ""
@@ -800,14 +1301,16 @@ class MainIntegrationTest(TestCase):
             'genre': '',
         }
 
-    @patch('music_app_archive.src.integrations.main_integrations.get_soup')
+    @patch('music_app_archive.src.integrations.main_integrations.get_bandcamp_static_html')
+    @patch('music_app_archive.src.integrations.main_integrations.get_page_source')
     @patch('music_app_archive.src.integrations.main_integrations.orchestrate_bandcamp_meta_data_dictionary')
-    def test_orchestrate_platform_api_positive(self, mock_bandcamp_orchestrate, mock_get_soup):
+    def test_orchestrate_platform_api_positive(self, mock_bandcamp_orchestrate, mock_get_page_source, mock_static_html):
         '''
-        Test orchestrate_platform_api successfully routes to Bandcamp
+        Test orchestrate_platform_api successfully routes to Bandcamp via the browser when the static fetch fails
         '''
-        mock_soup = MagicMock()
-        mock_get_soup.return_value = mock_soup
+        mock_static_html.side_effect = BandCampMetaDataError("Static fetch failed")
+        mock_page_source = "<html></html>"
+        mock_get_page_source.return_value = mock_page_source
         mock_bandcamp_orchestrate.return_value = self.mock_bandcamp_metadata
         
         meta_data_dict = orchestrate_platform_api(self.bandcamp_track_url, self.track_type)
@@ -817,10 +1320,700 @@ class MainIntegrationTest(TestCase):
         self.assertEqual(meta_data_dict.get('artist'), 'Horse Vision')
         self.assertEqual(meta_data_dict.get('album_name'), 'Another Life')
         
-        #Verify get_soup was called, then its result passed to the orchestrator
-        mock_get_soup.assert_called_once_with(self.bandcamp_track_url, 'bandcamp')
-        mock_bandcamp_orchestrate.assert_called_once_with(mock_soup, self.bandcamp_track_url)
+        #Verify get_page_source was called, then its result passed to the orchestrator
+        mock_get_page_source.assert_called_once_with(self.bandcamp_track_url, 'bandcamp', deadline=None)
+        mock_bandcamp_orchestrate.assert_called_once_with(mock_page_source, self.bandcamp_track_url)
 
     def test_orchestrate_platform_api_negative(self):
         with self.assertRaises(ValueError):
-            orchestrate_platform_api(self.empty_url, self.track_type)
\ No newline at end of file
+            orchestrate_platform_api(self.empty_url, self.track_type)
+
+    @patch('music_app_archive.src.integrations.main_integrations.get_page_source')
+    @patch('music_app_archive.src.integrations.bandcamp.http_client.get')
+    def test_bandcamp_static_path_skips_browser(self, mock_requests_get, mock_get_page_source):
+        '''
+        Test that a server-rendered #name-section is parsed without starting a browser
+        '''
+        mock_requests_get.return_value.content = '''
+            <div id="name-section">
+                <h2 class="trackTitle">How Are We</h2>
+                <h3><a href="/album/another-life">Another Life</a> by <a href="/">Horse Vision</a></h3>
+            </div>
+        '''.encode()
+        before = get_fetch_path_stats().get('bandcamp', {}).get('static', 0)
+
+        meta_data_dict = orchestrate_platform_api(self.bandcamp_track_url, self.track_type)
+
+        self.assertEqual(meta_data_dict.get('track_name'), 'How Are We')
+        self.assertEqual(meta_data_dict.get('artist'), 'Horse Vision')
+        mock_get_page_source.assert_not_called()
+        self.assertEqual(get_fetch_path_stats()['bandcamp']['static'], before + 1)
+
+    @patch('music_app_archive.src.integrations.main_integrations.get_page_source')
+    @patch('music_app_archive.src.integrations.bandcamp.http_client.get')
+    def test_bandcamp_static_http_error_falls_back_to_browser(self, mock_requests_get, mock_get_page_source):
+        '''
+        Test that an HTTP failure on the static path falls back to the browser path
+        '''
+        mock_requests_get.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("503")
+        mock_get_page_source.return_value = (
+            '<div id="name-section"><h2 class="trackTitle">How Are We</h2><h3><a>Horse Vision</a></h3></div>'
+        )
+        before = get_fetch_path_stats().get('bandcamp', {}).get('browser', 0)
+
+        meta_data_dict = orchestrate_platform_api(self.bandcamp_track_url, self.track_type)
+
+        self.assertEqual(meta_data_dict.get('artist'), 'Horse Vision')
+        mock_get_page_source.assert_called_once_with(self.bandcamp_track_url, 'bandcamp', deadline=None)
+        self.assertEqual(get_fetch_path_stats()['bandcamp']['browser'], before + 1)
+
+    @patch('music_app_archive.src.integrations.main_integrations.get_page_source')
+    @patch('music_app_archive.src.integrations.bandcamp.http_client.get')
+    def test_bandcamp_deadline_keeps_title_as_partial_metadata(self, mock_requests_get, mock_get_page_source):
+        '''
+        Test that running out of time before #name-section renders raises DeadlineExceededError
+        with the track and artist from the page <title>
+        '''
+        mock_requests_get.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("503")
+        deadline = Deadline(0.05)
+
+        def slow_page_source(url, platform, deadline):
+            time.sleep(0.1)
+            return '<html><head><title>How Are We | Horse Vision</title></head><body></body></html>'
+        mock_get_page_source.side_effect = slow_page_source
+
+        with self.assertRaises(DeadlineExceededError) as context:
+            orchestrate_platform_api(self.bandcamp_track_url, self.track_type, deadline=deadline)
+
+        self.assertEqual(context.exception.partial_meta_data_dict, {
+            'track_name': 'How Are We',
+            'artist': 'Horse Vision',
+            'streaming_platform': 'bandcamp',
+        })
+
+
+class MetadataCacheTest(TestCase):
+    '''
+    Test the MetadataCache in metadata_cache.py
+    '''
+    def setUp(self):
+        cache.clear()
+        self.metadata_cache = MetadataCache(
+            ttls={'youtube': 60, 'bandcamp': 60, 'soundcloud': 60},
+            negative_ttl=30,
+            max_local_entries=2
+        )
+        self.youtube_url = "https://www.youtube.com/watch?v=zYta6v1wZiI"
+        self.meta_data_dict = {
+            'track_type': 'track',
+            'track_name': 'If I Had A Gun…',
+            'artist': 'Noel Gallagher',
+            'streaming_platform': 'youtube',
+            'streaming_link': self.youtube_url,
+        }
+
+    def test_get_or_fetch_caches_result(self):
+        fetch = MagicMock(return_value=self.meta_data_dict)
+
+        first = self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+        second = self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        fetch.assert_called_once()
+        self.assertEqual(first, self.meta_data_dict)
+        self.assertEqual(second, self.meta_data_dict)
+        self.assertEqual(self.metadata_cache.stats()['local_hits'], 1)
+
+    def test_track_type_is_part_of_the_key(self):
+        fetch = MagicMock(return_value=self.meta_data_dict)
+
+        self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+        self.metadata_cache.get_or_fetch(self.youtube_url, 'mix', 'youtube', fetch)
+
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_shared_tier_serves_other_workers(self):
+        fetch = MagicMock(return_value=self.meta_data_dict)
+        self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        #A second worker has its own (empty) local tier but shares the Django cache
+        other_worker = MetadataCache(ttls={'youtube': 60}, negative_ttl=30, max_local_entries=2)
+        result = other_worker.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        fetch.assert_called_once()
+        self.assertEqual(result, self.meta_data_dict)
+        self.assertEqual(other_worker.stats()['shared_hits'], 1)
+
+    def test_platform_errors_are_negatively_cached(self):
+        fetch = MagicMock(side_effect=YouTubeMetaDataError("No video found"))
+
+        for _ in range(2):
+            with self.assertRaises(YouTubeMetaDataError) as context:
+                self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+            self.assertIn("No video found", str(context.exception))
+
+        fetch.assert_called_once()
+        self.assertEqual(self.metadata_cache.stats()['negative_hits'], 1)
+
+    def test_unexpected_errors_are_not_cached(self):
+        fetch = MagicMock(side_effect=[ValueError("boom"), self.meta_data_dict])
+
+        with self.assertRaises(ValueError):
+            self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+        result = self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        self.assertEqual(result, self.meta_data_dict)
+
+    def test_local_tier_evicts_least_recently_used(self):
+        fetch = MagicMock(return_value=self.meta_data_dict)
+        urls = [f"https://www.youtube.com/watch?v=zYta6v1wZi{suffix}" for suffix in "ABC"]
+
+        for url in urls:
+            self.metadata_cache.get_or_fetch(url, 'track', 'youtube', fetch)
+
+        self.assertEqual(self.metadata_cache.stats()['local_entries'], 2)
+        self.assertIsNone(self.metadata_cache._get_local(self.metadata_cache.make_key(urls[0], 'track')))
+
+    def test_canonical_cache_url_ignores_tracking_params(self):
+        self.assertEqual(
+            canonical_cache_url("https://SoundCloud.com/artist/track/?si=abc123&utm_source=x#t=10"),
+            canonical_cache_url("https://soundcloud.com/artist/track")
+        )
+
+    def test_canonical_cache_url_shares_youtube_variants(self):
+        self.assertEqual(
+            canonical_cache_url("https://youtu.be/zYta6v1wZiI?si=abc123"),
+            canonical_cache_url("https://www.youtube.com/watch?v=zYta6v1wZiI&list=LL&t=42")
+        )
+
+    def test_concurrent_misses_share_one_fetch(self):
+        release = threading.Event()
+        fetch = MagicMock(side_effect=lambda: release.wait(5) and self.meta_data_dict)
+        results = []
+
+        def submit():
+            results.append(self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch))
+
+        threads = [threading.Thread(target=submit) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        #Let every thread miss the cache and join the in-flight fetch before it finishes
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        fetch.assert_called_once()
+        self.assertEqual(results, [self.meta_data_dict] * 5)
+        self.assertEqual(self.metadata_cache.stats()['coalesced'], 4)
+
+    def test_waits_for_another_workers_fetch(self):
+        key = self.metadata_cache.make_key(self.youtube_url, 'track')
+        other_worker = MetadataCache(ttls={'youtube': 60}, negative_ttl=30, max_local_entries=2)
+        fetch = MagicMock(return_value=self.meta_data_dict)
+
+        #Another worker holds the fetch lock and stores its result a moment later
+        cache.add(f"{key}:lock", 'other-worker', 30)
+        threading.Timer(0.1, lambda: other_worker.set(key, 'youtube', self.meta_data_dict)).start()
+
+        result = self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        fetch.assert_not_called()
+        self.assertEqual(result, self.meta_data_dict)
+        self.assertEqual(self.metadata_cache.stats()['coalesced_shared'], 1)
+
+    def test_get_or_fetch_many_batches_misses_and_caches_errors(self):
+        urls = [self.youtube_url, "https://www.youtube.com/watch?v=V4tc_r4O_6k", "https://www.youtube.com/watch?v=xvmaOOKTiKE"]
+        fetch_batch = MagicMock(return_value={
+            urls[1]: self.meta_data_dict,
+            urls[2]: YouTubeMetaDataError("No video found"),
+        })
+        self.metadata_cache.set(self.metadata_cache.make_key(urls[0], 'track'), 'youtube', self.meta_data_dict)
+
+        results, in_flight = self.metadata_cache.get_or_fetch_many(urls, 'track', 'youtube', fetch_batch)
+
+        fetch_batch.assert_called_once_with(urls[1:])
+        self.assertEqual(in_flight, [])
+        self.assertEqual(results[urls[0]], self.meta_data_dict)
+        self.assertIsInstance(results[urls[2]], YouTubeMetaDataError)
+        #The error is negatively cached like get_or_fetch() caches it
+        with self.assertRaises(YouTubeMetaDataError):
+            self.metadata_cache.get_or_fetch(urls[2], 'track', 'youtube', MagicMock())
+
+    def test_get_or_fetch_many_leaves_links_being_fetched_elsewhere(self):
+        key = self.metadata_cache.make_key(self.youtube_url, 'track')
+        fetch_batch = MagicMock()
+
+        cache.add(f"{key}:lock", 'other-worker', 30)
+        results, in_flight = self.metadata_cache.get_or_fetch_many([self.youtube_url], 'track', 'youtube', fetch_batch)
+
+        fetch_batch.assert_not_called()
+        self.assertEqual(results, {})
+        self.assertEqual(in_flight, [self.youtube_url])
+        self.assertEqual(self.metadata_cache._flights, {})
+
+    def test_wait_for_another_worker_is_bounded(self):
+        key = self.metadata_cache.make_key(self.youtube_url, 'track')
+        self.metadata_cache.single_flight_wait = 0.1
+        fetch = MagicMock(return_value=self.meta_data_dict)
+
+        #The lock holder never stores a result (e.g. it is stuck), so we fetch after the bounded wait
+        cache.add(f"{key}:lock", 'stuck-worker', 30)
+        result = self.metadata_cache.get_or_fetch(self.youtube_url, 'track', 'youtube', fetch)
+
+        fetch.assert_called_once()
+        self.assertEqual(result, self.meta_data_dict)
+
+
+class PlatformGovernorTest(TestCase):
+    '''
+    Test the outbound-call governor in governor.py
+    '''
+    def setUp(self):
+        cache.clear()
+        metadata_cache.clear_local()
+        reset_governors()
+        self.addCleanup(reset_governors)
+
+    def make_governor(self, **overrides):
+        limits = dict(
+            max_in_flight=2, rate=100, burst=100, failure_threshold=3,
+            reset_timeout=30, quota_reset_timeout=600, max_wait=0, poll_interval=0.01
+        )
+        limits.update(overrides)
+        return PlatformGovernor('test', **limits)
+
+    def http_error(self, status, reason=''):
+        response = MagicMock(status=status, reason=reason)
+        return HttpError(response, json.dumps({'error': {'errors': [{'reason': reason}]}}).encode())
+
+    def fail(self, governor, exc):
+        with self.assertRaises(type(exc)):
+            with governor.call():
+                raise exc
+
+    def test_classify_failure(self):
+        not_found = YouTubeMetaDataError("No video found for id=zYta6v1wZiI")
+        try:
+            raise YouTubeMetaDataError("YouTube API error") from self.http_error(403, 'quotaExceeded')
+        except YouTubeMetaDataError as e:
+            quota = e
+
+        self.assertEqual(classify_failure(quota), FAILURE_QUOTA)
+        self.assertEqual(classify_failure(self.http_error(503)), FAILURE_ERROR)
+        self.assertEqual(classify_failure(requests.exceptions.ConnectionError("reset")), FAILURE_ERROR)
+        self.assertEqual(classify_failure(WebDriverException("crashed")), FAILURE_ERROR)
+        self.assertIsNone(classify_failure(not_found))
+        self.assertIsNone(classify_failure(self.http_error(404)))
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        governor = self.make_governor()
+        for _ in range(3):
+            self.fail(governor, requests.exceptions.Timeout("slow"))
+
+        calls = MagicMock()
+        with self.assertRaises(PlatformUnavailableError) as context:
+            with governor.call():
+                calls()
+
+        calls.assert_not_called()
+        self.assertEqual(context.exception.platform, 'test')
+        self.assertTrue(governor.state()['circuit_open'])
+
+    def test_success_resets_consecutive_failures(self):
+        governor = self.make_governor()
+        for _ in range(2):
+            self.fail(governor, requests.exceptions.Timeout("slow"))
+        with governor.call():
+            pass
+        for _ in range(2):
+            self.fail(governor, requests.exceptions.Timeout("slow"))
+
+        self.assertFalse(governor.state()['circuit_open'])
+        self.assertEqual(governor.state()['failures'], 2)
+
+    def test_quota_error_opens_circuit_at_once(self):
+        governor = self.make_governor()
+
+        self.fail(governor, self.http_error(429))
+
+        self.assertTrue(governor.state()['circuit_open'])
+
+    def test_half_open_allows_one_probe(self):
+        governor = self.make_governor(reset_timeout=0.05)
+        for _ in range(3):
+            self.fail(governor, requests.exceptions.Timeout("slow"))
+        time.sleep(0.06)
+
+        #The probe fails, so the circuit opens again
+        self.fail(governor, requests.exceptions.Timeout("still slow"))
+        with self.assertRaises(PlatformUnavailableError):
+            with governor.call():
+                pass
+
+        time.sleep(0.06)
+        with governor.call():
+            pass
+        self.assertFalse(governor.state()['circuit_open'])
+        self.assertEqual(governor.state()['failures'], 0)
+
+    def test_token_bucket_limits_rate(self):
+        governor = self.make_governor(rate=1, burst=2)
+
+        with governor.call():
+            pass
+        with governor.call():
+            pass
+        with self.assertRaises(PlatformUnavailableError):
+            with governor.call():
+                pass
+
+    def test_in_flight_limit(self):
+        governor = self.make_governor(max_in_flight=1)
+
+        with governor.call():
+            with self.assertRaises(PlatformUnavailableError):
+                with governor.call():
+                    pass
+        #The slot is released when the call finishes
+        with governor.call():
+            pass
+        self.assertEqual(governor.state()['in_flight'], 0)
+
+    def test_in_flight_slots_expire_one_by_one(self):
+        governor = self.make_governor(max_in_flight=2)
+
+        with governor.call():
+            with governor.call():
+                #The first call's slot expires while both calls are still running
+                cache.delete(governor._slot_keys()[0])
+                self.assertEqual(governor.state()['in_flight'], 1)
+                with governor.call():
+                    #Only the expired slot was freed, the limit still holds
+                    with self.assertRaises(PlatformUnavailableError):
+                        with governor.call():
+                            pass
+            self.assertEqual(governor.state()['in_flight'], 0)
+
+    def test_expired_slot_is_not_freed_twice(self):
+        governor = self.make_governor(max_in_flight=1)
+
+        with governor.call():
+            #The slot expires mid-call and another call claims it
+            slot_key = governor._slot_keys()[0]
+            cache.set(slot_key, 'other call')
+        #Finishing the first call leaves the other call's slot alone
+        self.assertEqual(cache.get(slot_key), 'other call')
+        self.assertEqual(governor.state()['in_flight'], 1)
+
+    @patch('music_app_archive.src.integrations.youtube.get_youtube_client')
+    def test_quota_error_in_a_youtube_batch_opens_the_circuit(self, mock_build):
+        mock_client = MagicMock()
+        mock_client.videos.return_value.list.return_value.execute.side_effect = self.http_error(403, 'quotaExceeded')
+        mock_build.return_value = mock_client
+        urls = ["https://www.youtube.com/watch?v=zYta6v1wZiI", "https://www.youtube.com/watch?v=V4tc_r4O_6k"]
+
+        results = orchestrate_platform_api_batch(urls, "track")
+
+        self.assertEqual(classify_failure(results[urls[0]]), FAILURE_QUOTA)
+        self.assertTrue(get_governor('youtube').state()['circuit_open'])
+        results = orchestrate_platform_api_batch(["https://www.youtube.com/watch?v=xvmaOOKTiKE"], "track")
+        self.assertIsInstance(results["https://www.youtube.com/watch?v=xvmaOOKTiKE"], PlatformUnavailableError)
+        self.assertEqual(mock_client.videos.return_value.list.return_value.execute.call_count, 1)
+
+    @override_settings(PLATFORM_GOVERNOR={'youtube': dict(
+        max_in_flight=1, rate=100, burst=100, failure_threshold=1, reset_timeout=30, quota_reset_timeout=600
+    )})
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_get_youtube_meta_data_dict')
+    def test_orchestrate_platform_api_fails_fast_when_circuit_open(self, mock_youtube):
+        try:
+            raise YouTubeMetaDataError("YouTube API error") from self.http_error(500)
+        except YouTubeMetaDataError as e:
+            mock_youtube.side_effect = e
+        with self.assertRaises(YouTubeMetaDataError):
+            orchestrate_platform_api("https://www.youtube.com/watch?v=zYta6v1wZiI", "track")
+
+        with self.assertRaises(PlatformUnavailableError):
+            orchestrate_platform_api("https://www.youtube.com/watch?v=V4tc_r4O_6k", "track")
+        self.assertEqual(mock_youtube.call_count, 1)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    '''
+    Local HTTP/1.1 endpoint for HttpClientTest: /flaky answers 503 (Retry-After: 0) once, then 200
+    '''
+    protocol_version = 'HTTP/1.1'
+    flaky_calls = 0
+
+    def do_GET(self):
+        status = 200
+        if self.path == '/flaky':
+            KeepAliveHandler.flaky_calls += 1
+            status = 503 if KeepAliveHandler.flaky_calls == 1 else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        if status == 503:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpClientTest(TestCase):
+    '''
+    Test the pooled HTTP client in http_client.py
+    '''
+    def setUp(self):
+        http_client.reset_sessions()
+        self.addCleanup(http_client.reset_sessions)
+
+    def start_server(self):
+        KeepAliveHandler.flaky_calls = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def response(self, status, headers=None):
+        response = MagicMock(status_code=status)
+        response.headers = headers or {}
+        return response
+
+    def test_connections_are_reused_per_host(self):
+        base_url = self.start_server()
+
+        for _ in range(3):
+            self.assertEqual(http_client.get(f"{base_url}/ok").status_code, 200)
+
+        stats = http_client.get_connection_stats()[base_url]
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 2)
+
+    def test_retries_5xx_honouring_retry_after(self):
+        base_url = self.start_server()
+
+        response = http_client.get(f"{base_url}/flaky")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(KeepAliveHandler.flaky_calls, 2)
+        self.assertEqual(http_client.get_connection_stats()[base_url]['retries'], 1)
+
+    @patch('music_app_archive.src.integrations.http_client.time.sleep')
+    def test_gives_up_after_max_retries(self, mock_sleep):
+        session = MagicMock()
+        session.request.return_value = self.response(502)
+
+        with patch.object(http_client, 'get_session', return_value=session), override_settings(HTTP_CLIENT_MAX_RETRIES=2):
+            response = http_client.get("https://api.soundcloud.com/resolve")
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(session.request.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        #Jittered backoff stays under base * 2^attempt
+        for attempt, sleep_call in enumerate(mock_sleep.call_args_list):
+            self.assertLessEqual(sleep_call.args[0], 0.5 * 2 ** attempt)
+
+    @patch('music_app_archive.src.integrations.http_client.time.sleep')
+    def test_long_retry_after_is_not_waited_for(self, mock_sleep):
+        session = MagicMock()
+        session.request.return_value = self.response(429, {'Retry-After': '3600'})
+
+        with patch.object(http_client, 'get_session', return_value=session):
+            response = http_client.get("https://api.soundcloud.com/resolve")
+
+        #The 429 goes back to the caller, and from there to the platform governor
+        self.assertEqual(response.status_code, 429)
+        session.request.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    @patch('music_app_archive.src.integrations.http_client.time.sleep')
+    def test_connection_errors_are_retried_then_raised(self, mock_sleep):
+        session = MagicMock()
+        session.request.side_effect = requests.exceptions.ConnectTimeout("timed out")
+
+        with patch.object(http_client, 'get_session', return_value=session), override_settings(HTTP_CLIENT_MAX_RETRIES=1):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                http_client.get("https://api.soundcloud.com/resolve")
+
+        self.assertEqual(session.request.call_count, 2)
+
+    def test_default_timeouts(self):
+        session = MagicMock()
+        session.request.return_value = self.response(200)
+
+        with patch.object(http_client, 'get_session', return_value=session):
+            http_client.get("https://api.soundcloud.com/resolve", params={'url': 'x'})
+
+        self.assertEqual(session.request.call_args.kwargs['timeout'], (3.05, 10))
+
+    @patch('music_app_archive.src.integrations.http_client.time.sleep')
+    def test_deadline_caps_timeout_and_skips_retry(self, mock_sleep):
+        session = MagicMock()
+        session.request.return_value = self.response(503)
+
+        with patch.object(http_client, 'get_session', return_value=session), patch.object(http_client, 'backoff_seconds', return_value=5):
+            response = http_client.get("https://api.soundcloud.com/resolve", deadline=Deadline(1))
+
+        connect_timeout, read_timeout = session.request.call_args.kwargs['timeout']
+        self.assertLessEqual(connect_timeout, 1)
+        self.assertLessEqual(read_timeout, 1)
+        #A 5s backoff would outlast the 1s budget, so the 503 is returned straight away
+        self.assertEqual(response.status_code, 503)
+        session.request.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_expired_deadline_raises_before_sending(self):
+        session = MagicMock()
+
+        with patch.object(http_client, 'get_session', return_value=session):
+            with self.assertRaises(DeadlineExceededError):
+                http_client.get("https://api.soundcloud.com/resolve", deadline=Deadline(0))
+
+        session.request.assert_not_called()
+
+
+class DeadlineTest(TestCase):
+    '''
+    Test the metadata time budget in deadline.py
+    '''
+    def test_timeout_is_capped_by_remaining_time(self):
+        deadline = Deadline(2)
+
+        self.assertLessEqual(deadline.timeout(10), 2)
+        self.assertEqual(deadline.timeout(0.5), 0.5)
+        self.assertEqual(deadline_timeout(None, 10), 10)
+        self.assertFalse(deadline.expired())
+
+    def test_check_raises_once_spent(self):
+        deadline = Deadline(0)
+
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0)
+        with self.assertRaises(DeadlineExceededError):
+            deadline.check("the YouTube API call")
+
+
+class PlatformAdapterRegistryTest(TestCase):
+    '''
+    Test the platform adapter registry in adapters.py and the orchestrator's use of it
+    '''
+    def setUp(self):
+        cache.clear()
+        metadata_cache.clear_local()
+        reset_governors()
+
+    def test_builtin_adapters_and_capabilities(self):
+        youtube = get_adapter('youtube')
+
+        self.assertIs(get_adapter('youtube_music'), youtube)
+        self.assertTrue(youtube.supports_batch)
+        self.assertFalse(youtube.needs_browser)
+        self.assertTrue(get_adapter('bandcamp').needs_browser)
+        self.assertFalse(get_adapter('soundcloud').supports_batch)
+        with self.assertRaises(ValueError):
+            get_adapter('youtube.music')
+
+    def test_adapter_must_implement_fetch(self):
+        class NoFetchAdapter(PlatformAdapter):
+            platform = 'nofetch'
+
+        with self.assertRaises(TypeError):
+            NoFetchAdapter()
+
+    def test_new_platform_plugs_in_without_touching_the_orchestrator(self):
+        class MixcloudAdapter(PlatformAdapter):
+            platform = 'mixcloud'
+            display_name = 'Mixcloud'
+            domains = ('mixcloud.com',)
+
+            def fetch(self, streaming_url, track_type, deadline=None):
+                return {'track_name': 'Some Mix', 'artist': 'Someone', 'streaming_platform': 'mixcloud', 'streaming_link': streaming_url}
+
+        register_adapter(MixcloudAdapter())
+        self.addCleanup(unregister_adapter, 'mixcloud')
+
+        self.assertEqual(check_streaming_link_platform("https://www.mixcloud.com/someone/some-mix/"), 'mixcloud')
+        meta_data_dict = orchestrate_platform_api("https://www.mixcloud.com/someone/some-mix/", "mix")
+        self.assertEqual(meta_data_dict['track_name'], 'Some Mix')
+
+        #Model choices, form errors and the canonicaliser come from the registry too
+        self.assertIn(('mixcloud', 'Mixcloud'), StreamingLink._meta.get_field('streaming_platform').choices)
+        self.assertEqual(
+            canonicalise_streaming_link("https://www.mixcloud.com/Someone/Some-Mix/?utm_source=x").url,
+            "https://www.mixcloud.com/Someone/Some-Mix"
+        )
+        form = AddStreamingLink(data={'track_type': 'mix', 'streaming_link': 'https://open.spotify.com/track/1'})
+        self.assertFalse(form.is_valid())
+        self.assertIn("URL must be from YouTube, Bandcamp, SoundCloud or Mixcloud", form.errors['streaming_link'])
+
+        unregister_adapter('mixcloud')
+        self.assertNotIn(('mixcloud', 'Mixcloud'), StreamingLink._meta.get_field('streaming_platform').choices)
+
+    @patch('music_app_archive.src.integrations.main_integrations.orchestrate_soundcloud_meta_data_dictionary')
+    @patch('music_app_archive.src.integrations.main_integrations.get_youtube_metadata_batch')
+    def test_batch_groups_links_by_cheapest_path(self, mock_youtube_batch, mock_soundcloud):
+        mock_youtube_batch.return_value = {
+            'zYta6v1wZiI': {'track_name': 'How Are We', 'artist': 'Horse Vision'},
+            'V4tc_r4O_6k': YouTubeMetaDataError("No video found for id=V4tc_r4O_6k"),
+        }
+        mock_soundcloud.return_value = {'track_name': 'Future', 'artist': 'Nils Petter Molvær', 'streaming_platform': 'soundcloud'}
+        urls = [
+            "https://music.youtube.com/watch?v=zYta6v1wZiI",
+            "https://soundcloud.com/artist/future",
+            "https://youtu.be/V4tc_r4O_6k",
+            "https://open.spotify.com/track/1",
+        ]
+
+        results = orchestrate_platform_api_batch(urls, "track")
+
+        self.assertEqual(list(results), urls)
+        mock_youtube_batch.assert_called_once_with(['zYta6v1wZiI', 'V4tc_r4O_6k'], deadline=None)
+        self.assertEqual(results[urls[0]]['streaming_platform'], 'youtube_music')
+        self.assertEqual(results[urls[1]]['track_name'], 'Future')
+        self.assertIsInstance(results[urls[2]], YouTubeMetaDataError)
+        self.assertIsInstance(results[urls[3]], ValueError)
+
+        #The batched result and the platform error were both cached
+        results = orchestrate_platform_api_batch(urls[:1] + urls[2:3], "track")
+        mock_youtube_batch.assert_called_once()
+        self.assertEqual(results[urls[0]]['track_name'], 'How Are We')
+        self.assertIsInstance(results[urls[2]], YouTubeMetaDataError)
+
+    @override_settings(PLATFORM_GOVERNOR_DEFAULT=dict(
+        max_in_flight=2, rate=100, burst=100, failure_threshold=1, reset_timeout=30, quota_reset_timeout=600
+    ))
+    def test_platform_failure_in_a_batch_reaches_the_governor(self):
+        class FlakyBatchAdapter(PlatformAdapter):
+            platform = 'flakybatch'
+            domains = ('flakybatch.example',)
+            supports_batch = True
+            calls = []
+
+            def fetch(self, streaming_url, track_type, deadline=None):
+                raise NotImplementedError
+
+            def fetch_batch(self, streaming_urls, track_type, deadline=None):
+                self.calls.append((list(streaming_urls), deadline))
+                try:
+                    raise ValueError("Upstream error") from requests.exceptions.ConnectionError("reset")
+                except ValueError as e:
+                    return {streaming_url: e for streaming_url in streaming_urls}
+
+        adapter = register_adapter(FlakyBatchAdapter())
+        self.addCleanup(unregister_adapter, 'flakybatch')
+
+        results = orchestrate_platform_api_batch(["https://flakybatch.example/a"], "track", deadline_seconds=5)
+
+        #Per-link errors are kept, the failure reached the circuit breaker and the call had a deadline
+        self.assertIsInstance(results["https://flakybatch.example/a"], ValueError)
+        self.assertIsInstance(adapter.calls[0][1], Deadline)
+        self.assertTrue(get_governor('flakybatch').state()['circuit_open'])
+        results = orchestrate_platform_api_batch(["https://flakybatch.example/b"], "track")
+        self.assertIsInstance(results["https://flakybatch.example/b"], PlatformUnavailableError)
+        self.assertEqual(len(adapter.calls), 1)
+
@@ -1,11 +1,18 @@
 # tests/test_services.py
-from django.test import TestCase
+import json
+
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.http import Http404
 from django.contrib.auth import get_user_model
+from unittest.mock import patch
 
 
-from music_app_archive.src.services import get_playlist, get_playlist_tracks
-from music_app_archive.models import Playlist, Track, PlaylistTrack
+from music_app_archive.src.services import get_playlist, get_playlist_tracks, iter_playlist_track_records, stream_playlist_json, get_playlist_overview_page
+from music_app_archive.models import Playlist, Track, PlaylistTrack, StreamingLink
+from music_app_archive.src.collection_import import parse_collection_url, import_collection_into_playlist
+from music_app_archive.src.custom_exceptions import YouTubeMetaDataError
+from music_app_archive.src.playlist_cache import PlaylistFragmentCache
 
 User = get_user_model()
 
@@ -42,7 +49,7 @@ class TestPlaylistServices(TestCase):
         Test empty playlist returns empty list'
         '''
         tracks = get_playlist_tracks(self.playlist)
-        self.assertIsNone(tracks)
+        self.assertEqual(tracks, [])
     
     def test_get_playlist_tracks_with_data(self):
         '''
@@ -63,3 +70,276 @@ class TestPlaylistServices(TestCase):
         self.assertEqual(len(tracks), 1)
         self.assertEqual(tracks[0]['track_name'], 'Test Song')
         self.assertEqual(tracks[0]['artist'], 'Test Artist')
+
+    def test_get_playlist_tracks_reads_every_row_in_two_queries(self):
+        '''
+        Test every track is returned in position order with its links grouped, using two queries
+        '''
+        first = Track.objects.create(track_name='How Are We', artist='Horse Vision', album_name='Another Life')
+        second = Track.objects.create(track_name='Future', artist='Nils Petter Molvær')
+        removed = Track.objects.create(track_name='Removed', artist='Nobody')
+        StreamingLink.objects.create(track=first, streaming_platform='bandcamp', streaming_link='https://horsevision.bandcamp.com/track/how-are-we')
+        StreamingLink.objects.create(track=first, streaming_platform='youtube', streaming_link='https://www.youtube.com/watch?v=zYta6v1wZiI')
+        PlaylistTrack.objects.create(playlist=self.playlist, track=second, added_by=self.user)
+        PlaylistTrack.objects.create(playlist=self.playlist, track=first)
+        PlaylistTrack.objects.create(playlist=self.playlist, track=removed, is_deleted=True)
+
+        with self.assertNumQueries(2):
+            tracks = get_playlist_tracks(self.playlist)
+
+        self.assertEqual([track.track_name for track in tracks], ['Future', 'How Are We'])
+        self.assertEqual((tracks[0].added_by, tracks[0].album_name, tracks[0].link), ('testuser', '-', '#'))
+        self.assertEqual(tracks[1].added_by, 'Unknown')
+        self.assertEqual([link.platform for link in tracks[1].streaming_links], ['Bandcamp', 'YouTube'])
+        self.assertEqual(tracks[1]['streaming_platform'], 'Bandcamp')
+
+    def test_iter_playlist_track_records_reads_in_chunks(self):
+        '''
+        Test the export reads the rows through one cursor plus one link query per chunk
+        '''
+        tracks = [Track.objects.create(track_name=f'Track {i}', artist='Artist') for i in range(5)]
+        StreamingLink.objects.create(track=tracks[3], streaming_platform='youtube', streaming_link='https://www.youtube.com/watch?v=zYta6v1wZiI')
+        for track in tracks:
+            PlaylistTrack.objects.create(playlist=self.playlist, track=track, added_by=self.user)
+
+        #Rows (1) + links for chunks of 2, 2 and 1 (3)
+        with self.assertNumQueries(4):
+            chunks = list(iter_playlist_track_records(self.playlist, chunk_size=2))
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        records = [record for chunk in chunks for record in chunk]
+        self.assertEqual([record['track_name'] for record in records], [f'Track {i}' for i in range(5)])
+        self.assertEqual(records[0]['album_name'], '')
+        self.assertEqual(records[0]['added_by'], 'testuser')
+        self.assertEqual(records[3]['streaming_links'], [{'platform': 'youtube', 'url': 'https://www.youtube.com/watch?v=zYta6v1wZiI'}])
+
+    def test_stream_playlist_json_is_one_document(self):
+        '''
+        Test the chunked JSON parses as a single document, also for an empty playlist
+        '''
+        self.assertEqual(json.loads(''.join(stream_playlist_json(self.playlist)))['tracks'], [])
+
+        for i in range(3):
+            PlaylistTrack.objects.create(playlist=self.playlist, track=Track.objects.create(track_name=f'Track {i}', artist='Artist'))
+        document = json.loads(''.join(stream_playlist_json(self.playlist, chunk_size=2)))
+        self.assertEqual(document['playlist']['playlist_name'], 'Test Playlist')
+        self.assertEqual([record['track_name'] for record in document['tracks']], ['Track 0', 'Track 1', 'Track 2'])
+
+
+class TestPlaylistOverview(TestCase):
+    def test_overview_page_takes_two_queries(self):
+        '''
+        Test a page of the overview costs the count query and one annotated query, whatever the number of playlists and tracks
+        '''
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='Th1$Pa$$w0rd')
+        other_user = User.objects.create_user(username='otheruser', email='other@example.com', password='Th1$Pa$$w0rd')
+        Playlist.objects.create(playlist_name='Not mine', owner=other_user)
+        for i in range(12):
+            playlist = Playlist.objects.create(playlist_name=f'Playlist {i}', owner=user)
+            for j in range(i % 3):
+                track = Track.objects.create(track_name=f'Track {i}-{j}', artist='Artist')
+                StreamingLink.objects.create(track=track, streaming_platform='soundcloud', streaming_link=f'https://soundcloud.com/artist/track-{i}-{j}')
+                PlaylistTrack.objects.create(playlist=playlist, track=track)
+
+        with self.assertNumQueries(2):
+            page = get_playlist_overview_page(user, 1, per_page=5)
+            rows = [(playlist.playlist_name, playlist.track_count, playlist.platform_mix, playlist.owner.username) for playlist in page]
+
+        self.assertEqual(page.paginator.count, 12)
+        self.assertEqual(rows[0], ('Playlist 11', 2, [('SoundCloud', 2)], 'testuser'))
+        self.assertEqual(rows[1], ('Playlist 10', 1, [('SoundCloud', 1)], 'testuser'))
+        self.assertEqual(rows[2], ('Playlist 9', 0, [], 'testuser'))
+
+
+class TestPlaylistFragmentCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fragment_cache = PlaylistFragmentCache(timeout=60)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return f"<tr>{self.builds}</tr>"
+
+    def test_bump_invalidates_only_that_playlist(self):
+        '''
+        Test a bump makes the playlist rebuild its fragments while other playlists keep theirs
+        '''
+        self.assertEqual(self.fragment_cache.get_or_set(1, 'rows', self.build), ('<tr>1</tr>', False))
+        self.assertEqual(self.fragment_cache.get_or_set(1, 'rows', self.build), ('<tr>1</tr>', True))
+        self.fragment_cache.get_or_set(2, 'rows', self.build)
+
+        self.fragment_cache.bump([1])
+
+        self.assertEqual(self.fragment_cache.get_or_set(1, 'rows', self.build), ('<tr>3</tr>', False))
+        self.assertEqual(self.fragment_cache.get_or_set(2, 'rows', self.build), ('<tr>2</tr>', True))
+        self.assertEqual(self.fragment_cache.stats(), {'hits': 2, 'misses': 3, 'bumps': 1, 'hit_rate': 0.4})
+
+    def test_evicted_version_does_not_reuse_old_fragments(self):
+        '''
+        Test a version that disappeared from the cache restarts at a new number
+        '''
+        self.fragment_cache.get_or_set(1, 'rows', self.build)
+        old_version = self.fragment_cache.get_version(1)
+        cache.delete(self.fragment_cache.version_key(1))
+
+        self.fragment_cache.bump([1])
+
+        self.assertNotEqual(self.fragment_cache.get_version(1), old_version)
+        self.assertEqual(self.fragment_cache.get_or_set(1, 'rows', self.build), ('<tr>2</tr>', False))
+
+    def test_zero_timeout_disables_cache(self):
+        fragment_cache = PlaylistFragmentCache(timeout=0)
+        fragment_cache.get_or_set(1, 'rows', self.build)
+        self.assertEqual(fragment_cache.get_or_set(1, 'rows', self.build), ('<tr>2</tr>', False))
+
+    def test_bump_repeats_on_commit(self):
+        '''
+        Test a bump inside a transaction happens again once it commits
+        '''
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.fragment_cache.bump([1])
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.fragment_cache.stats()['bumps'], 2)
+
+
+class TestCollectionImport(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='Th1$Pa$$w0rd'
+        )
+        self.playlist = Playlist.objects.create(
+            playlist_name='Test Playlist',
+            owner=self.user
+        )
+        self.existing_track = Track.objects.create(track_name='Another Life', artist='Horse Vision', created_by=self.user)
+        StreamingLink.objects.create(
+            track=self.existing_track,
+            streaming_platform='youtube',
+            streaming_link='https://www.youtube.com/watch?v=V4tc_r4O_6k'
+        )
+        PlaylistTrack.objects.create(playlist=self.playlist, track=self.existing_track, added_by=self.user)
+
+        self.collection_link = parse_collection_url('https://www.youtube.com/playlist?list=PL1234')
+        self.items = {
+            'https://www.youtube.com/watch?v=zYta6v1wZiI': {
+                'track_name': 'If I Had A Gun…',
+                'artist': 'Noel Gallagher',
+                'streaming_platform': 'youtube',
+            },
+            'https://www.youtube.com/watch?v=V4tc_r4O_6k': {
+                'track_name': 'Another Life',
+                'artist': 'Horse Vision',
+                'streaming_platform': 'youtube',
+            },
+            'https://www.youtube.com/watch?v=xvmaOOKTiKE': YouTubeMetaDataError("No video found for id=xvmaOOKTiKE"),
+            'https://www.youtube.com/watch?v=aaaaaaaaaaa': {
+                'track_name': 'Future',
+                'artist': 'Nils Petter Molvær',
+                'streaming_platform': 'youtube',
+            },
+        }
+
+    def test_parse_collection_url(self):
+        '''
+        Test playlist/set/album URLs are recognised and single tracks are not
+        '''
+        self.assertEqual(self.collection_link.collection_id, 'PL1234')
+        self.assertEqual(parse_collection_url('https://soundcloud.com/artist/sets/summer?si=x').platform, 'soundcloud')
+        self.assertEqual(parse_collection_url('https://horsevision.bandcamp.com/album/another-life').platform, 'bandcamp')
+        self.assertIsNone(parse_collection_url('https://horsevision.bandcamp.com/track/how-are-we'))
+        self.assertIsNone(parse_collection_url('https://www.youtube.com/watch?v=zYta6v1wZiI'))
+        self.assertEqual(parse_collection_url('youtube.com/playlist?list=PL1234').collection_id, 'PL1234')
+
+    @patch('music_app_archive.src.collection_import.expand_collection')
+    def test_import_bulk_creates_rows_with_contiguous_positions(self, mock_expand):
+        '''
+        Test new tracks are created, known links are re-used and failures are reported per item
+        '''
+        mock_expand.return_value = self.items
+        progress = []
+
+        with self.assertNumQueries(10):
+            summary = import_collection_into_playlist(
+                self.playlist, self.user, self.collection_link, 'track',
+                progress=lambda stage, done, total: progress.append(stage)
+            )
+
+        self.assertEqual(summary['total'], 4)
+        self.assertEqual(summary['added'], 2)
+        self.assertEqual(summary['tracks_created'], 2)
+        self.assertEqual(summary['skipped'], 1)
+        self.assertEqual(len(summary['failed']), 1)
+        self.assertIn('xvmaOOKTiKE', summary['failed'][0]['streaming_link'])
+        self.assertEqual(progress, ['expanding', 'matching', 'saving'])
+
+        positions = list(
+            PlaylistTrack.objects.filter(playlist=self.playlist).order_by('position')
+            .values_list('track__track_name', 'position')
+        )
+        self.assertEqual(positions, [('Another Life', 1), ('If I Had A Gun…', 2), ('Future', 3)])
+        self.assertEqual(
+            StreamingLink.objects.get(streaming_link='https://www.youtube.com/watch?v=aaaaaaaaaaa').track.created_by,
+            self.user
+        )
+
+    @patch('music_app_archive.src.collection_import.expand_collection')
+    def test_import_restores_tracks_removed_from_the_playlist(self, mock_expand):
+        '''
+        Test a track removed from the playlist is brought back at the end instead of skipped
+        '''
+        mock_expand.return_value = self.items
+        PlaylistTrack.objects.filter(playlist=self.playlist, track=self.existing_track).update(is_deleted=True)
+
+        summary = import_collection_into_playlist(self.playlist, self.user, self.collection_link, 'track')
+
+        self.assertEqual(summary['added'], 3)
+        self.assertEqual(summary['restored'], 1)
+        self.assertEqual(summary['skipped'], 0)
+        positions = list(
+            PlaylistTrack.objects.filter(playlist=self.playlist, is_deleted=False).order_by('position')
+            .values_list('track__track_name', 'position')
+        )
+        self.assertEqual(positions, [('If I Had A Gun…', 2), ('Another Life', 3), ('Future', 4)])
+        self.assertEqual(PlaylistTrack.objects.filter(playlist=self.playlist, track=self.existing_track).count(), 1)
+
+    @patch('music_app_archive.src.collection_import.expand_collection')
+    def test_import_matches_links_stored_before_canonicalisation(self, mock_expand):
+        '''
+        Test a legacy youtu.be row is re-used for its canonical link instead of getting a duplicate Track
+        '''
+        legacy_track = Track.objects.create(track_name='Future', artist='Nils Petter Molvær', created_by=self.user)
+        StreamingLink.objects.create(track=legacy_track, streaming_platform='youtube', streaming_link='https://youtu.be/aaaaaaaaaaa')
+        mock_expand.return_value = self.items
+
+        summary = import_collection_into_playlist(self.playlist, self.user, self.collection_link, 'track')
+
+        self.assertEqual(summary['tracks_created'], 1)
+        self.assertEqual(summary['tracks_reused'], 2)
+        self.assertTrue(PlaylistTrack.objects.filter(playlist=self.playlist, track=legacy_track).exists())
+        self.assertFalse(StreamingLink.objects.filter(streaming_link='https://www.youtube.com/watch?v=aaaaaaaaaaa').exists())
+        self.assertEqual(Track.objects.filter(track_name='Future').count(), 1)
+
+    @patch('music_app_archive.src.collection_import.find_existing_track_ids')
+    @patch('music_app_archive.src.collection_import.expand_collection')
+    def test_link_stored_by_a_concurrent_import_is_reused(self, mock_expand, mock_find):
+        '''
+        Test a link stored after the lookup (another import) re-uses that Track instead of raising an IntegrityError
+        '''
+        other_track = Track.objects.create(track_name='Future', artist='Nils Petter Molvær', created_by=self.user)
+        StreamingLink.objects.create(
+            track=other_track, streaming_platform='youtube', streaming_link='https://www.youtube.com/watch?v=aaaaaaaaaaa'
+        )
+        mock_expand.return_value = self.items
+        #The lookup ran before the other import committed
+        mock_find.return_value = {'https://www.youtube.com/watch?v=V4tc_r4O_6k': self.existing_track.pk}
+
+        summary = import_collection_into_playlist(self.playlist, self.user, self.collection_link, 'track')
+
+        self.assertEqual(summary['added'], 2)
+        self.assertEqual(summary['tracks_created'], 1)
+        self.assertTrue(PlaylistTrack.objects.filter(playlist=self.playlist, track=other_track).exists())
+        self.assertEqual(Track.objects.filter(track_name='Future').count(), 1)
+
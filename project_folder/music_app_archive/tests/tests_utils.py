@@ -3,7 +3,15 @@ from music_app_archive.src.utils import (
     orch_validate_input_string,
     get_hostname,
     check_streaming_link_platform,
-    map_playlist_type_track_type
+    map_playlist_type_track_type,
+    cache_lock,
+    canonicalise_streaming_link,
+    classify_streaming_links,
+    platform_for_hostname,
+    REJECT_EMPTY,
+    REJECT_UNSUPPORTED_PLATFORM,
+    REJECT_UNRECOGNISED_LINK,
+    REJECT_MALFORMED
 )
 
 class TestUtils(TestCase):
@@ -51,6 +59,14 @@ class TestUtils(TestCase):
         platform = check_streaming_link_platform('https://artist.bandcamp.com/track/song')
         self.assertEqual(platform, 'bandcamp')
     
+    def test_check_platform_without_scheme(self):
+        '''
+        Test links pasted without a scheme are recognised, as classify_streaming_links() recognises them
+        '''
+        for link in ('youtu.be/zYta6v1wZiI', ' soundcloud.com/artist/future ', 'artist.bandcamp.com/track/song'):
+            self.assertEqual(check_streaming_link_platform(link), classify_streaming_links([link])[0].platform, link)
+        self.assertEqual(check_streaming_link_platform('youtu.be/zYta6v1wZiI'), 'youtube')
+
     def test_check_platform_unsupported(self):
         '''
         Test unsupported platform returns None
@@ -80,4 +96,134 @@ class TestUtils(TestCase):
         '''
         playlist_type = "playlists"
         with self.assertRaises(ValueError):
-            map_playlist_type_track_type(playlist_type)
\ No newline at end of file
+            map_playlist_type_track_type(playlist_type)
+
+    def test_cache_lock_is_exclusive(self):
+        '''
+        Test a second holder cannot take the cache lock until it is released
+        '''
+        with cache_lock('test:lock') as first:
+            with cache_lock('test:lock', wait=0.1) as second:
+                self.assertTrue(first)
+                self.assertFalse(second)
+
+        with cache_lock('test:lock', wait=0) as third:
+            self.assertTrue(third)
+
+
+class TestCanonicaliseStreamingLink(TestCase):
+    def test_youtube_variants_share_canonical_url(self):
+        '''
+        Test watch/short/mobile/shorts YouTube URLs canonicalise to the same watch URL
+        '''
+        variants = [
+            'https://www.youtube.com/watch?v=zYta6v1wZiI&list=LL&index=1&t=42',
+            'https://youtu.be/zYta6v1wZiI?si=abc123',
+            'https://m.youtube.com/watch?v=zYta6v1wZiI',
+            'https://www.youtube.com/shorts/zYta6v1wZiI',
+            'youtube.com/watch?v=zYta6v1wZiI',
+        ]
+        for url in variants:
+            canonical_link = canonicalise_streaming_link(url)
+            self.assertEqual(canonical_link.url, 'https://www.youtube.com/watch?v=zYta6v1wZiI', url)
+            self.assertEqual(canonical_link.platform, 'youtube')
+            self.assertEqual(canonical_link.platform_id, 'zYta6v1wZiI')
+
+    def test_youtube_music_stays_distinct(self):
+        '''
+        Test music.youtube.com keeps its own host and platform
+        '''
+        canonical_link = canonicalise_streaming_link('https://music.youtube.com/watch?v=zYta6v1wZiI&si=x')
+        self.assertEqual(canonical_link.url, 'https://music.youtube.com/watch?v=zYta6v1wZiI')
+        self.assertEqual(canonical_link.platform, 'youtube_music')
+
+    def test_soundcloud_tracking_params_removed(self):
+        '''
+        Test SoundCloud ?si= parameters, fragments, host case and trailing slashes are dropped
+        '''
+        canonical_link = canonicalise_streaming_link('https://m.SoundCloud.com/artist/track-name/?si=abc&utm_source=x#t=1')
+        self.assertEqual(canonical_link.url, 'https://soundcloud.com/artist/track-name')
+        self.assertEqual(canonical_link.platform, 'soundcloud')
+        self.assertEqual(canonical_link.platform_id, 'artist/track-name')
+
+    def test_soundcloud_secret_link_keeps_case(self):
+        '''
+        Test the case-sensitive secret token of a private SoundCloud track is kept
+        '''
+        canonical_link = canonicalise_streaming_link('https://soundcloud.com/artist/track/s-AbCdEfGhIjK?si=x')
+        self.assertEqual(canonical_link.url, 'https://soundcloud.com/artist/track/s-AbCdEfGhIjK')
+        self.assertEqual(canonical_link.platform_id, 'artist/track/s-AbCdEfGhIjK')
+
+    def test_soundcloud_short_link_keeps_case(self):
+        '''
+        Test on.soundcloud.com short links keep their case-sensitive code
+        '''
+        canonical_link = canonicalise_streaming_link('https://on.soundcloud.com/Ab3XyZ')
+        self.assertEqual(canonical_link.url, 'https://on.soundcloud.com/Ab3XyZ')
+        self.assertEqual(canonical_link.platform, 'soundcloud')
+
+    def test_bandcamp_permalink(self):
+        '''
+        Test the Bandcamp id includes the artist subdomain
+        '''
+        canonical_link = canonicalise_streaming_link('https://horsevision.bandcamp.com/album/another-life?from=search')
+        self.assertEqual(canonical_link.url, 'https://horsevision.bandcamp.com/album/another-life')
+        self.assertEqual(canonical_link.platform_id, 'horsevision/album/another-life')
+
+    def test_unsupported_or_unidentifiable_links(self):
+        '''
+        Test unsupported platforms and links without a video id return None
+        '''
+        self.assertIsNone(canonicalise_streaming_link('https://maps.google.com/'))
+        self.assertIsNone(canonicalise_streaming_link('https://www.youtube.com/'))
+        self.assertIsNone(canonicalise_streaming_link(None))
+
+
+class TestClassifyStreamingLinks(TestCase):
+    def test_bulk_classification_in_order(self):
+        '''
+        Test each link gets its platform, canonical form and id, or a rejection reason
+        '''
+        results = classify_streaming_links([
+            'https://youtu.be/zYta6v1wZiI?si=abc123',
+            'https://horsevision.bandcamp.com/track/how-are-we?from=search',
+            'https://maps.google.com/',
+            'https://www.youtube.com/',
+            '',
+            'https://youtu.be/zYta6v1wZiI?si=abc123',
+        ])
+
+        self.assertEqual(results[0].canonical_url, 'https://www.youtube.com/watch?v=zYta6v1wZiI')
+        self.assertEqual(results[0].platform_id, 'zYta6v1wZiI')
+        self.assertIsNone(results[0].rejection_reason)
+        self.assertEqual(results[1].platform, 'bandcamp')
+        self.assertEqual(results[1].platform_id, 'horsevision/track/how-are-we')
+        self.assertEqual(results[2].rejection_reason, REJECT_UNSUPPORTED_PLATFORM)
+        self.assertEqual((results[3].platform, results[3].rejection_reason), ('youtube', REJECT_UNRECOGNISED_LINK))
+        self.assertEqual(results[4].rejection_reason, REJECT_EMPTY)
+        self.assertEqual(results[5], results[0])
+
+    def test_matches_per_link_functions(self):
+        '''
+        Test the bulk path agrees with check_streaming_link_platform() and canonicalise_streaming_link()
+        '''
+        urls = [
+            'https://music.youtube.com/watch?v=zYta6v1wZiI',
+            'https://m.SoundCloud.com/Artist/Track-Name/?si=abc',
+            'https://notyoutube.com/watch?v=zYta6v1wZiI',
+            'https://www.youtube.com/playlist?list=PL1234',
+            'http://[::1',
+        ]
+        for url, classification in zip(urls, classify_streaming_links(urls)):
+            canonical_link = canonicalise_streaming_link(url)
+            self.assertEqual(classification.canonical_url, canonical_link.url if canonical_link else None, url)
+            if classification.platform:
+                self.assertEqual(check_streaming_link_platform(url), 'youtube' if 'youtube' in classification.platform else classification.platform)
+        self.assertEqual(classify_streaming_links(['http://[::1'])[0].rejection_reason, REJECT_MALFORMED)
+
+    def test_platform_for_hostname_walks_parent_domains(self):
+        self.assertEqual(platform_for_hostname('horsevision.bandcamp.com'), 'bandcamp')
+        self.assertEqual(platform_for_hostname('music.youtube.com'), 'youtube')
+        self.assertIsNone(platform_for_hostname('bandcamp.com.evil.org'))
+        self.assertIsNone(platform_for_hostname('notsoundcloud.com'))
+
@@ -1,11 +1,15 @@
 import json
+from unittest.mock import patch, MagicMock
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
 
 from ..models import *
+from ..src.custom_exceptions import BandCampMetaDataError, PlatformUnavailableError, DeadlineExceededError
+from ..src import metadata_jobs
 
 User = get_user_model()
 
@@ -167,6 +171,51 @@ class CreatePlaylistTest(BaseTestCase):
         self.assertRedirects(response, expected_url)
 
 
+class UserPlaylistsOverviewTest(BaseTestCase):
+    '''
+    view we're testing:
+        - user_playlists(request, username)
+    '''
+    def test_overview_counts_platforms_and_last_activity(self):
+        '''
+        Test each playlist shows its live track count, platform mix and last added date
+        '''
+        StreamingLink.objects.create(track=self.simple_track_1, streaming_platform='bandcamp', streaming_link=self.simple_track_1.purchase_link)
+        PlaylistTrack.objects.filter(pk=self.playlist_track_2.pk).update(is_deleted=True)
+
+        self.client.login(email="test1@user.com", password="Meep!234")
+        response = self.client.get(reverse("user_playlists", args=[self.user_1.username]))
+
+        playlists = {playlist.playlist_name: playlist for playlist in response.context['user_playlists']}
+        test_playlist = playlists[self.test_playlist.playlist_name]
+        self.assertEqual(test_playlist.track_count, 2)
+        self.assertEqual(test_playlist.platform_mix, [('YouTube', 1), ('Bandcamp', 1)])
+        self.assertEqual(test_playlist.last_added_at, self.playlist_track_3.added_at)
+
+        wip_playlist = playlists[self.wip_playlist.playlist_name]
+        self.assertEqual((wip_playlist.track_count, wip_playlist.platform_mix, wip_playlist.last_added_at), (0, [], None))
+        self.assertContains(response, 'YouTube (1)')
+        self.assertContains(response, 'Bandcamp (1)')
+
+    @override_settings(PLAYLIST_OVERVIEW_PAGE_SIZE=2)
+    def test_overview_is_paginated(self):
+        Playlist.objects.create(playlist_name='Newest', owner=self.user_1)
+        Playlist.objects.create(playlist_name='Deleted', owner=self.user_1, is_deleted=True)
+
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("user_playlists", args=[self.user_1.username])
+
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual([playlist.playlist_name for playlist in first_page], ['Newest', self.wip_playlist.playlist_name])
+        self.assertEqual(first_page.paginator.num_pages, 2)
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual([playlist.playlist_name for playlist in response.context['page_obj']], [self.test_playlist.playlist_name])
+        self.assertContains(response, 'Page 2 of 2')
+        #Out of range falls back to the last page
+        self.assertEqual(self.client.get(url, {'page': 9}).context['page_obj'].number, 2)
+
+
 class AddTrackToPlaylistTest(BaseTestCase):
     '''
     Track is successfully added + correct redirection.
@@ -199,6 +248,7 @@ class ViewTracksInPlaylist(BaseTestCase):
     '''
     def setUp(self):
         super().setUp()
+        cache.clear()
 
         self.simple_streaming_link_1 = StreamingLink.objects.create(
             track = self.simple_track_1,
@@ -244,6 +294,123 @@ class ViewTracksInPlaylist(BaseTestCase):
         list_of_playlist_tracks = context['list_of_playlist_tracks']
         self.assertEqual(len(list_of_playlist_tracks), 0)
 
+    @override_settings(PLAYLIST_PAGE_SIZE=2)
+    def test_view_playlist_keyset_pages(self):
+        '''
+        Test the page shows PLAYLIST_PAGE_SIZE rows and the JSON endpoint serves the rest after the cursor,
+        even when rows of the first page were removed in between
+        '''
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("view_edit_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+        response = self.client.get(url)
+        first_page = response.context['list_of_playlist_tracks']
+        self.assertEqual(len(first_page), 2)
+        self.assertEqual(response.context['next_cursor'], first_page[-1].position)
+        self.assertContains(response, f'data-next-cursor="{first_page[-1].position}"')
+
+        #Removing rows already shown doesn't move the cursor
+        PlaylistTrack.objects.filter(pk=first_page[0].id).update(is_deleted=True)
+
+        fragment_url = reverse("playlist_tracks_fragment", args=[self.user_1.username, self.test_playlist.playlist_name])
+        data = self.client.get(fragment_url, {'after': response.context['next_cursor']}).json()
+        self.assertEqual(data['count'], 1)
+        self.assertIsNone(data['next_cursor'])
+        self.assertIn('data-playlist-track-id', data['rows_html'])
+        self.assertNotIn(first_page[1].track_name, data['rows_html'])
+
+    def test_playlist_tracks_fragment_rejects_bad_requests(self):
+        fragment_url = reverse("playlist_tracks_fragment", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+        self.client.force_login(self.bad_user)
+        self.assertEqual(self.client.get(fragment_url).status_code, 403)
+
+        self.client.login(email="test1@user.com", password="Meep!234")
+        self.assertEqual(self.client.get(fragment_url, {'after': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(fragment_url, {'page_size': '0'}).status_code, 400)
+
+    def test_view_playlist_rows_cached_until_playlist_changes(self):
+        '''
+        Test the rendered rows are served from the fragment cache and every kind of write to the
+        playlist (model saves and the bulk delete views) shows up on the next request
+        '''
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("view_edit_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        fragment_url = reverse("playlist_tracks_fragment", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+        self.assertEqual(self.client.get(url)['X-Playlist-Cache'], 'miss')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Playlist-Cache'], 'hit')
+        self.assertEqual(len(response.context['list_of_playlist_tracks']), 3)
+        #The infinite-scroll endpoint shares the cached first page
+        self.assertEqual(self.client.get(fragment_url)['X-Playlist-Cache'], 'hit')
+
+        #Track save
+        self.simple_track_1.track_name = 'Another Life (Remastered)'
+        self.simple_track_1.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Playlist-Cache'], 'miss')
+        self.assertContains(response, 'Another Life (Remastered)')
+
+        #StreamingLink save
+        StreamingLink.objects.create(track=self.simple_track_1, streaming_platform='youtube', streaming_link='https://www.youtube.com/watch?v=zYta6v1wZiI')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Playlist-Cache'], 'miss')
+        self.assertContains(response, 'https://www.youtube.com/watch?v=zYta6v1wZiI')
+
+        #Bulk soft delete through delete_playlist_tracks
+        playlist_track = PlaylistTrack.objects.get(playlist=self.test_playlist, track=self.simple_track_1)
+        self.client.delete(
+            reverse("delete_playlist_tracks", args=[self.user_1.username, self.test_playlist.playlist_name]),
+            data=json.dumps({'playlist_track_id': [playlist_track.id]}),
+            content_type='application/json'
+        )
+        response = self.client.get(url)
+        self.assertEqual(response['X-Playlist-Cache'], 'miss')
+        self.assertNotContains(response, 'Another Life (Remastered)')
+
+    def test_delete_playlists_bumps_playlist_version(self):
+        from ..src.playlist_cache import playlist_fragment_cache
+
+        self.client.login(email="test1@user.com", password="Meep!234")
+        version = playlist_fragment_cache.get_version(self.test_playlist.id)
+        self.client.delete(
+            reverse("delete_playlists", args=[self.user_1.username]),
+            data=json.dumps({'playlist_id': [self.test_playlist.id]}),
+            content_type='application/json'
+        )
+        self.assertGreater(playlist_fragment_cache.get_version(self.test_playlist.id), version)
+
+    def test_export_playlist_tracks_streams_ndjson(self):
+        '''
+        Test the export streams one JSON object per track, in position order
+        '''
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("export_playlist_tracks", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual(records[0]['track_name'], 'Another Life')
+        self.assertEqual(records[0]['streaming_links'], [{'platform': 'bandcamp', 'url': self.simple_track_1.purchase_link}])
+
+        response = self.client.get(url, {'format': 'json'})
+        document = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(document['playlist']['playlist_name'], self.test_playlist.playlist_name)
+        self.assertEqual([record['position'] for record in document['tracks']], [record['position'] for record in records])
+
+    def test_export_playlist_tracks_rejects_bad_requests(self):
+        url = reverse("export_playlist_tracks", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+        self.client.force_login(self.bad_user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(email="test1@user.com", password="Meep!234")
+        self.assertEqual(self.client.get(url, {'format': 'csv'}).status_code, 400)
+
 
 class AddLinkToTrackTest(BaseTestCase):
     '''
@@ -321,6 +488,255 @@ class AddLinkToTrackTest(BaseTestCase):
         self.assertEqual(meta_data_dictionary['track_name'], self.simple_track_2.track_name)
         self.assertEqual(meta_data_dictionary['streaming_platform'], self.simple_streaming_link_2.streaming_platform)
 
+    def test_platform_unavailable_falls_back_to_manual_entry(self):
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        streaming_link = 'https://www.youtube.com/watch?v=zYta6v1wZiI'
+
+        with patch('music_app_archive.views.orchestrate_platform_api', side_effect=PlatformUnavailableError("youtube is temporarily unavailable (circuit open)", 'youtube', 30)):
+            response = self.client.post(url, {'track_type': 'track', 'streaming_link': streaming_link})
+
+        self.assertRedirects(response, reverse("add_track_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name]), fetch_redirect_response=False)
+        meta_data_dictionary = self.client.session['meta_data_dict']
+        self.assertEqual(meta_data_dictionary['streaming_platform'], 'unknown')
+        self.assertEqual(meta_data_dictionary['streaming_link'], streaming_link)
+
+    def test_deadline_exceeded_keeps_partial_metadata(self):
+        self.client.login(email="test1@user.com", password="Meep!234")
+        url = reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        streaming_link = 'https://horsevision.bandcamp.com/track/how-are-we'
+        error = DeadlineExceededError(
+            "Ran out of time rendering the page",
+            partial_meta_data_dict={'track_name': 'How Are We', 'artist': 'Horse Vision', 'streaming_platform': 'bandcamp'}
+        )
+
+        with patch('music_app_archive.views.orchestrate_platform_api', side_effect=error) as mock_orchestrate:
+            response = self.client.post(url, {'track_type': 'track', 'streaming_link': streaming_link})
+
+        self.assertRedirects(response, reverse("add_track_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name]), fetch_redirect_response=False)
+        self.assertIsNotNone(mock_orchestrate.call_args.kwargs['deadline'])
+        meta_data_dictionary = self.client.session['meta_data_dict']
+        self.assertEqual(meta_data_dictionary['track_name'], 'How Are We')
+        self.assertEqual(meta_data_dictionary['artist'], 'Horse Vision')
+        self.assertEqual(meta_data_dictionary['streaming_platform'], 'bandcamp')
+        self.assertEqual(meta_data_dictionary['album_name'], '')
+
+
+    def test_archived_link_skips_platform_call(self):
+        self.client.login(email="test1@user.com", password="Meep!234")
+        add_link_url = reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.wip_playlist.playlist_name])
+        add_track_url = reverse("add_track_to_playlist", args=[self.user_1.username, self.wip_playlist.playlist_name])
+        track_count = Track.objects.count()
+        link_count = StreamingLink.objects.count()
+
+        with patch('music_app_archive.views.orchestrate_platform_api') as mock_orchestrate:
+            response = self.client.post(add_link_url, {'track_type': 'track', 'streaming_link': self.simple_streaming_link_2.streaming_link})
+
+        mock_orchestrate.assert_not_called()
+        self.assertRedirects(response, add_track_url, fetch_redirect_response=False)
+        self.assertEqual(self.client.session['meta_data_dict']['existing_track_id'], self.simple_track_2.id)
+
+        response = self.client.get(add_track_url)
+        self.assertTemplateUsed(response, 'add_existing_track.html')
+        self.assertFalse(response.context['already_in_playlist'])
+
+        #Confirming adds the archived Track with a single PlaylistTrack row
+        response = self.client.post(add_track_url)
+        self.assertRedirects(response, reverse("view_edit_playlist", args=[self.user_1.username, self.wip_playlist.playlist_name]), fetch_redirect_response=False)
+        self.assertTrue(PlaylistTrack.objects.filter(playlist=self.wip_playlist, track=self.simple_track_2).exists())
+        self.assertEqual(Track.objects.count(), track_count)
+        self.assertEqual(StreamingLink.objects.count(), link_count)
+        self.assertNotIn('meta_data_dict', self.client.session)
+
+    def test_archived_link_already_in_playlist(self):
+        self.client.login(email="test1@user.com", password="Meep!234")
+        add_track_url = reverse("add_track_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        self.client.post(
+            reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name]),
+            {'track_type': 'track', 'streaming_link': self.simple_streaming_link_3.streaming_link}
+        )
+
+        response = self.client.get(add_track_url)
+        self.assertTrue(response.context['already_in_playlist'])
+
+        playlist_track_count = PlaylistTrack.objects.filter(playlist=self.test_playlist).count()
+        self.client.post(add_track_url)
+        self.assertEqual(PlaylistTrack.objects.filter(playlist=self.test_playlist).count(), playlist_track_count)
+
+    def test_archived_link_removed_from_playlist_is_added_back(self):
+        self.client.login(email="test1@user.com", password="Meep!234")
+        add_track_url = reverse("add_track_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        playlist_track = PlaylistTrack.objects.get(playlist=self.test_playlist, track=self.simple_track_3)
+        PlaylistTrack.objects.filter(pk=playlist_track.pk).update(is_deleted=True)
+        self.client.post(
+            reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name]),
+            {'track_type': 'track', 'streaming_link': self.simple_streaming_link_3.streaming_link}
+        )
+
+        response = self.client.get(add_track_url)
+        self.assertFalse(response.context['already_in_playlist'])
+
+        #The removed row comes back at the end of the playlist rather than a duplicate insert
+        max_position = max(PlaylistTrack.objects.filter(playlist=self.test_playlist).values_list('position', flat=True))
+        self.client.post(add_track_url)
+        playlist_track.refresh_from_db()
+        self.assertFalse(playlist_track.is_deleted)
+        self.assertEqual(playlist_track.position, max_position + 1)
+        self.assertEqual(playlist_track.added_by, self.user_1)
+        self.assertEqual(PlaylistTrack.objects.filter(playlist=self.test_playlist, track=self.simple_track_3).count(), 1)
+
+
+@override_settings(METADATA_JOBS_ENABLED=True)
+class MetadataJobTest(BaseTestCase):
+    '''
+    Test the asynchronous metadata job mode of add_streaming_link_to_playlist() and the
+    metadata_job_status() view it redirects to.
+    '''
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.login(email="test1@user.com", password="Meep!234")
+        self.add_link_url = reverse("add_streaming_link_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+        self.post_data = {
+            'track_type': 'track',
+            'streaming_link': 'https://www.youtube.com/watch?v=zYta6v1wZiI'
+        }
+        self.meta_data_dict = {
+            'track_type': 'track',
+            'track_name': self.simple_track_2.track_name,
+            'artist': self.simple_track_2.artist,
+            'streaming_platform': 'youtube',
+            'streaming_link': 'https://www.youtube.com/watch?v=zYta6v1wZiI'
+        }
+        #Run jobs inline instead of on the thread pool
+        self.executor = MagicMock()
+        self.executor.submit.side_effect = lambda fn, *args: fn(*args)
+
+    def job_status_url(self, job_id):
+        return reverse("metadata_job_status", args=[self.user_1.username, self.test_playlist.playlist_name, job_id])
+
+    def test_post_enqueues_job_and_returns_immediately(self):
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=MagicMock()) as executor, \
+                patch.object(metadata_jobs, 'orchestrate_platform_api') as mock_orchestrate:
+            response = self.client.post(self.add_link_url, self.post_data)
+
+        executor.return_value.submit.assert_called_once()
+        mock_orchestrate.assert_not_called()
+        job_id = response.url.rstrip('/').split('/')[-1]
+        self.assertRedirects(response, self.job_status_url(job_id), fetch_redirect_response=False)
+
+        #Still pending: the page polls and the JSON endpoint reports the status
+        response = self.client.get(self.job_status_url(job_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'http-equiv="refresh"')
+        response = self.client.get(self.job_status_url(job_id), {'format': 'json'})
+        self.assertEqual(response.json(), {'status': 'pending'})
+
+    def test_finished_job_fills_session_and_redirects(self):
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=self.executor), \
+                patch.object(metadata_jobs, 'orchestrate_platform_api', return_value=self.meta_data_dict):
+            response = self.client.post(self.add_link_url, self.post_data, follow=True)
+
+        self.assertRedirects(response, reverse("add_track_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name]))
+        self.assertEqual(self.client.session['meta_data_dict'], self.meta_data_dict)
+
+    def test_platform_error_falls_back_to_manual_entry(self):
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=self.executor), \
+                patch.object(metadata_jobs, 'orchestrate_platform_api', side_effect=BandCampMetaDataError("No metadata")):
+            response = self.client.post(self.add_link_url, self.post_data)
+        job_id = response.url.rstrip('/').split('/')[-1]
+
+        response = self.client.get(self.job_status_url(job_id), {'format': 'json'})
+
+        self.assertEqual(response.json()['status'], 'fallback')
+        meta_data_dictionary = self.client.session['meta_data_dict']
+        self.assertEqual(meta_data_dictionary['streaming_platform'], 'unknown')
+        self.assertEqual(meta_data_dictionary['streaming_link'], self.post_data['streaming_link'])
+
+    def test_other_users_cannot_read_job(self):
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=MagicMock()):
+            response = self.client.post(self.add_link_url, self.post_data)
+        job_id = response.url.rstrip('/').split('/')[-1]
+
+        self.client.force_login(self.bad_user)
+        response = self.client.get(self.job_status_url(job_id), {'format': 'json'})
+
+        self.assertEqual(response.status_code, 403)
+
+
+    def test_import_job_id_is_not_a_metadata_job(self):
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=MagicMock()):
+            job_id = metadata_jobs.enqueue_collection_import_job(
+                self.test_playlist.id, self.user_1.id, 'https://www.youtube.com/playlist?list=PL1234', 'track'
+            )
+
+        response = self.client.get(self.job_status_url(job_id), {'format': 'json'})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(self.job_status_url(job_id))
+        self.assertRedirects(response, self.add_link_url, fetch_redirect_response=False)
+
+
+class ImportCollectionTest(BaseTestCase):
+    '''
+    Test import_collection_to_playlist() and import_collection_status()
+    '''
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.login(email="test1@user.com", password="Meep!234")
+        self.import_url = reverse("import_collection_to_playlist", args=[self.user_1.username, self.test_playlist.playlist_name])
+
+    @override_settings(METADATA_JOBS_ENABLED=True)
+    def test_post_enqueues_import_job(self):
+        summary = {'total': 2, 'added': 2, 'tracks_created': 2, 'tracks_reused': 0, 'skipped': 0, 'failed': []}
+        executor = MagicMock()
+        executor.submit.side_effect = lambda fn, *args: fn(*args)
+
+        with patch.object(metadata_jobs, 'get_job_executor', return_value=executor), \
+                patch('music_app_archive.src.collection_import.import_collection_into_playlist', return_value=summary) as mock_import:
+            response = self.client.post(
+                self.import_url + '?format=json',
+                {'collection_url': 'https://www.youtube.com/playlist?list=PL1234'}
+            )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(mock_import.call_args[0][0], self.test_playlist)
+
+        response = self.client.get(response.json()['status_url'], {'format': 'json'})
+        self.assertEqual(response.json()['status'], 'done')
+        self.assertEqual(response.json()['result'], summary)
+
+    @override_settings(METADATA_JOBS_ENABLED=False)
+    def test_import_runs_in_the_request_without_job_mode(self):
+        summary = {'total': 1, 'added': 1, 'tracks_created': 1, 'tracks_reused': 0, 'skipped': 0, 'failed': []}
+
+        with patch.object(metadata_jobs, 'get_job_executor') as mock_executor, \
+                patch('music_app_archive.src.collection_import.import_collection_into_playlist', return_value=summary) as mock_import:
+            response = self.client.post(self.import_url, {'collection_url': 'https://www.youtube.com/playlist?list=PL1234'})
+
+        mock_executor.assert_not_called()
+        mock_import.assert_called_once()
+        job_id = response.url.rstrip('/').split('/')[-1]
+        self.assertRedirects(
+            response,
+            reverse("import_collection_status", args=[self.user_1.username, self.test_playlist.playlist_name, job_id]),
+            fetch_redirect_response=False
+        )
+
+        response = self.client.get(response.url)
+        self.assertEqual(response.context['job']['status'], 'done')
+        self.assertTrue(response.context['finished'])
+        self.assertEqual(response.context['job']['result'], summary)
+
+    def test_single_track_url_is_rejected(self):
+        response = self.client.post(self.import_url, {'collection_url': 'https://www.youtube.com/watch?v=zYta6v1wZiI'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "URL must be a YouTube playlist, SoundCloud set or Bandcamp album",
+            response.context['import_collection_form'].errors['collection_url']
+        )
+
 
 class DeletePlaylistTest(BaseTestCase):
     def test_unauthorised_user(self):
@@ -29,7 +29,12 @@ urlpatterns=[
     ,path('<str:username>/create_playlist/', views.create_playlist, name='create_playlist') #create or update playlist
     ,path('<str:username>/your_playlists/delete_playlists/', views.delete_playlists, name='delete_playlists') #view delete_playlists
     ,path('<str:username>/<str:playlist_name>/', views.view_edit_playlist, name='view_edit_playlist') #view specific playlist
+    ,path('<str:username>/<str:playlist_name>/tracks/', views.playlist_tracks_fragment, name='playlist_tracks_fragment') #next page of a playlist as JSON (infinite scroll)
+    ,path('<str:username>/<str:playlist_name>/export/', views.export_playlist_tracks, name='export_playlist_tracks') #stream a playlist's tracks as NDJSON/JSON
     ,path('<str:username>/<str:playlist_name>/delete_playlist_tracks/', views.delete_playlist_tracks, name='delete_playlist_tracks') #view delete_playlist_tracks
     ,path('<str:username>/<str:playlist_name>/add_link_to_track/', views.add_streaming_link_to_playlist, name='add_streaming_link_to_playlist') #add track to a specific playlist
+    ,path('<str:username>/<str:playlist_name>/add_link_to_track/jobs/<str:job_id>/', views.metadata_job_status, name='metadata_job_status') #poll an asynchronous metadata fetch
+    ,path('<str:username>/<str:playlist_name>/import/', views.import_collection_to_playlist, name='import_collection_to_playlist') #bulk import a playlist/set/album
+    ,path('<str:username>/<str:playlist_name>/import/jobs/<str:job_id>/', views.import_collection_status, name='import_collection_status') #poll a bulk import
     ,path('<str:username>/<str:playlist_name>/add_track/', views.add_track_to_playlist, name='add_track_to_playlist') #add track to a specific playlist
 ]  + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
@@ -1,9 +1,10 @@
 import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError, transaction
-from django.http.response import HttpResponseRedirect, JsonResponse
+from django.http.response import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
@@ -12,8 +13,31 @@ from .models import *
 from music_app_auth.models import AppLogging
 from .forms import *
 from .src.integrations.main_integrations import orchestrate_platform_api
-from .src.custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError
+from .src.custom_exceptions import BandCampMetaDataError, YouTubeMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError, DeadlineExceededError
+from .src.deadline import Deadline
 from .src.utils import map_playlist_type_track_type
+from .src.services import (
+    get_existing_track_meta_data_dict,
+    add_existing_track_to_playlist,
+    get_playlist_rows_fragment,
+    get_playlist_overview_page,
+    parse_playlist_page_params,
+    stream_playlist_ndjson,
+    stream_playlist_json
+)
+from .src.playlist_cache import bump_playlist_versions
+from .src.metadata_jobs import (
+    enqueue_metadata_job,
+    enqueue_collection_import_job,
+    run_collection_import_now,
+    get_metadata_job,
+    build_manual_meta_data_dict,
+    FINISHED_JOB_STATUSES,
+    JOB_DONE,
+    JOB_FALLBACK,
+    JOB_KIND_METADATA,
+    JOB_KIND_COLLECTION_IMPORT
+)
 
 from music_app_auth.models import CustomUser
 from music_app_auth.src.django_error_utils import handle_django_error
@@ -41,19 +65,19 @@ def user_profile(request, username):
 def user_playlists(request, username):
     '''
     This view displays all of the playlists that a user has created or collaborated on. 
+
+    Paginated by PLAYLIST_OVERVIEW_PAGE_SIZE (?page=), see get_playlist_overview_page().
     '''
     #Retrieve the user        
     user = get_object_or_404(CustomUser, username=username)
 
-    #Display the runs from the 'Playlist' model.
-    user_playlists = Playlist.objects.filter(
-        owner_id=user.id,
-        is_deleted=False
-        ).order_by('-date_created')
+    #One page of playlists with their track count, platform mix and last activity (2 queries)
+    page = get_playlist_overview_page(user, request.GET.get('page'))
 
     context = {
         'title': 'Playlists',
-        'user_playlists': user_playlists
+        'user_playlists': page,
+        'page_obj': page,
     }
 
     return render(request, 'user_playlists.html', context=context)
@@ -200,16 +224,30 @@ def add_streaming_link_to_playlist(request, username, playlist_name):
             #Retrieve data from form link
             track_type=add_streaming_link_to_playlist_form.cleaned_data['track_type']
             streaming_link=add_streaming_link_to_playlist_form.cleaned_data['streaming_link']
+
+            #Link already archived: reuse its Track rather than calling the platform again
+            existing_meta_data_dict = get_existing_track_meta_data_dict(streaming_link, request.POST.get('streaming_link', '').strip())
+            if existing_meta_data_dict:
+                logger.info(f"{streaming_link} is already archived as track {existing_meta_data_dict['existing_track_id']}, skipping the platform call")
+                request.session['meta_data_dict'] = existing_meta_data_dict
+                return redirect('add_track_to_playlist', username=username, playlist_name=playlist_name)
+
+            #Job mode: fetch the metadata on the worker pool and let the client poll for it
+            if settings.METADATA_JOBS_ENABLED:
+                job_id = enqueue_metadata_job(streaming_link, track_type, user_id)
+                return redirect('metadata_job_status', username=username, playlist_name=playlist_name, job_id=job_id)
+
             try:
                 #Generate Meta Data Dictionary
-                meta_data_dict = orchestrate_platform_api(streaming_link, track_type)
+                #The whole extraction gets one time budget, so the request can't hang on a slow platform
+                meta_data_dict = orchestrate_platform_api(streaming_link, track_type, deadline=Deadline(settings.METADATA_DEADLINE_SECONDS))
 
                 #Store meta_data_dict in session
                 request.session["meta_data_dict"] = meta_data_dict 
 
                 return HttpResponseRedirect(reverse(viewname='add_track_to_playlist', args=[username, playlist_name]))
-            except (YouTubeMetaDataError, BandCampMetaDataError) as e:
-                #Platform-specific API error
+            except (YouTubeMetaDataError, BandCampMetaDataError, SoundcloudMetaDataError, PlatformUnavailableError) as e:
+                #Platform-specific API error, or the platform's governor failing fast
                 logger.warning(f"Platform API error for {streaming_link}: {str(e)}")
                 messages.warning(
                     request,
@@ -217,18 +255,16 @@ def add_streaming_link_to_playlist(request, username, playlist_name):
                 )
                 
                 #Store minimal metadata for manual entry
-                request.session['meta_data_dict'] = {
-                    'track_type': track_type,
-                    'streaming_link': streaming_link,
-                    'streaming_platform': 'unknown',
-                    'track_name': '',
-                    'artist': '',
-                    'album_name': '',
-                    'mix_page': '',
-                    'record_label': '',
-                    'genre': '',
-                    'purchase_link': ''
-                }        
+                request.session['meta_data_dict'] = build_manual_meta_data_dict(streaming_link, track_type)
+                return redirect('add_track_to_playlist', username=username, playlist_name=playlist_name)
+            except DeadlineExceededError as e:
+                #Out of time budget, keep whatever metadata was gathered and let the user fill in the rest
+                logger.warning(f"Metadata deadline exceeded for {streaming_link}: {str(e)}")
+                messages.warning(
+                    request,
+                    "Fetching metadata took too long. Please check the track details and fill in the rest manually."
+                )
+                request.session['meta_data_dict'] = build_manual_meta_data_dict(streaming_link, track_type, e.partial_meta_data_dict)
                 return redirect('add_track_to_playlist', username=username, playlist_name=playlist_name)
             except ValueError as e:
                #Invalid URL or unsupported platform
@@ -282,6 +318,176 @@ def add_streaming_link_to_playlist(request, username, playlist_name):
     return render(request, 'add_link.html', context)
 
 
+@login_required
+def metadata_job_status(request, username, playlist_name, job_id):
+    '''
+    Polled after add_streaming_link_to_playlist() enqueues a metadata job (METADATA_JOBS_ENABLED).
+
+    - While the job runs: renders a page that refreshes itself, or {'status': ...} for ?format=json.
+    - Once it lands: stores meta_data_dict in the session exactly like the synchronous path and
+      redirects to add_track_to_playlist() (JSON clients get the redirect_url instead).
+    - If the link was rejected: redirects back to the add link form with the error.
+    '''
+    #Get user instance via username
+    user = get_object_or_404(CustomUser, username=username)
+    wants_json = request.GET.get('format') == 'json'
+
+    #Security check: ensure logged-in user matches username
+    if request.user != user:
+        logger.warning(f"User {request.user.username} tried to read metadata job {job_id} of {username}")
+        if wants_json:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        messages.error(request, "You can only add tracks to your own playlists")
+        return redirect('user_playlists', username=request.user.username)
+
+    job = get_metadata_job(job_id)
+    #Jobs queued before they had a kind are metadata jobs
+    if job is None or job.get('user_id') != user.id or job.get('kind', JOB_KIND_METADATA) != JOB_KIND_METADATA:
+        logger.warning(f"Metadata job {job_id} not found for {username}")
+        if wants_json:
+            return JsonResponse({'status': 'missing', 'error': 'Job not found or expired'}, status=404)
+        messages.error(request, "That link lookup has expired. Please submit the link again.")
+        return redirect('add_streaming_link_to_playlist', username=username, playlist_name=playlist_name)
+
+    status = job['status']
+    if status not in FINISHED_JOB_STATUSES:
+        if wants_json:
+            return JsonResponse({'status': status})
+        context = {
+            'username': username,
+            'playlist_name': playlist_name,
+            'streaming_link': job['streaming_link'],
+            'status': status,
+            'poll_interval': settings.METADATA_JOBS_POLL_INTERVAL,
+        }
+        return render(request, 'metadata_job_status.html', context)
+
+    if status in (JOB_DONE, JOB_FALLBACK):
+        #Store meta_data_dict in session, the same as the synchronous path
+        request.session['meta_data_dict'] = job['meta_data_dict']
+        if status == JOB_FALLBACK and not wants_json:
+            messages.warning(request, job['message'])
+        redirect_url = reverse(viewname='add_track_to_playlist', args=[username, playlist_name])
+    else:
+        if not wants_json:
+            messages.error(request, job['message'])
+        redirect_url = reverse(viewname='add_streaming_link_to_playlist', args=[username, playlist_name])
+
+    if wants_json:
+        return JsonResponse({'status': status, 'message': job['message'], 'redirect_url': redirect_url})
+    return HttpResponseRedirect(redirect_url)
+
+
+@login_required
+def import_collection_to_playlist(request, username, playlist_name):
+    '''
+    Import a whole YouTube playlist, SoundCloud set or Bandcamp album into a playlist.
+
+    With METADATA_JOBS_ENABLED the POST only validates the URL and enqueues a collection import job, so
+    large imports never hold the request open. Without it the import runs in the request. Either way the
+    client is sent to import_collection_status() (or gets the job_id as JSON).
+    '''
+    #Get user instance via username
+    user = get_object_or_404(CustomUser, username=username)
+    wants_json = request.GET.get('format') == 'json'
+
+    #Security check: ensure logged-in user matches username
+    if request.user != user:
+        logger.warning(f"User {request.user.username} tried to import into {username}'s playlist")
+        if wants_json:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        messages.error(request, "You can only add tracks to your own playlists")
+        return redirect('user_playlists', username=request.user.username)
+
+    #Verify playlist exists and belongs to user
+    try:
+        playlist = Playlist.objects.get(playlist_name=playlist_name, owner=user, is_deleted=False)
+    except Playlist.DoesNotExist:
+        logger.warning(f"Playlist '{playlist_name}' not found for user {username}")
+        if wants_json:
+            return JsonResponse({'error': 'Playlist not found'}, status=404)
+        messages.error(request, f"Playlist '{playlist_name}' not found")
+        return redirect('user_playlists', username=username)
+
+    import_collection_form = ImportCollection()
+
+    if request.method == 'POST':
+        import_collection_form = ImportCollection(request.POST)
+        if import_collection_form.is_valid():
+            collection_url = import_collection_form.cleaned_data['collection_url']
+            track_type = map_playlist_type_track_type(playlist.playlist_type)
+
+            log_text = f"{user.username} has started an import of {collection_url}"
+            AppLogging.objects.create(user_id=user.id, log_text=log_text)
+
+            #No worker pool without job mode, so import before answering
+            if settings.METADATA_JOBS_ENABLED:
+                job_id = enqueue_collection_import_job(playlist.id, user.id, collection_url, track_type)
+            else:
+                job_id = run_collection_import_now(playlist.id, user.id, collection_url, track_type)
+            status_url = reverse(viewname='import_collection_status', args=[username, playlist_name, job_id])
+            if wants_json:
+                return JsonResponse({'job_id': job_id, 'status_url': status_url}, status=202 if settings.METADATA_JOBS_ENABLED else 200)
+            return HttpResponseRedirect(status_url)
+
+        logger.debug(f"Invalid import form by {username}: {import_collection_form.errors}")
+        if wants_json:
+            return JsonResponse({'errors': import_collection_form.errors}, status=400)
+        messages.warning(request, "Please correct the errors below")
+
+    context = {
+        'username': username,
+        'playlist_name': playlist_name,
+        'playlist': playlist,
+        'import_collection_form': import_collection_form,
+    }
+    return render(request, 'import_collection.html', context)
+
+
+@login_required
+def import_collection_status(request, username, playlist_name, job_id):
+    '''
+    Progress and, once finished, the summary (added / skipped / per-item failures) of a collection import.
+    Refreshes itself while the import runs; ?format=json returns the job state instead.
+    '''
+    #Get user instance via username
+    user = get_object_or_404(CustomUser, username=username)
+    wants_json = request.GET.get('format') == 'json'
+
+    #Security check: ensure logged-in user matches username
+    if request.user != user:
+        logger.warning(f"User {request.user.username} tried to read import job {job_id} of {username}")
+        if wants_json:
+            return JsonResponse({'error': 'Forbidden'}, status=403)
+        messages.error(request, "You can only add tracks to your own playlists")
+        return redirect('user_playlists', username=request.user.username)
+
+    job = get_metadata_job(job_id)
+    if job is None or job.get('user_id') != user.id or job.get('kind') != JOB_KIND_COLLECTION_IMPORT:
+        logger.warning(f"Import job {job_id} not found for {username}")
+        if wants_json:
+            return JsonResponse({'status': 'missing', 'error': 'Job not found or expired'}, status=404)
+        messages.error(request, "That import has expired.")
+        return redirect('view_edit_playlist', username=username, playlist_name=playlist_name)
+
+    if wants_json:
+        return JsonResponse({
+            'status': job['status'],
+            'progress': job['progress'],
+            'result': job['result'],
+            'message': job['message'],
+        })
+
+    context = {
+        'username': username,
+        'playlist_name': playlist_name,
+        'job': job,
+        'finished': job['status'] in FINISHED_JOB_STATUSES,
+        'poll_interval': settings.METADATA_JOBS_POLL_INTERVAL,
+    }
+    return render(request, 'import_collection.html', context)
+
+
 @login_required
 def add_track_to_playlist(request, username, playlist_name):
     '''
@@ -310,6 +516,28 @@ def add_track_to_playlist(request, username, playlist_name):
         messages.warning(request, "No track data found. Please submit a streaming link first.")
         return redirect('add_streaming_link_to_playlist', username=username, playlist_name=playlist_name)
 
+    #The link is already archived: offer its Track as it is, adding it only needs a PlaylistTrack row
+    existing_track_id = meta_data_dict.get('existing_track_id')
+    if existing_track_id:
+        if request.method == 'POST':
+            if add_existing_track_to_playlist(playlist, existing_track_id, user):
+                log_text = f'{user.username} has added the following track "{meta_data_dict.get("track_name")}" to {playlist.playlist_name}'
+                AppLogging.objects.create(user_id = user_id, log_text=log_text)
+                logger.info(f"Added archived track {existing_track_id} to {playlist_name}")
+            else:
+                messages.info(request, "This track is already in the playlist.")
+            del request.session['meta_data_dict']
+            return redirect(reverse(viewname='view_edit_playlist', args=[username, playlist_name]))
+
+        context = {
+            'username': username,
+            'playlist_name': playlist_name,
+            'playlist': playlist,
+            'meta_data_dict': meta_data_dict,
+            'already_in_playlist': PlaylistTrack.objects.filter(playlist=playlist, track_id=existing_track_id, is_deleted=False).exists(),
+        }
+        return render(request, 'add_existing_track.html', context)
+
     #Initialise forms and pre-fill with youtube_meta_data_dict
     add_track_to_playlist_form = AddTrackToPlaylist(
         initial={
@@ -458,6 +686,9 @@ def add_track_to_playlist(request, username, playlist_name):
 def view_edit_playlist(request, username, playlist_name):
     '''
     Displays a specific playlist for a user, where they can edit.
+
+    Renders one page of rows (PLAYLIST_PAGE_SIZE, or ?page_size=) starting after the ?after= cursor.
+    playlist_tracks_fragment() serves the following pages for infinite scroll.
     '''
     #Get user instance via username
     user = get_object_or_404(CustomUser, username=username)
@@ -480,66 +711,23 @@ def view_edit_playlist(request, username, playlist_name):
     #Get playlist_type
     playlist_type = playlist.playlist_type
 
-    #2. Get relevant PlaylistTrack from the model, along with Track + StreamingLink meta data
-    playlist_tracks = PlaylistTrack.objects.filter(
-        playlist=playlist,
-        is_deleted=False
-        ).select_related(
-            'track',
-            'added_by'
-        ).prefetch_related(
-            'track__streaming_links'
-        ).order_by('position')
-    
-    #3. Build list for track data
-    list_of_playlist_tracks = []
-
-    for playlist_track in playlist_tracks:
-        try:
-            track = playlist_track.track
-
-            #Get streaming_links for specific track
-            streaming_links = list(track.streaming_links.all())
-
-            #Create dictionary to pass through context
-            playlist_track_data = {
-                'id': playlist_track.id,
-                'position': playlist_track.position,
-                'track_id': track.id,
-                'track_name': track.track_name,
-                'artist': track.artist,
-                'album_name': track.album_name or '-',
-                'genre': track.genre or '-',
-                'record_label': track.record_label or '-',
-                'mix_page': track.mix_page or '-',
-                'date_added': playlist_track.added_at,
-                'added_by': playlist_track.added_by.username if playlist_track.added_by else 'Unknown',
-                'streaming_links': [
-                    {
-                        'platform': link.get_streaming_platform_display(),
-                        'platform_code': link.streaming_platform,
-                        'url': link.streaming_link,
-                        'id': link.id
-                    }
-                    for link in streaming_links
-                ],
-                #For backward compatibility with your template
-                'streaming_platform': streaming_links[0].get_streaming_platform_display() if streaming_links else '-',
-                'link': streaming_links[0].streaming_link if streaming_links else '#',
-            }
+    #2. Get the page of rows, rendered, from the fragment cache unless the playlist changed
+    try:
+        after, page_size = parse_playlist_page_params(request.GET)
+    except ValueError:
+        #A mangled cursor shows the start of the playlist
+        after, page_size = None, None
+    fragment, cache_hit = get_playlist_rows_fragment(playlist, after=after, page_size=page_size)
 
-            #Append playlist_track_data to list_of_playlist_tracks
-            list_of_playlist_tracks.append(playlist_track_data)
-        except Exception as e:
-            #Skip current track and move onto the next one
-            logger.error(f"Error processing track in playlist {playlist_name}: {e}")
-            continue
-    
     context = {
         'user_id': user_id,
         'username': username, 
         'playlist_name': playlist_name,
-        'list_of_playlist_tracks': list_of_playlist_tracks
+        'playlist_type': playlist_type,
+        'list_of_playlist_tracks': fragment.rows,
+        'rows_html': fragment.rows_html,
+        'next_cursor': fragment.next_cursor,
+        'page_size': page_size or settings.PLAYLIST_PAGE_SIZE,
     }
 
     #Determine which HTML to render
@@ -549,7 +737,75 @@ def view_edit_playlist(request, username, playlist_name):
         else 'view_edit_playlist_mixes.html'
     )
 
-    return render(request, template, context)
+    response = render(request, template, context)
+    response['X-Playlist-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def playlist_tracks_fragment(request, username, playlist_name):
+    '''
+    Infinite-scroll endpoint for view_edit_playlist: the page of rows after ?after=, as JSON.
+
+    Returns {'rows_html': the rendered <tr> rows, 'next_cursor': position or null on the last page, 'count': rows}.
+    '''
+    user = get_object_or_404(CustomUser, username=username)
+    if request.user != user:
+        logger.warning(f"User {request.user.username} tried to page through playlist: {playlist_name}")
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    playlist = get_object_or_404(Playlist, playlist_name=playlist_name, owner=user, is_deleted=False)
+
+    try:
+        after, page_size = parse_playlist_page_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    fragment, cache_hit = get_playlist_rows_fragment(playlist, after=after, page_size=page_size)
+
+    response = JsonResponse({'rows_html': fragment.rows_html, 'next_cursor': fragment.next_cursor, 'count': len(fragment.rows)})
+    response['X-Playlist-Cache'] = 'hit' if cache_hit else 'miss'
+    return response
+
+
+#?format= of export_playlist_tracks -> (stream function, content type)
+PLAYLIST_EXPORT_FORMATS = {
+    'ndjson': (stream_playlist_ndjson, 'application/x-ndjson'),
+    'json': (stream_playlist_json, 'application/json'),
+}
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_playlist_tracks(request, username, playlist_name):
+    '''
+    Read API for a playlist's tracks and streaming links, ?format=ndjson (default, one track per line)
+    or ?format=json ({"playlist": {...}, "tracks": [...]}).
+
+    The body is streamed from a server-side cursor a chunk of rows at a time, so memory stays flat
+    and the first rows go out before the rest of the playlist has been read.
+    '''
+    user = get_object_or_404(CustomUser, username=username)
+    if request.user != user:
+        logger.warning(f"User {request.user.username} tried to export playlist: {playlist_name}")
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+
+    export_format = request.GET.get('format', 'ndjson')
+    if export_format not in PLAYLIST_EXPORT_FORMATS:
+        return JsonResponse({'error': f"Unsupported format: {export_format}"}, status=400)
+
+    playlist = get_object_or_404(
+        Playlist.objects.select_related('owner')
+        , playlist_name=playlist_name
+        , owner = user
+        , is_deleted = False
+        )
+
+    stream, content_type = PLAYLIST_EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(playlist), content_type=content_type)
+    #Tell proxies (nginx) to pass chunks on as they come rather than buffer the whole body
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @login_required
@@ -572,7 +828,11 @@ def delete_playlists(request, username):
         return JsonResponse({'success': False, 'error': 'empty playlist_ids_to_be_deleted'}, status=400)
     try:
         #Get the relevant playlists and update is_deleted = True
-        updated=Playlist.objects.filter(owner=request.user.id, id__in=playlist_ids_to_be_deleted).update(is_deleted=True)
+        playlists = Playlist.objects.filter(owner=request.user.id, id__in=playlist_ids_to_be_deleted)
+        playlist_ids = list(playlists.values_list('id', flat=True))
+        updated=playlists.update(is_deleted=True)
+        #update() skips the model signals, so invalidate the cached pages here
+        bump_playlist_versions(playlist_ids)
         logger.info(f"The following playlists by {username} have been deleted: {playlist_ids_to_be_deleted}")
         return JsonResponse({'success':True, 'deleted_count': updated})
     except Exception as e:
@@ -601,7 +861,11 @@ def delete_playlist_tracks(request, username, playlist_name):
         return JsonResponse({'success': False, 'error': 'empty playlist_track_ids_to_be_deleted'}, status=400)
     try:
         #Get the relevant tracks and update is_deleted = True
-        updated=PlaylistTrack.objects.filter(playlist__owner=request.user.id, id__in=playlist_track_ids_to_be_deleted).update(is_deleted=True)
+        playlist_tracks = PlaylistTrack.objects.filter(playlist__owner=request.user.id, id__in=playlist_track_ids_to_be_deleted)
+        playlist_ids = set(playlist_tracks.values_list('playlist_id', flat=True))
+        updated=playlist_tracks.update(is_deleted=True)
+        #update() skips the model signals, so invalidate the cached pages here
+        bump_playlist_versions(playlist_ids)
         logger.info(f"The following tracks from {playlist_name} by {username} have been deleted: {playlist_track_ids_to_be_deleted}")
         return JsonResponse({'success':True, 'deleted_count': updated})
     except Exception as e:
@@ -17,18 +17,16 @@ export function init(): void {
     const editBtn = document.querySelector<HTMLButtonElement>('#edit-playlist-tracks-btn');
     const deleteBtn = document.querySelector<HTMLButtonElement>('#delete-playlist-tracks-btn');
     const cancelBtn = document.querySelector<HTMLButtonElement>('#cancel-edit-btn');
-    const checkboxCells = document.querySelectorAll<HTMLElement>('.playlist-track-checkbox-cell');
     const checkboxHeader = document.querySelector<HTMLElement>('.checkbox-header');
     const confirmDeleteBtn = document.querySelector<HTMLButtonElement>('#confirm-delete-btn');
     const modalElement = document.getElementById('confirmDeleteModal');
 
     //Check that all const exist
-    if (!editBtn || !deleteBtn || !cancelBtn || !checkboxCells || !checkboxHeader || !confirmDeleteBtn || !modalElement) {
+    if (!editBtn || !deleteBtn || !cancelBtn || !checkboxHeader || !confirmDeleteBtn || !modalElement) {
         console.warn("Required elements not found:", {
             editBtn: !!editBtn,
             deleteBtn: !!deleteBtn,
             cancelBtn: !!cancelBtn,
-            checkboxCells: !!checkboxCells,
             checkboxHeader: !!checkboxHeader,
             confirmDeleteBtn: !!confirmDeleteBtn,
             modalElement: !!modalElement
@@ -44,10 +42,14 @@ export function init(): void {
         .find(row => row.startsWith('csrftoken='))
         ?.split('=')[1] ?? '';
 
+    //Rows can be appended by playlistInfiniteScroll.ts, so look the checkbox cells up when they are needed
+    const checkboxCells = (): NodeListOf<HTMLElement> =>
+        document.querySelectorAll<HTMLElement>('.playlist-track-checkbox-cell');
+
     //Edit button actions
     editBtn.addEventListener('click', (): void => {
         checkboxHeader.classList.remove('d-none');
-        checkboxCells.forEach((field: HTMLElement): void => {
+        checkboxCells().forEach((field: HTMLElement): void => {
             field.classList.remove('d-none');
         });
         deleteBtn.classList.remove('d-none');
@@ -58,7 +60,7 @@ export function init(): void {
     //Cancel button actions
     cancelBtn.addEventListener('click', (): void => {
         checkboxHeader.classList.add('d-none');
-        checkboxCells.forEach((cell: HTMLElement): void => {
+        checkboxCells().forEach((cell: HTMLElement): void => {
             cell.classList.add('d-none');
             const checkbox = cell.querySelector<HTMLInputElement>('input[type="checkbox"]');
             if (checkbox) checkbox.checked = false;
@@ -71,7 +73,7 @@ export function init(): void {
     //Delete button actions
     deleteBtn.addEventListener('click', (): void => {
         selectedPlaylistTrackIds.clear();
-        checkboxCells.forEach((cell: HTMLElement): void => {
+        checkboxCells().forEach((cell: HTMLElement): void => {
             const checkbox = cell.querySelector<HTMLInputElement>('input[type="checkbox"]');
             const row = cell.closest<HTMLElement>('tr');
             const playlistTrackId = row?.dataset.playlistTrackId;
@@ -99,7 +101,7 @@ export function init(): void {
         .then(data => {
             if (data.success) {
                 modal?.hide();
-                checkboxCells.forEach((cell: HTMLElement): void => {
+                checkboxCells().forEach((cell: HTMLElement): void => {
                     const checkbox = cell.querySelector<HTMLInputElement>('input[type="checkbox"]');
                     if (checkbox) checkbox.checked = false;
                 });
@@ -15,4 +15,11 @@ interface playlistTrack {
     link: URL;
     added_by: string;
     date_added: Date;
-}
\ No newline at end of file
+}
+
+//JSON returned by the playlist_tracks_fragment view (one page of rows)
+export interface PlaylistTracksPage {
+    rows_html: string;
+    next_cursor: number | null;
+    count: number;
+}
@@ -0,0 +1,88 @@
+import type { PlaylistTracksPage } from './musicAppPlaylist';
+/*
+    * Load the rest of a playlist page by page as the user scrolls
+    * The first page is rendered by the server, the tbody carries the fragment URL, the cursor
+      (position of the last row shown) and the page size
+    * When the sentinel below the table scrolls into view:
+        * The next page of rows is fetched from the fragment endpoint and appended to the table
+        * If the user is editing, the new rows' checkboxes are shown straight away
+        * When there are no more pages the sentinel is removed
+    * Without JavaScript the sentinel's "Load more" link opens the next page instead
+*/
+
+let loading = false;
+
+export async function loadNextPage(tbody: HTMLElement, sentinel: HTMLElement | null): Promise<boolean> {
+    const fragmentUrl = tbody.dataset.fragmentUrl;
+    const cursor = tbody.dataset.nextCursor;
+    const pageSize = tbody.dataset.pageSize ?? '';
+
+    if (!fragmentUrl || !cursor || loading) {
+        return false;
+    }
+
+    loading = true;
+    try {
+        const response = await fetch(`${fragmentUrl}?after=${encodeURIComponent(cursor)}&page_size=${encodeURIComponent(pageSize)}`, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        });
+        if (!response.ok) {
+            throw new Error(`Unexpected status ${response.status}`);
+        }
+        const page: PlaylistTracksPage = await response.json();
+
+        tbody.insertAdjacentHTML('beforeend', page.rows_html);
+
+        //Keep new rows in step with edit mode
+        const checkboxHeader = document.querySelector<HTMLElement>('.checkbox-header');
+        if (checkboxHeader && !checkboxHeader.classList.contains('d-none')) {
+            tbody.querySelectorAll<HTMLElement>('.playlist-track-checkbox-cell.d-none').forEach((cell: HTMLElement): void => {
+                cell.classList.remove('d-none');
+            });
+        }
+
+        if (page.next_cursor === null) {
+            tbody.dataset.nextCursor = '';
+            sentinel?.remove();
+            return false;
+        }
+        tbody.dataset.nextCursor = String(page.next_cursor);
+        return true;
+    } catch (error) {
+        console.error('Error loading playlist tracks:', error);
+        return false;
+    } finally {
+        loading = false;
+    }
+}
+
+export function init(): void {
+    const tbody = document.querySelector<HTMLElement>('#playlist-tracks-body');
+    const sentinel = document.querySelector<HTMLElement>('#playlist-tracks-sentinel');
+
+    //Nothing more to load (or not a playlist page)
+    if (!tbody || !sentinel || !tbody.dataset.nextCursor) {
+        return;
+    }
+
+    //Older browsers keep the "Load more" link
+    if (!('IntersectionObserver' in window)) {
+        return;
+    }
+
+    const observer = new IntersectionObserver((entries: IntersectionObserverEntry[]): void => {
+        if (!entries.some(entry => entry.isIntersecting)) {
+            return;
+        }
+        loadNextPage(tbody, sentinel).then((hasMore: boolean): void => {
+            if (!hasMore && !tbody.dataset.nextCursor) {
+                observer.disconnect();
+            }
+        });
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+
+    console.log('playlistInfiniteScroll initialized');
+}
+
+document.addEventListener('DOMContentLoaded', init);
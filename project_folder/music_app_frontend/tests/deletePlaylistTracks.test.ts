@@ -153,6 +153,34 @@ describe('deletePlaylistTracks.ts', () => {
             expect(mockShow).toHaveBeenCalledTimes(1);
         });
 
+        it('includes rows appended after init (infinite scroll)', async () => {
+            mockFetch.mockResolvedValueOnce({
+                json: async () => ({ success: true, deleted_count: 1 }),
+            });
+            vi.stubGlobal('location', { ...window.location, reload: vi.fn() });
+
+            document.querySelector('tbody')!.insertAdjacentHTML('beforeend', `
+                <tr class="row_table" data-playlist-track-id="3">
+                    <td class="playlist-track-checkbox-cell d-none">
+                        <input type="checkbox" class="playlist-track-checkbox">
+                    </td>
+                    <td>3</td>
+                    <td>Loaded Later</td>
+                    <td>Someone</td>
+                </tr>`);
+
+            document.getElementById('edit-playlist-tracks-btn')!.click();
+            const appendedCell = document.querySelector<HTMLElement>('tr[data-playlist-track-id="3"] .playlist-track-checkbox-cell')!;
+            expect(appendedCell.classList.contains('d-none')).toBe(false);
+
+            appendedCell.querySelector<HTMLInputElement>('input[type="checkbox"]')!.checked = true;
+            document.getElementById('delete-playlist-tracks-btn')!.click();
+            document.getElementById('confirm-delete-btn')!.click();
+
+            await vi.waitFor(() => expect(mockFetch).toHaveBeenCalledTimes(1));
+            expect(JSON.parse(mockFetch.mock.calls[0][1].body)).toEqual({ playlist_track_id: [3] });
+        });
+
         it('shows the modal even when no checkboxes are ticked', () => {
             const editBtn = document.getElementById('edit-playlist-tracks-btn')!;
             const deleteBtn = document.getElementById('delete-playlist-tracks-btn')!;
@@ -0,0 +1,172 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+import { init, loadNextPage } from '../src/playlistInfiniteScroll';
+
+// ─── Mock fetch ───────────────────────────────────────────────────────────────
+
+const mockFetch = vi.fn();
+
+// ─── Mock IntersectionObserver ───────────────────────────────────────────────
+
+let observerCallback: ((entries: Partial<IntersectionObserverEntry>[]) => void) | null = null;
+const mockObserve = vi.fn();
+const mockDisconnect = vi.fn();
+
+function stubIntersectionObserver(): void {
+    vi.stubGlobal('IntersectionObserver', vi.fn().mockImplementation(function(this: any, callback: any) {
+        observerCallback = callback;
+        this.observe = mockObserve;
+        this.disconnect = mockDisconnect;
+    }));
+}
+
+function pageResponse(rowsHtml: string, nextCursor: number | null) {
+    return {
+        ok: true,
+        status: 200,
+        json: async () => ({ rows_html: rowsHtml, next_cursor: nextCursor, count: 1 }),
+    };
+}
+
+function row(id: number, position: number): string {
+    return `
+        <tr class="row_table" data-playlist-track-id="${id}" data-position="${position}">
+            <td class="playlist-track-checkbox-cell d-none"><input type="checkbox" class="playlist-track-checkbox"></td>
+            <td class="playlist_track_name">Track ${id}</td>
+        </tr>`;
+}
+
+// ─── DOM Setup ───────────────────────────────────────────────────────────────
+
+function buildDOM(nextCursor: string = '2'): void {
+    document.body.innerHTML = `
+        <table>
+            <thead>
+                <tr><th class="checkbox-header d-none"></th><th>Track Title</th></tr>
+            </thead>
+            <tbody id="playlist-tracks-body"
+                   data-fragment-url="/music_app_archive/test1/test_playlist/tracks/"
+                   data-next-cursor="${nextCursor}"
+                   data-page-size="2">
+                ${row(1, 1)}
+                ${row(2, 2)}
+            </tbody>
+        </table>
+        <div id="playlist-tracks-sentinel">
+            <a href="?after=2&page_size=2">Load more</a>
+        </div>`;
+}
+
+function tbody(): HTMLElement {
+    return document.getElementById('playlist-tracks-body')!;
+}
+
+function sentinel(): HTMLElement | null {
+    return document.getElementById('playlist-tracks-sentinel');
+}
+
+// ─── Tests ───────────────────────────────────────────────────────────────────
+
+describe('playlistInfiniteScroll.ts', () => {
+
+    beforeEach(() => {
+        vi.clearAllMocks();
+        observerCallback = null;
+        vi.stubGlobal('fetch', mockFetch);
+        stubIntersectionObserver();
+        buildDOM();
+    });
+
+    afterEach(() => {
+        vi.unstubAllGlobals();
+    });
+
+    // ── 1. loadNextPage ───────────────────────────────────────────────────────
+
+    describe('loadNextPage', () => {
+        it('requests the page after the cursor and appends the rows', async () => {
+            mockFetch.mockResolvedValueOnce(pageResponse(row(3, 3) + row(4, 4), 4));
+
+            const hasMore = await loadNextPage(tbody(), sentinel());
+
+            expect(mockFetch).toHaveBeenCalledTimes(1);
+            expect(mockFetch.mock.calls[0][0]).toBe('/music_app_archive/test1/test_playlist/tracks/?after=2&page_size=2');
+            expect(hasMore).toBe(true);
+            expect(tbody().querySelectorAll('tr').length).toBe(4);
+            expect(tbody().dataset.nextCursor).toBe('4');
+            expect(sentinel()).not.toBeNull();
+        });
+
+        it('removes the sentinel on the last page', async () => {
+            mockFetch.mockResolvedValueOnce(pageResponse(row(3, 3), null));
+
+            const hasMore = await loadNextPage(tbody(), sentinel());
+
+            expect(hasMore).toBe(false);
+            expect(tbody().dataset.nextCursor).toBe('');
+            expect(sentinel()).toBeNull();
+        });
+
+        it('shows the checkboxes of new rows while editing', async () => {
+            document.querySelector('.checkbox-header')!.classList.remove('d-none');
+            mockFetch.mockResolvedValueOnce(pageResponse(row(3, 3), null));
+
+            await loadNextPage(tbody(), sentinel());
+
+            const newCell = tbody().querySelector<HTMLElement>('tr[data-playlist-track-id="3"] .playlist-track-checkbox-cell')!;
+            expect(newCell.classList.contains('d-none')).toBe(false);
+        });
+
+        it('keeps the cursor and rows on a failed request', async () => {
+            const consoleSpy = vi.spyOn(console, 'error').mockImplementation(() => {});
+            mockFetch.mockResolvedValueOnce({ ok: false, status: 500, json: async () => ({}) });
+
+            const hasMore = await loadNextPage(tbody(), sentinel());
+
+            expect(hasMore).toBe(false);
+            expect(tbody().querySelectorAll('tr').length).toBe(2);
+            expect(tbody().dataset.nextCursor).toBe('2');
+            expect(consoleSpy).toHaveBeenCalled();
+            consoleSpy.mockRestore();
+        });
+
+        it('does nothing without a cursor', async () => {
+            buildDOM('');
+
+            const hasMore = await loadNextPage(tbody(), sentinel());
+
+            expect(hasMore).toBe(false);
+            expect(mockFetch).not.toHaveBeenCalled();
+        });
+    });
+
+    // ── 2. init ───────────────────────────────────────────────────────────────
+
+    describe('init', () => {
+        it('observes the sentinel and loads a page when it becomes visible', async () => {
+            mockFetch.mockResolvedValueOnce(pageResponse(row(3, 3), null));
+
+            init();
+            expect(mockObserve).toHaveBeenCalledWith(sentinel());
+
+            observerCallback!([{ isIntersecting: true }]);
+
+            await vi.waitFor(() => expect(mockDisconnect).toHaveBeenCalledTimes(1));
+            expect(tbody().querySelectorAll('tr').length).toBe(3);
+        });
+
+        it('ignores the sentinel leaving the viewport', () => {
+            init();
+            observerCallback!([{ isIntersecting: false }]);
+
+            expect(mockFetch).not.toHaveBeenCalled();
+        });
+
+        it('does not observe anything when the whole playlist is already shown', () => {
+            buildDOM('');
+
+            init();
+
+            expect(mockObserve).not.toHaveBeenCalled();
+        });
+    });
+});
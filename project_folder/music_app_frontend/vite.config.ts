@@ -22,6 +22,7 @@ export default defineConfig({
         dynamicAddTrackForm: path.resolve(__dirname, './src/dynamicAddTrackForm.ts'),
         deletePlaylists: path.resolve(__dirname, './src/deletePlaylists.ts'),
         deletePlaylistTracks: path.resolve(__dirname, './src/deletePlaylistTracks.ts'),
+        playlistInfiniteScroll: path.resolve(__dirname, './src/playlistInfiniteScroll.ts'),
       },
       output: {
         entryFileNames: '[name].js',
@@ -231,4 +231,143 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Reference to platform API key's
 YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY")
 SOUNDCLOUD_CLIENT_ID = os.environ.get("SOUNDCLOUD_CLIENT_ID")
-SOUNDCLOUD_CLIENT_SECRET = os.environ.get("SOUNDCLOUD_CLIENT_SECRET")
\ No newline at end of file
+SOUNDCLOUD_CLIENT_SECRET = os.environ.get("SOUNDCLOUD_CLIENT_SECRET")
+# Selenium browser session pool used for scraping (see music_app_archive/src/integrations/browser_pool.py)
+# Defaults to the SE_NODE_MAX_SESSIONS of the selenium service so we never ask the grid for more browsers than it runs
+SELENIUM_POOL_SIZE = int(os.environ.get("SELENIUM_POOL_SIZE", os.environ.get("SE_NODE_MAX_SESSIONS", 5)))
+SELENIUM_POOL_MAX_PAGES_PER_SESSION = int(os.environ.get("SELENIUM_POOL_MAX_PAGES_PER_SESSION", 50))
+SELENIUM_POOL_BORROW_TIMEOUT = float(os.environ.get("SELENIUM_POOL_BORROW_TIMEOUT", 30))
+SELENIUM_POOL_PREWARM = os.environ.get("SELENIUM_POOL_PREWARM", "false").lower() == "true"
+# Seconds get_page_source waits for the platform's readiness selector (e.g. Bandcamp's #name-section), counted from the start of the fetch
+SELENIUM_PAGE_READY_TIMEOUT = float(os.environ.get("SELENIUM_PAGE_READY_TIMEOUT", 10))
+# Scraping profile: eager page loads, no images/media/fonts/stylesheets, DNS only for the first-party hosts below
+SELENIUM_BLOCK_RESOURCES = os.environ.get("SELENIUM_BLOCK_RESOURCES", "true").lower() == "true"
+SELENIUM_ALLOWED_HOSTS = [
+    host.strip() for host in os.environ.get(
+        "SELENIUM_ALLOWED_HOSTS", "bandcamp.com,*.bandcamp.com,soundcloud.com,*.soundcloud.com,localhost"
+    ).split(",") if host.strip()
+]
+# Opt-in human-like random sleeps and scrolling around each page load (adds 3.5-6s per page)
+SELENIUM_HUMAN_DELAYS = os.environ.get("SELENIUM_HUMAN_DELAYS", "false").lower() == "true"
+
+# HTTP client used by the integrations (music_app_archive/src/integrations/http_client.py): one keep-alive
+# Session per host, (connect, read) timeouts in seconds and retries with jittered backoff on 429/5xx
+HTTP_CLIENT_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CLIENT_CONNECT_TIMEOUT", 3.05))
+HTTP_CLIENT_READ_TIMEOUT = float(os.environ.get("HTTP_CLIENT_READ_TIMEOUT", 10))
+HTTP_CLIENT_MAX_RETRIES = int(os.environ.get("HTTP_CLIENT_MAX_RETRIES", 2))
+HTTP_CLIENT_BACKOFF_BASE = float(os.environ.get("HTTP_CLIENT_BACKOFF_BASE", 0.5))
+# Longest wait between attempts; a longer Retry-After is not waited for
+HTTP_CLIENT_MAX_BACKOFF = float(os.environ.get("HTTP_CLIENT_MAX_BACKOFF", 5))
+HTTP_CLIENT_POOL_MAXSIZE = int(os.environ.get("HTTP_CLIENT_POOL_MAXSIZE", 10))
+
+# End-to-end time budget (seconds) for one metadata extraction, shared by every HTTP call, browser
+# wait and governor wait it makes (music_app_archive/src/deadline.py). Jobs run off the request path so get longer
+METADATA_DEADLINE_SECONDS = float(os.environ.get("METADATA_DEADLINE_SECONDS", 4))
+METADATA_JOB_DEADLINE_SECONDS = float(os.environ.get("METADATA_JOB_DEADLINE_SECONDS", 30))
+
+# Timeout (seconds) for the plain HTTP Bandcamp fetch that runs before falling back to Selenium
+BANDCAMP_STATIC_FETCH_TIMEOUT = float(os.environ.get("BANDCAMP_STATIC_FETCH_TIMEOUT", 5))
+
+# Optional path to a YouTube Data API v3 discovery document; defaults to the copy bundled with google-api-python-client
+YOUTUBE_DISCOVERY_DOCUMENT = os.environ.get("YOUTUBE_DISCOVERY_DOCUMENT")
+# Concurrent videos.list calls (50 ids each) made by get_youtube_metadata_batch
+YOUTUBE_BATCH_MAX_WORKERS = int(os.environ.get("YOUTUBE_BATCH_MAX_WORKERS", 4))
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Redis is shared by every gunicorn worker (SoundCloud token, metadata cache, ...); LocMem is per-process for local dev/tests
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Refresh the cached SoundCloud OAuth token this many seconds before it expires
+SOUNDCLOUD_TOKEN_REFRESH_MARGIN = int(os.environ.get("SOUNDCLOUD_TOKEN_REFRESH_MARGIN", 60))
+
+# Metadata cache in front of orchestrate_platform_api (seconds per platform, 0 disables caching for that platform)
+METADATA_CACHE_TTLS = {
+    'youtube': int(os.environ.get("METADATA_CACHE_TTL_YOUTUBE", 60 * 60 * 24)),
+    'bandcamp': int(os.environ.get("METADATA_CACHE_TTL_BANDCAMP", 60 * 60 * 24)),
+    'soundcloud': int(os.environ.get("METADATA_CACHE_TTL_SOUNDCLOUD", 60 * 60 * 6)),
+}
+# How long a YouTube/Bandcamp/Soundcloud metadata error is remembered before trying the platform again
+METADATA_CACHE_NEGATIVE_TTL = int(os.environ.get("METADATA_CACHE_NEGATIVE_TTL", 60))
+# Entries kept in each worker's in-memory LRU tier
+METADATA_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("METADATA_CACHE_LOCAL_MAX_ENTRIES", 512))
+# Single-flight: concurrent misses for the same link wait up to this many seconds for the first caller's fetch
+METADATA_SINGLE_FLIGHT_WAIT = float(os.environ.get("METADATA_SINGLE_FLIGHT_WAIT", 10))
+# Expiry of the cross-worker fetch lock, in case the worker holding it dies
+METADATA_SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get("METADATA_SINGLE_FLIGHT_LOCK_TIMEOUT", 30))
+
+# Outbound-call governor per platform (state shared through CACHES): in-flight limit, token bucket
+# (rate calls/second, bursts of up to burst) and a circuit breaker that opens after failure_threshold
+# consecutive platform errors for reset_timeout seconds (quota_reset_timeout after a quota/429 error)
+PLATFORM_GOVERNOR = {
+    'youtube': {
+        'max_in_flight': int(os.environ.get("GOVERNOR_YOUTUBE_MAX_IN_FLIGHT", 8)),
+        'rate': float(os.environ.get("GOVERNOR_YOUTUBE_RATE", 5)),
+        'burst': int(os.environ.get("GOVERNOR_YOUTUBE_BURST", 10)),
+        'failure_threshold': int(os.environ.get("GOVERNOR_YOUTUBE_FAILURE_THRESHOLD", 5)),
+        'reset_timeout': float(os.environ.get("GOVERNOR_YOUTUBE_RESET_TIMEOUT", 30)),
+        'quota_reset_timeout': float(os.environ.get("GOVERNOR_YOUTUBE_QUOTA_RESET_TIMEOUT", 60 * 10)),
+    },
+    'soundcloud': {
+        'max_in_flight': int(os.environ.get("GOVERNOR_SOUNDCLOUD_MAX_IN_FLIGHT", 4)),
+        'rate': float(os.environ.get("GOVERNOR_SOUNDCLOUD_RATE", 2)),
+        'burst': int(os.environ.get("GOVERNOR_SOUNDCLOUD_BURST", 5)),
+        'failure_threshold': int(os.environ.get("GOVERNOR_SOUNDCLOUD_FAILURE_THRESHOLD", 5)),
+        'reset_timeout': float(os.environ.get("GOVERNOR_SOUNDCLOUD_RESET_TIMEOUT", 30)),
+        'quota_reset_timeout': float(os.environ.get("GOVERNOR_SOUNDCLOUD_QUOTA_RESET_TIMEOUT", 60 * 5)),
+    },
+    'bandcamp': {
+        'max_in_flight': int(os.environ.get("GOVERNOR_BANDCAMP_MAX_IN_FLIGHT", SELENIUM_POOL_SIZE)),
+        'rate': float(os.environ.get("GOVERNOR_BANDCAMP_RATE", 1)),
+        'burst': int(os.environ.get("GOVERNOR_BANDCAMP_BURST", 5)),
+        'failure_threshold': int(os.environ.get("GOVERNOR_BANDCAMP_FAILURE_THRESHOLD", 5)),
+        'reset_timeout': float(os.environ.get("GOVERNOR_BANDCAMP_RESET_TIMEOUT", 30)),
+        'quota_reset_timeout': float(os.environ.get("GOVERNOR_BANDCAMP_QUOTA_RESET_TIMEOUT", 60 * 5)),
+    },
+}
+# Limits for platforms added through a platform adapter without their own PLATFORM_GOVERNOR entry
+PLATFORM_GOVERNOR_DEFAULT = {
+    'max_in_flight': int(os.environ.get("GOVERNOR_DEFAULT_MAX_IN_FLIGHT", 4)),
+    'rate': float(os.environ.get("GOVERNOR_DEFAULT_RATE", 1)),
+    'burst': int(os.environ.get("GOVERNOR_DEFAULT_BURST", 5)),
+    'failure_threshold': int(os.environ.get("GOVERNOR_DEFAULT_FAILURE_THRESHOLD", 5)),
+    'reset_timeout': float(os.environ.get("GOVERNOR_DEFAULT_RESET_TIMEOUT", 30)),
+    'quota_reset_timeout': float(os.environ.get("GOVERNOR_DEFAULT_QUOTA_RESET_TIMEOUT", 60 * 5)),
+}
+# Seconds a caller waits for a token or an in-flight slot before falling back to manual entry
+PLATFORM_GOVERNOR_MAX_WAIT = float(os.environ.get("PLATFORM_GOVERNOR_MAX_WAIT", 5))
+
+# Rows per page of view_edit_playlist and its infinite-scroll endpoint (?page_size= is capped at PLAYLIST_MAX_PAGE_SIZE)
+PLAYLIST_PAGE_SIZE = int(os.environ.get("PLAYLIST_PAGE_SIZE", 100))
+PLAYLIST_MAX_PAGE_SIZE = int(os.environ.get("PLAYLIST_MAX_PAGE_SIZE", 500))
+# Rows read per server-side cursor fetch (and per streamed chunk) by the playlist export API
+PLAYLIST_EXPORT_CHUNK_SIZE = int(os.environ.get("PLAYLIST_EXPORT_CHUNK_SIZE", 2000))
+# Lifetime of cached rendered playlist pages (seconds, 0 disables); writes to a playlist invalidate them straight away
+PLAYLIST_FRAGMENT_CACHE_TTL = int(os.environ.get("PLAYLIST_FRAGMENT_CACHE_TTL", 60 * 60 * 24))
+# Playlists per page of the user_playlists overview (?page=)
+PLAYLIST_OVERVIEW_PAGE_SIZE = int(os.environ.get("PLAYLIST_OVERVIEW_PAGE_SIZE", 25))
+
+# Asynchronous metadata fetch jobs for add_streaming_link_to_playlist (job state lives in CACHES, so use Redis with >1 worker)
+METADATA_JOBS_ENABLED = os.environ.get("METADATA_JOBS_ENABLED", "false").lower() == "true"
+METADATA_JOBS_WORKERS = int(os.environ.get("METADATA_JOBS_WORKERS", 4))
+# How long a job's state (and result) is kept, in seconds
+METADATA_JOBS_TTL = int(os.environ.get("METADATA_JOBS_TTL", 60 * 10))
+# Seconds between refreshes of the "fetching metadata" page
+METADATA_JOBS_POLL_INTERVAL = int(os.environ.get("METADATA_JOBS_POLL_INTERVAL", 1))
+
+# Maximum number of items read from a YouTube playlist / SoundCloud set / Bandcamp album by the collection import
+COLLECTION_IMPORT_MAX_ITEMS = int(os.environ.get("COLLECTION_IMPORT_MAX_ITEMS", 500))
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'music_app_main.settings')
 
 application = get_wsgi_application()
+
+# Start warm browser sessions for Bandcamp/Soundcloud scraping once the worker is up
+from music_app_archive.src.integrations.browser_pool import prewarm_browser_pool
+prewarm_browser_pool()
@@ -1,2 +1,2 @@
-function y(){const o=document.querySelector("#edit-playlist-tracks-btn"),s=document.querySelector("#delete-playlist-tracks-btn"),l=document.querySelector("#cancel-edit-btn"),c=document.querySelectorAll(".playlist-track-checkbox-cell"),d=document.querySelector(".checkbox-header"),a=document.querySelector("#confirm-delete-btn"),r=document.getElementById("confirmDeleteModal");if(!o||!s||!l||!c||!d||!a||!r){console.warn("Required elements not found:",{editBtn:!!o,deleteBtn:!!s,cancelBtn:!!l,checkboxCells:!!c,checkboxHeader:!!d,confirmDeleteBtn:!!a,modalElement:!!r});return}const k=new Set,h=r?new bootstrap.Modal(r):null,m=document.cookie.split("; ").find(e=>e.startsWith("csrftoken="))?.split("=")[1]??"";o.addEventListener("click",()=>{d.classList.remove("d-none"),c.forEach(e=>{e.classList.remove("d-none")}),s.classList.remove("d-none"),l.classList.remove("d-none"),o.classList.add("d-none")}),l.addEventListener("click",()=>{d.classList.add("d-none"),c.forEach(e=>{e.classList.add("d-none");const t=e.querySelector('input[type="checkbox"]');t&&(t.checked=!1)}),s.classList.add("d-none"),l.classList.add("d-none"),o.classList.remove("d-none")}),s.addEventListener("click",()=>{k.clear(),c.forEach(e=>{const t=e.querySelector('input[type="checkbox"]'),i=e.closest("tr")?.dataset.playlistTrackId;t&&t.checked&&i&&k.add(parseInt(i))}),h?.show()}),a.addEventListener("click",()=>{const e=JSON.stringify({playlist_track_id:[...k]}),t=a.dataset.deleteUrl??"";fetch(t,{method:"DELETE",headers:{"Content-Type":"application/json","X-CSRFToken":m},body:e}).then(n=>n.json()).then(n=>{n.success&&(h?.hide(),c.forEach(i=>{const u=i.querySelector('input[type="checkbox"]');u&&(u.checked=!1)}),window.location.reload())}).catch(n=>{console.error("Error deleting playlist tracks:",n)})}),console.log("deletePlaylistTracks initialized")}document.addEventListener("DOMContentLoaded",y);
+function y(){const o=document.querySelector("#edit-playlist-tracks-btn"),s=document.querySelector("#delete-playlist-tracks-btn"),l=document.querySelector("#cancel-edit-btn"),d=document.querySelector(".checkbox-header"),a=document.querySelector("#confirm-delete-btn"),r=document.getElementById("confirmDeleteModal");if(!o||!s||!l||!d||!a||!r){console.warn("Required elements not found:",{editBtn:!!o,deleteBtn:!!s,cancelBtn:!!l,checkboxHeader:!!d,confirmDeleteBtn:!!a,modalElement:!!r});return}const k=new Set,h=r?new bootstrap.Modal(r):null,m=document.cookie.split("; ").find(e=>e.startsWith("csrftoken="))?.split("=")[1]??"",c=()=>document.querySelectorAll(".playlist-track-checkbox-cell");o.addEventListener("click",()=>{d.classList.remove("d-none"),c().forEach(e=>{e.classList.remove("d-none")}),s.classList.remove("d-none"),l.classList.remove("d-none"),o.classList.add("d-none")}),l.addEventListener("click",()=>{d.classList.add("d-none"),c().forEach(e=>{e.classList.add("d-none");const t=e.querySelector('input[type="checkbox"]');t&&(t.checked=!1)}),s.classList.add("d-none"),l.classList.add("d-none"),o.classList.remove("d-none")}),s.addEventListener("click",()=>{k.clear(),c().forEach(e=>{const t=e.querySelector('input[type="checkbox"]'),i=e.closest("tr")?.dataset.playlistTrackId;t&&t.checked&&i&&k.add(parseInt(i))}),h?.show()}),a.addEventListener("click",()=>{const e=JSON.stringify({playlist_track_id:[...k]}),t=a.dataset.deleteUrl??"";fetch(t,{method:"DELETE",headers:{"Content-Type":"application/json","X-CSRFToken":m},body:e}).then(n=>n.json()).then(n=>{n.success&&(h?.hide(),c().forEach(i=>{const u=i.querySelector('input[type="checkbox"]');u&&(u.checked=!1)}),window.location.reload())}).catch(n=>{console.error("Error deleting playlist tracks:",n)})}),console.log("deletePlaylistTracks initialized")}document.addEventListener("DOMContentLoaded",y);
 //# sourceMappingURL=deletePlaylistTracks.js.map
@@ -0,0 +1,2 @@
+let c=!1;async function u(e,t){const n=e.dataset.fragmentUrl,o=e.dataset.nextCursor,a=e.dataset.pageSize??"";if(!n||!o||c)return!1;c=!0;try{const r=await fetch(`${n}?after=${encodeURIComponent(o)}&page_size=${encodeURIComponent(a)}`,{headers:{"X-Requested-With":"XMLHttpRequest"}});if(!r.ok)throw new Error(`Unexpected status ${r.status}`);const s=await r.json();e.insertAdjacentHTML("beforeend",s.rows_html);const i=document.querySelector(".checkbox-header");return i&&!i.classList.contains("d-none")&&e.querySelectorAll(".playlist-track-checkbox-cell.d-none").forEach(l=>{l.classList.remove("d-none")}),s.next_cursor===null?(e.dataset.nextCursor="",t?.remove(),!1):(e.dataset.nextCursor=String(s.next_cursor),!0)}catch(r){return console.error("Error loading playlist tracks:",r),!1}finally{c=!1}}function d(){const e=document.querySelector("#playlist-tracks-body"),t=document.querySelector("#playlist-tracks-sentinel");if(!e||!t||!e.dataset.nextCursor||!("IntersectionObserver"in window))return;const n=new IntersectionObserver(o=>{o.some(a=>a.isIntersecting)&&u(e,t).then(a=>{!a&&!e.dataset.nextCursor&&n.disconnect()})},{rootMargin:"200px"});n.observe(t),console.log("playlistInfiniteScroll initialized")}document.addEventListener("DOMContentLoaded",d);
+//# sourceMappingURL=playlistInfiniteScroll.js.map